@@ -0,0 +1,264 @@
+# batch.py
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from textextraction import parse_questions
+from ingest import extract_text, set_thread_budget, share_of_cpus
+from sheet_template import template_for_key
+from evaluation import get_answer_key, evaluate_all
+from results import save_results
+from ocr_engines import ENGINE_TYPES, OCR_ENGINE_ENV
+from jobqueue import JobJournal, PRIORITIES, PRIORITY_NORMAL, DONE, result_source
+from utils import configure_logging
+import metrics
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+SCAN_EXTENSIONS = IMAGE_EXTENSIONS + (".pdf",)
+
+# Per-process answer key, loaded once by the pool initializer
+_WORKER_KEY = None
+
+def collect_sheets(source):
+    """
+    Build the list of (image_path, student_name) pairs to grade.
+    source is either a directory of scans or a manifest CSV with
+    header: Image,Student (Student is optional and defaults to the file name).
+    """
+    if os.path.isdir(source):
+        sheets = []
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(SCAN_EXTENSIONS):
+                path = os.path.join(source, name)
+                sheets.append((path, os.path.splitext(name)[0]))
+        return sheets
+
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Scan directory or manifest not found: {source}")
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    sheets = []
+    with open(source, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            image = (row.get("Image") or "").strip()
+            if not image:
+                continue
+            if not os.path.isabs(image):
+                image = os.path.join(base_dir, image)
+            student = (row.get("Student") or "").strip()
+            if not student:
+                student = os.path.splitext(os.path.basename(image))[0]
+            sheets.append((image, student))
+    return sheets
+
+def _init_worker(answer_key_path, log_level, ocr_threads=None):
+    """
+    Pool initializer: load the answer key once per worker process and cap
+    the OCR threads each sheet may use (its share of the CPUs).
+    """
+    global _WORKER_KEY
+    logging.getLogger().setLevel(log_level)
+    set_thread_budget(ocr_threads)
+    _WORKER_KEY = get_answer_key(answer_key_path)
+
+def grade_sheet(image_path, answer_key=None, raw_text=None):
+    """
+    Run OCR -> parse (clean + split) -> evaluate for one scan without any prompts.
+    raw_text skips OCR when the sheet's text is already known (a resumed run).
+    Returns a dict with the raw text, the evaluation and any error; stage
+    timings are recorded in metrics.
+    """
+    if answer_key is None:
+        answer_key = _WORKER_KEY
+
+    result = {"image": image_path, "raw": raw_text, "detailed": None, "total": 0.0, "error": None}
+
+    with metrics.timer("sheet"):
+        raw = raw_text if raw_text is not None else extract_text(
+            image_path, template=template_for_key(answer_key))
+        if not raw or not raw.strip():
+            result["error"] = "No text extracted"
+            return result
+        result["raw"] = raw
+
+        q_pairs = parse_questions(raw)
+        if not q_pairs:
+            result["error"] = "No questions detected"
+            return result
+
+        student_answers = {qid: ans for qid, ans in q_pairs}
+        detailed, total_score = evaluate_all(student_answers, answer_key)
+
+    result["detailed"] = detailed
+    result["total"] = total_score
+    return result
+
+def _grade_in_worker(image_path, raw_text=None):
+    # Each task ships back only its own metrics for the parent to merge
+    metrics.reset()
+    result = grade_sheet(image_path, raw_text=raw_text)
+    result["metrics"] = metrics.snapshot()
+    return result
+
+def default_run_id(answer_key_path, source):
+    """
+    Re-running the same key over the same source resumes the same run.
+    """
+    return f"{os.path.abspath(answer_key_path)}|{os.path.abspath(source)}"
+
+def run_batch(answer_key_path, source, workers=None, username=None, log_level=logging.WARNING,
+              journal=None, run_id=None, priority=PRIORITY_NORMAL, max_inflight=None):
+    """
+    Grade every sheet from source against one answer key using a process pool.
+    Progress is recorded in a JobJournal, so a restarted run skips finished
+    sheets and re-uses finished OCR text. At most max_inflight sheets
+    (default 2 x workers) are handed to the pool at once, and pending sheets
+    are claimed highest priority first, so urgent re-grades added meanwhile
+    jump the queue. Results are saved as each sheet finishes.
+    Returns the throughput summary.
+    """
+    # Fail fast on a bad key before spawning any workers
+    get_answer_key(answer_key_path)
+    keyname = os.path.basename(answer_key_path)
+
+    sheets = [(os.path.abspath(image), student) for image, student in collect_sheets(source)]
+    if not sheets:
+        print(f"No scans found in {source}")
+        return None
+
+    journal = journal or JobJournal()
+    run_id = run_id or default_run_id(answer_key_path, source)
+    journal.enqueue(run_id, sheets, os.path.abspath(answer_key_path), priority, username)
+    journal.recover(run_id)
+    already_done = journal.counts(run_id).get(DONE, 0)
+    todo = journal.pending(run_id)
+
+    workers = workers or os.cpu_count() or 1
+    # Booklet pages and template boxes share the CPUs left per worker process
+    ocr_threads = share_of_cpus(workers)
+    max_inflight = max_inflight or 2 * workers
+    print(f"Grading {todo} sheets with {workers} worker(s) against {keyname}"
+          + (f" ({already_done} already done)" if already_done else ""))
+
+    graded = 0
+    failed = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(answer_key_path, log_level, ocr_threads)) as pool:
+        in_flight = {}
+        while True:
+            # Backpressure: only top up to max_inflight, re-reading the queue each time
+            if len(in_flight) < max_inflight:
+                for row in journal.claim(run_id, max_inflight - len(in_flight)):
+                    future = pool.submit(_grade_in_worker, row["image_path"], row["raw_text"])
+                    in_flight[future] = row
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                row = in_flight.pop(future)
+                image, student = row["image_path"], row["student"]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": str(e), "raw": None, "metrics": None}
+
+                if result["metrics"]:
+                    metrics.merge(result["metrics"])
+                if result["raw"] is not None and row["raw_text"] is None:
+                    journal.record_ocr(row["id"], result["raw"])
+
+                if not result["error"]:
+                    try:
+                        _, result_id = save_results(student, username, result["total"],
+                                                    result["detailed"], keyname,
+                                                    source=result_source(row))
+                    except Exception as e:
+                        result["error"] = f"could not save results: {e}"
+
+                if result["error"]:
+                    failed += 1
+                    metrics.inc("grading_sheets_total", status="failed")
+                    journal.record_failed(row["id"], result["error"])
+                    print(f"FAILED {image}: {result['error']}")
+                    continue
+
+                graded += 1
+                metrics.inc("grading_sheets_total", status="graded")
+                journal.record_done(row["id"], result["total"], result_id)
+                print(f"[{graded + failed}/{todo}] {student}: {result['total']}")
+
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "Sheets": graded + failed,
+        "Graded": graded,
+        "Failed": failed,
+        "Skipped": already_done,
+        "Workers": workers,
+        "Elapsed": elapsed,
+        "SheetsPerSec": (graded + failed) / elapsed if elapsed else 0.0,
+        "StageSeconds": {stage: seconds for stage, (seconds, _) in metrics.stage_seconds().items()},
+    }
+    print_summary(summary)
+    return summary
+
+def print_summary(summary):
+    print("\n" + "=" * 50)
+    print(f"Sheets:        {summary['Sheets']} ({summary['Graded']} graded, {summary['Failed']} failed"
+          + (f", {summary['Skipped']} done earlier" if summary.get("Skipped") else "") + ")")
+    print(f"Workers:       {summary['Workers']}")
+    print(f"Elapsed:       {summary['Elapsed']:.2f}s")
+    print(f"Throughput:    {summary['SheetsPerSec']:.2f} sheets/sec")
+    print("Stage time (total / per sheet):")
+    count = max(summary["Sheets"], 1)
+    for stage, seconds in sorted(summary["StageSeconds"].items()):
+        print(f"  {stage:<10} {seconds:8.2f}s  {seconds / count * 1000:8.1f}ms")
+    print("=" * 50)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade a directory or manifest of scans without prompts.")
+    parser.add_argument("answer_key", help="Path to the answer key CSV")
+    parser.add_argument("source", help="Directory of scans or manifest CSV (Image,Student)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("-u", "--user", default=None, help="Evaluator name recorded with the results")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="Log OCR/evaluation details (-v info, -vv debug)")
+    parser.add_argument("--engine", choices=sorted(ENGINE_TYPES), default=None,
+                        help="OCR backend (default: $OCR_ENGINE or tesseract)")
+    parser.add_argument("--journal", default=None,
+                        help="Job journal database for resuming runs (default: data/jobs.db)")
+    parser.add_argument("--run", default=None,
+                        help="Run ID in the journal (default: derived from the key and source paths)")
+    parser.add_argument("--priority", choices=sorted(PRIORITIES), default="normal",
+                        help="Queue lane for these sheets; urgent sheets are graded first")
+    parser.add_argument("--max-inflight", type=int, default=None,
+                        help="Sheets handed to the pool at once (default: 2 x workers)")
+    parser.add_argument("--metrics", default=None,
+                        help="Write metrics to this file (.prom/.txt for Prometheus text, else JSON)")
+    args = parser.parse_args(argv)
+
+    configure_logging(("WARNING", "INFO", "DEBUG")[min(args.verbose, 2)])
+
+    if args.engine:
+        # Read by get_engine in every worker process
+        os.environ[OCR_ENGINE_ENV] = args.engine
+
+    summary = run_batch(args.answer_key, args.source, workers=args.workers,
+                        username=args.user, log_level=logging.getLogger().level,
+                        journal=JobJournal(args.journal), run_id=args.run,
+                        priority=PRIORITIES[args.priority], max_inflight=args.max_inflight)
+    if args.metrics:
+        print(f"Metrics written to {metrics.write(args.metrics)}")
+    return 0 if summary and not summary["Failed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# benchmarks/bench_cohort.py
+"""
+Micro-benchmark: question-major cohort evaluation vs looping evaluate_all,
+checking that both give identical results.
+
+    python benchmarks/bench_cohort.py [--questions 60] [--students 5000] [--noise 0.05]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cohort import evaluate_cohort
+from evaluation import get_answer_key, evaluate_all
+from textextraction import parse_questions
+
+import synthetic
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--noise", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    rows = synthetic.generate_answer_key(args.questions)
+    key_path = synthetic.write_answer_key(rows, os.path.join(os.getcwd(), ".bench_cohort_key.csv"))
+    try:
+        key = get_answer_key(key_path)
+    finally:
+        os.remove(key_path)
+    students = [dict(parse_questions(text))
+                for _, text in synthetic.generate_sheets(rows, args.students, args.noise)]
+
+    start = time.perf_counter()
+    looped = [evaluate_all(answers, key) for answers in students]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cohort = evaluate_cohort(students, key)
+    cohort_seconds = time.perf_counter() - start
+
+    identical = looped == list(cohort)
+    n = len(students)
+    print(f"{n} students x {len(key)} questions")
+    print(f"  evaluate_all  {loop_seconds * 1000:9.1f}ms  {loop_seconds / n * 1e6:8.1f}us/student")
+    print(f"  cohort        {cohort_seconds * 1000:9.1f}ms  {cohort_seconds / n * 1e6:8.1f}us/student"
+          f"  x{loop_seconds / cohort_seconds:.1f}")
+    print(f"  identical results: {identical}")
+    return 0 if identical else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
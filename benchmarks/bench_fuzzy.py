@@ -0,0 +1,74 @@
+# benchmarks/bench_fuzzy.py
+"""
+Micro-benchmark: OCR-tolerant keyword matching on long answers with large
+keyword sets, bigram-indexed lookup vs comparing every keyword with every word.
+
+    python benchmarks/bench_fuzzy.py [--answers 200] [--keywords 200] [--words 1500] [--distance 2]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import KeywordMatcher, TOKEN_RE, bounded_edit_distance
+
+import synthetic
+
+def naive_match(matcher, text):
+    """
+    The same rule without the index: every missed keyword against every word.
+    """
+    matched = matcher.find(text)
+    found = {kw.lower() for kw in matched}
+    words = set(TOKEN_RE.findall(text.lower()))
+    fuzzy = {}
+    for kw in matcher.keywords:
+        low = kw.lower()
+        limit = matcher.allowed_distance(low)
+        if low in found or not limit:
+            continue
+        for word in words:
+            if bounded_edit_distance(low, word, limit) is not None:
+                fuzzy[kw] = word
+                break
+    return len(matched) + len(fuzzy)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--keywords", type=int, default=200)
+    parser.add_argument("--words", type=int, default=1500)
+    parser.add_argument("--distance", type=int, default=2)
+    parser.add_argument("--noise", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    vocab = synthetic.make_vocabulary(rng, 5000)
+    keywords = rng.sample(vocab, args.keywords)
+    answers = []
+    for _ in range(args.answers):
+        words = rng.sample(keywords, rng.randint(0, args.keywords)) + rng.choices(vocab, k=args.words)
+        rng.shuffle(words)
+        answers.append(synthetic.add_ocr_noise(" ".join(words), rng, args.noise))
+
+    exact = KeywordMatcher(keywords, max_distance=0)
+    fuzzy = KeywordMatcher(keywords, max_distance=args.distance)
+    runs = [
+        ("exact", lambda a: len(exact.find(a))),
+        ("fuzzy-index", lambda a: len(fuzzy.match(a)[0])),
+        ("fuzzy-naive", lambda a: naive_match(fuzzy, a)),
+    ]
+    print(f"{args.answers} answers x {args.words} words, {args.keywords} keywords, distance {args.distance}")
+    for name, fn in runs:
+        start = time.perf_counter()
+        hits = sum(fn(a) for a in answers)
+        seconds = time.perf_counter() - start
+        print(f"  {name:<12} {seconds * 1000:9.1f}ms  {seconds / len(answers) * 1000:7.2f}ms/answer"
+              f"  {hits / len(answers):6.1f} keywords/answer")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/bench_import.py
+"""
+Import-time check for the command-line entry points and pool workers: each
+module is imported in a fresh interpreter under -X importtime and must stay
+within the time budget, load none of the heavy optional dependencies, and
+create no files.
+
+    python benchmarks/bench_import.py [--budget-ms 150] [--repeat 3] [modules...]
+
+Exits with status 1 if any check fails.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point -> (heavy packages it may load at import, budget override in ms)
+MODULES = {
+    "main": ((), None),
+    "batch": ((), None),
+    "worker": ((), None),
+    "results": ((), None),
+    "jobqueue": ((), None),
+    "ocr_cache": ((), None),
+    # Long-running, and aiohttp is the whole point of it
+    "server": (("aiohttp",), 500.0),
+}
+HEAVY = ("PIL", "pytesseract", "tesserocr", "pdf2image", "numpy", "pandas", "ahocorasick", "aiohttp")
+
+PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted({{m.split(".")[0] for m in sys.modules}} & set({heavy!r}))))
+"""
+
+def import_once(module):
+    """
+    Import module in a fresh interpreter; return (cumulative microseconds,
+    heavy packages loaded).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY)],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    micros = None
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            micros = int(parts[1])
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return micros, loaded
+
+def snapshot_files():
+    return {os.path.join(dirpath, name)
+            for dirpath, dirnames, filenames in os.walk(ROOT)
+            if "__pycache__" not in dirpath and ".git" not in dirpath.split(os.sep)
+            for name in filenames + dirnames}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=sorted(MODULES))
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="Maximum import time of each module (best of --repeat)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failures = []
+    before = snapshot_files()
+    print(f"Import times (best of {args.repeat}, budget {args.budget_ms:.0f}ms)")
+    for module in args.modules:
+        runs = [import_once(module) for _ in range(args.repeat)]
+        best = min(micros for micros, _ in runs) / 1000
+        allowed, budget = MODULES.get(module, ((), None))
+        budget = budget or args.budget_ms
+        unexpected = sorted(set(runs[0][1]) - set(allowed))
+        flag = "ok"
+        if best > budget:
+            flag = "OVER BUDGET"
+            failures.append(f"{module}: {best:.1f}ms")
+        if unexpected:
+            flag = "HEAVY IMPORTS"
+            failures.append(f"{module}: loads {', '.join(unexpected)}")
+        print(f"  {module:<12} {best:8.1f}ms  (budget {budget:.0f}ms)  {flag}")
+
+    created = sorted(snapshot_files() - before)
+    if created:
+        failures.append("files created at import: " + ", ".join(os.path.relpath(p, ROOT) for p in created))
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
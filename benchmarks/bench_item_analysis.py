@@ -0,0 +1,83 @@
+# benchmarks/bench_item_analysis.py
+"""
+Benchmark: item analysis of a large synthetic cohort, loading the score
+matrix from a results database and computing the per-question statistics.
+
+    python benchmarks/bench_item_analysis.py [--students 50000] [--questions 100]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import results
+from item_analysis import load_score_matrix, item_statistics
+
+def populate(db_path, students, questions, seed=0):
+    """
+    Write a cohort of results and detail rows straight into a results database.
+    """
+    rng = np.random.default_rng(seed)
+    marks = rng.choice([1.0, 2.0, 5.0, 10.0], size=questions)
+    ability = rng.normal(size=students)
+    easiness = rng.normal(size=questions)
+    p = 1 / (1 + np.exp(-(ability[:, None] + easiness[None, :])))
+    scores = np.round(p * marks * 2) / 2
+
+    conn = results.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO results (id, student, evaluator_user, answer_key, total_score, timestamp) "
+            "VALUES (?, ?, NULL, 'bench.csv', ?, '20240101_000000')",
+            ((i + 1, f"student_{i:06d}", float(total)) for i, total in enumerate(scores.sum(axis=1))))
+        conn.executemany(
+            "INSERT INTO details (answer_key, result_id, seq, qid, student, student_answer, score, "
+            "marks, remark, correct_answer, type) VALUES ('bench.csv', ?, ?, ?, ?, '', ?, ?, '', '', 'S')",
+            ((i + 1, j, f"Q{j + 1}", f"student_{i:06d}", float(scores[i, j]), float(marks[j]))
+             for i in range(students) for j in range(questions)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--questions", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="item-analysis-bench-")
+    db_path = os.path.join(workdir, "results.db")
+    try:
+        start = time.perf_counter()
+        populate(db_path, args.students, args.questions)
+        print(f"Populated {args.students} x {args.questions} in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        matrix = load_score_matrix("bench.csv", db_path)
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        item_statistics(matrix.scores, matrix.marks)
+        stats_seconds = time.perf_counter() - start
+
+        # Measured on a second pass: tracing slows every allocation down
+        del matrix
+        tracemalloc.start()
+        matrix = load_score_matrix("bench.csv", db_path)
+        item_statistics(matrix.scores, matrix.marks)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"  load matrix  {load_seconds:7.2f}s")
+        print(f"  statistics   {stats_seconds:7.2f}s")
+        print(f"  peak memory  {peak / 2**20:7.1f} MiB (matrix {matrix.scores.nbytes / 2**20:.1f} MiB)")
+    finally:
+        results._CONNECTIONS.clear()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
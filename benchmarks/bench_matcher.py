@@ -0,0 +1,94 @@
+# benchmarks/bench_matcher.py
+"""
+Micro-benchmark: subjective keyword matching, legacy loop vs KeywordMatcher.
+
+    python benchmarks/bench_matcher.py [--answers 2000] [--keywords 40] [--words 800]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation import evaluate_subjective, subjective_keywords
+from matcher import KeywordMatcher, load_ahocorasick
+
+def legacy_evaluate_subjective(student_ans, correct_ans, marks):
+    """
+    evaluate_subjective as it was before KeywordMatcher (one scan per keyword).
+    """
+    if student_ans is None or student_ans.strip() == "":
+        return 0.0, "No answer provided"
+    keywords = subjective_keywords(correct_ans)
+    if not keywords:
+        if len(student_ans.strip()) > 5:
+            return marks, "Answer provided (no keywords to match)"
+        return 0.0, "No answer or keywords"
+    student_lower = student_ans.lower()
+    matched_keywords = [kw for kw in keywords if kw.lower() in student_lower]
+    score = round((len(matched_keywords) / len(keywords)) * marks, 2)
+    if score == marks:
+        remark = "Excellent - All keywords present"
+    elif score >= marks * 0.7:
+        remark = f"Good - Matched {len(matched_keywords)}/{len(keywords)} keywords"
+    elif score > 0:
+        remark = f"Partial - Matched {len(matched_keywords)}/{len(keywords)} keywords"
+    else:
+        remark = f"Insufficient - Expected keywords: {', '.join(keywords[:5])}"
+    return score, remark
+
+def make_corpus(n_answers, n_keywords, n_words, seed=0):
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12)))
+             for _ in range(5000)]
+    model_answer = " ".join(rng.sample(vocab, n_keywords))
+    answers = [" ".join(rng.choices(vocab, k=n_words)) for _ in range(n_answers)]
+    return model_answer, answers
+
+def timed(fn, answers):
+    start = time.perf_counter()
+    out = [fn(ans) for ans in answers]
+    return time.perf_counter() - start, out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--answers", type=int, default=2000)
+    parser.add_argument("--keywords", type=int, default=40)
+    parser.add_argument("--words", type=int, default=800)
+    args = parser.parse_args(argv)
+
+    model_answer, answers = make_corpus(args.answers, args.keywords, args.words)
+    keywords = subjective_keywords(model_answer)
+    marks = 10.0
+
+    cases = [("legacy (per-keyword scan)",
+              lambda ans: legacy_evaluate_subjective(ans, model_answer, marks))]
+    scan = KeywordMatcher(keywords, use_automaton=False)
+    cases.append(("matcher, substring scan",
+                  lambda ans: evaluate_subjective(ans, model_answer, marks, matcher=scan)))
+    if load_ahocorasick() is not None:
+        automaton = KeywordMatcher(keywords, use_automaton=True)
+        cases.append(("matcher, aho-corasick",
+                      lambda ans: evaluate_subjective(ans, model_answer, marks, matcher=automaton)))
+    else:
+        print("pyahocorasick not installed: skipping the automaton backend")
+
+    print(f"{args.answers} answers x {args.words} words, {len(keywords)} keywords")
+    baseline = None
+    reference = None
+    for name, fn in cases:
+        seconds, out = timed(fn, answers)
+        if reference is None:
+            reference, baseline = out, seconds
+        elif out != reference:
+            print(f"MISMATCH: {name} disagrees with the legacy scores/remarks")
+            return 1
+        print(f"  {name:<28} {seconds * 1000:9.1f}ms  "
+              f"{seconds / len(answers) * 1e6:8.1f}us/answer  x{baseline / seconds:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
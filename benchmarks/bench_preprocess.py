@@ -0,0 +1,80 @@
+# benchmarks/bench_preprocess.py
+"""
+Benchmark: OCR time and text agreement with and without each preprocessing step.
+
+    python benchmarks/bench_preprocess.py path/to/scans [--engine tesseract] [--limit 20]
+
+The reference text is OCR of the unprocessed image. Each configuration reports
+total preprocessing and OCR seconds and the mean difflib similarity of its text
+to the reference (1.0 = identical).
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import IMAGE_EXTENSIONS
+from ocr_engines import get_engine
+from preprocess import STEP_ORDER, DEFAULT_STEPS, preprocess_image
+
+def configurations():
+    configs = [("none", ()), ("default", DEFAULT_STEPS)]
+    for step in STEP_ORDER:
+        configs.append((f"only {step}", (step,)))
+    for i in range(1, len(STEP_ORDER) + 1):
+        configs.append(("+".join(STEP_ORDER[:i]), STEP_ORDER[:i]))
+    seen = set()
+    for name, steps in configs:
+        if steps not in seen:
+            seen.add(steps)
+            yield name, steps
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scans", help="Directory of scanned answer sheets")
+    parser.add_argument("--engine", default="tesseract")
+    parser.add_argument("--psm", type=int, default=6)
+    parser.add_argument("--lang", default="eng")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N scans")
+    args = parser.parse_args(argv)
+
+    from PIL import Image
+    engine = get_engine(args.engine)
+    if not engine.needs_image:
+        print(f"The {args.engine} engine does not look at pixels; use a real OCR engine")
+        return 1
+
+    paths = [os.path.join(args.scans, n) for n in sorted(os.listdir(args.scans))
+             if n.lower().endswith(IMAGE_EXTENSIONS)][:args.limit]
+    if not paths:
+        print(f"No scans found in {args.scans}")
+        return 1
+    images = [Image.open(p) for p in paths]
+    for img in images:
+        img.load()
+
+    print(f"{len(images)} scans, engine {engine.version()}")
+    print(f"{'pipeline':<44} {'prep s':>8} {'ocr s':>8} {'agree':>7}")
+    reference = None
+    for name, steps in configurations():
+        prep_seconds = 0.0
+        ocr_seconds = 0.0
+        texts = []
+        for img in images:
+            processed, timings = preprocess_image(img, steps)
+            prep_seconds += sum(timings.values())
+            start = time.perf_counter()
+            texts.append(engine.image_to_string(processed, psm=args.psm, lang=args.lang))
+            ocr_seconds += time.perf_counter() - start
+        if reference is None:
+            reference = texts
+        agreement = sum(difflib.SequenceMatcher(None, ref, text).ratio()
+                        for ref, text in zip(reference, texts)) / len(texts)
+        print(f"{name:<44} {prep_seconds:8.2f} {ocr_seconds:8.2f} {agreement:7.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
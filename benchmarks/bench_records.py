@@ -0,0 +1,63 @@
+# benchmarks/bench_records.py
+"""
+Memory benchmark: a graded cohort held as per-question dicts (the old
+evaluate_all output) vs QuestionResult records.
+
+    python benchmarks/bench_records.py [--questions 60] [--students 20000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation import get_answer_key, evaluate_all
+from textextraction import parse_questions
+
+import synthetic
+
+def as_dicts(detailed):
+    """
+    The per-question dicts evaluate_all built before QuestionResult, each
+    with its own freshly formatted remark.
+    """
+    out = {}
+    for qid, info in detailed.items():
+        row = dict(info)
+        row["Remark"] = "".join(list(info["Remark"]))
+        out[qid] = row
+    return out
+
+def measure(fn):
+    tracemalloc.start()
+    held = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return size
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--students", type=int, default=20000)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    rows = synthetic.generate_answer_key(args.questions)
+    with tempfile.TemporaryDirectory() as tmp:
+        key = get_answer_key(synthetic.write_answer_key(rows, os.path.join(tmp, "key.csv")))
+    # Parse up front so only the graded results are measured
+    students = [dict(parse_questions(text)) for _, text in synthetic.generate_sheets(rows, args.students)]
+
+    records = measure(lambda: [evaluate_all(answers, key)[0] for answers in students])
+    dicts = measure(lambda: [as_dicts(evaluate_all(answers, key)[0]) for answers in students])
+    print(f"{args.students} students x {args.questions} questions")
+    print(f"  dicts    {dicts / 2**20:8.1f} MiB")
+    print(f"  records  {records / 2**20:8.1f} MiB  x{dicts / records:.1f} smaller")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# benchmarks/bench_regions.py
+"""
+Benchmark: template-driven region OCR against full-page OCR of the same scans.
+
+    python benchmarks/bench_regions.py answer_key.csv path/to/scans [--engine pooled] [--limit 20]
+
+The answer key needs a sheet template next to it (answer_key.template.json).
+For each mode it reports total OCR seconds, questions found per sheet, and
+the mean difflib similarity of each question's answer between the two modes.
+"""
+import argparse
+import difflib
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import IMAGE_EXTENSIONS
+from evaluation import get_answer_key
+from ingest import extract_text, extract_text_from_regions
+from ocr_engines import get_engine
+from sheet_template import template_for_key, template_path
+from textextraction import parse_questions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("answer_key")
+    parser.add_argument("scans", help="Directory of scanned answer sheets")
+    parser.add_argument("--engine", default="tesseract")
+    parser.add_argument("--workers", type=int, default=None, help="Region OCR threads")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N scans")
+    args = parser.parse_args(argv)
+    logging.disable(logging.ERROR)
+
+    engine = get_engine(args.engine)
+    if not engine.needs_image:
+        print(f"The {args.engine} engine does not look at pixels; use a real OCR engine")
+        return 1
+    key = get_answer_key(args.answer_key)
+    template = template_for_key(key)
+    if template is None:
+        print(f"No sheet template at {template_path(key.path)}")
+        return 1
+
+    paths = [os.path.join(args.scans, n) for n in sorted(os.listdir(args.scans))
+             if n.lower().endswith(IMAGE_EXTENSIONS)][:args.limit]
+    if not paths:
+        print(f"No scans found in {args.scans}")
+        return 1
+
+    page_seconds = region_seconds = 0.0
+    page_found = region_found = 0
+    similarity = []
+    for path in paths:
+        start = time.perf_counter()
+        page = dict(parse_questions(extract_text(path, use_cache=False, engine=engine)))
+        page_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        regions = dict(parse_questions(extract_text_from_regions(
+            path, template, use_cache=False, engine=engine, workers=args.workers)))
+        region_seconds += time.perf_counter() - start
+
+        page_found += len(set(page) & set(key))
+        region_found += len(set(regions) & set(key))
+        similarity += [difflib.SequenceMatcher(None, page.get(qid, ""), regions.get(qid, "")).ratio()
+                       for qid in key]
+
+    n = len(paths)
+    print(f"{n} scans, {len(key)} questions, {len(template.regions)} boxes, engine {engine.version()}")
+    print(f"  full page (psm 6)  {page_seconds:8.2f}s  {page_seconds / n:6.2f}s/sheet  "
+          f"{page_found / n:5.1f} questions found")
+    print(f"  regions            {region_seconds:8.2f}s  {region_seconds / n:6.2f}s/sheet  "
+          f"{region_found / n:5.1f} questions found  x{page_seconds / max(region_seconds, 1e-9):.1f}")
+    print(f"  answer agreement   {sum(similarity) / len(similarity):8.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
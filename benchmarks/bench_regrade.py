@@ -0,0 +1,95 @@
+# benchmarks/bench_regrade.py
+"""
+Benchmark: re-grading a stored cohort after correcting two questions of its
+answer key, against re-evaluating every question, checking that both give
+the same totals and that the running aggregates match a full rebuild.
+
+    python benchmarks/bench_regrade.py [--questions 60] [--students 10000]
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import results
+from cohort import evaluate_cohort
+from evaluation import get_answer_key
+from regrade import regrade
+from textextraction import parse_questions
+
+import synthetic
+
+def populate(db_path, students, key):
+    """
+    Grade the cohort with key and store it as save_results would.
+    """
+    cohort = evaluate_cohort(students, key)
+    conn = results.connect(db_path)
+    with conn:
+        for i, (detailed, total) in enumerate(cohort):
+            conn.execute(
+                "INSERT INTO results (id, student, evaluator_user, answer_key, total_score, timestamp) "
+                "VALUES (?, ?, NULL, 'bench.csv', ?, '20240101_000000')", (i + 1, f"student_{i:05d}", total))
+            results._insert_details(conn, i + 1, f"student_{i:05d}", "bench.csv", detailed)
+        results._rebuild_aggregates(conn)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--students", type=int, default=10000)
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="regrade-bench-")
+    db_path = os.path.join(workdir, "results.db")
+    try:
+        rows = synthetic.generate_answer_key(args.questions)
+        key = get_answer_key(synthetic.write_answer_key(rows, os.path.join(workdir, "key.csv")))
+        # Correct one objective and one subjective answer
+        objective = next(row for row in rows if row["Type"] == "O")
+        subjective = next(row for row in rows if row["Type"] == "S")
+        objective["Answer"] = "B" if objective["Answer"] != "B" else "C"
+        subjective["Answer"] = " ".join(subjective["Answer"].split()[1:])
+        corrected = get_answer_key(synthetic.write_answer_key(rows, os.path.join(workdir, "fixed.csv")))
+
+        students = [dict(parse_questions(text))
+                    for _, text in synthetic.generate_sheets(rows, args.students)]
+        populate(db_path, students, key)
+
+        start = time.perf_counter()
+        full = evaluate_cohort(students, corrected)
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report = regrade("bench.csv", corrected, db_path=db_path)
+        regrade_seconds = time.perf_counter() - start
+
+        conn = results.connect(db_path)
+        stored = [total for (total,) in conn.execute("SELECT total_score FROM results ORDER BY id")]
+        differing = sum(results.to_cents(a) != results.to_cents(b) for a, b in zip(stored, full.totals))
+        aggregates = (conn.execute("SELECT * FROM key_stats").fetchall(),
+                      conn.execute("SELECT * FROM score_histogram ORDER BY cents").fetchall())
+        with conn:
+            results._rebuild_aggregates(conn)
+        rebuilt = (conn.execute("SELECT * FROM key_stats").fetchall(),
+                   conn.execute("SELECT * FROM score_histogram ORDER BY cents").fetchall())
+
+        print(f"{args.students} students x {args.questions} questions, corrected {', '.join(report['Changed'])}")
+        print(f"  re-evaluate all  {full_seconds:7.2f}s (evaluation only, no OCR or saving)")
+        print(f"  regrade          {regrade_seconds:7.2f}s  x{full_seconds / regrade_seconds:.1f}"
+              f"  ({report['StudentsChanged']} totals changed)")
+        print(f"  totals differing from a full re-grade: {differing}")
+        print(f"  aggregates match a rebuild: {aggregates == rebuilt}")
+        ok = differing == 0 and aggregates == rebuilt
+    finally:
+        results._CONNECTIONS.clear()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
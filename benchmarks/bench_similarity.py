@@ -0,0 +1,59 @@
+# benchmarks/bench_similarity.py
+"""
+Micro-benchmark: cohort-wide TF-IDF similarity scoring vs per-answer keyword
+matching, for one subjective question.
+
+    python benchmarks/bench_similarity.py [--answers 20000] [--keywords 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation import evaluate_subjective, subjective_keywords
+from matcher import KeywordMatcher
+from similarity import score_question
+
+import synthetic
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--answers", type=int, default=20000)
+    parser.add_argument("--keywords", type=int, default=20)
+    parser.add_argument("--noise", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    key = synthetic.generate_answer_key(1, objective_ratio=0, keywords=(args.keywords, args.keywords))
+    model = key[0]["Answer"]
+    vocab = synthetic.make_vocabulary(rng, 500)
+    answers = []
+    for _ in range(args.answers):
+        skill = rng.random()
+        words = [w for w in model.split() if rng.random() < skill] + rng.choices(vocab, k=rng.randint(0, 30))
+        rng.shuffle(words)
+        answers.append(synthetic.add_ocr_noise(" ".join(words), rng, args.noise))
+
+    keywords = subjective_keywords(model)
+    matcher = KeywordMatcher(keywords)
+    start = time.perf_counter()
+    keyword_scores = [evaluate_subjective(a, model, 10, keywords, matcher)[0] for a in answers]
+    keyword_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores, sims = score_question(model, answers, 10)
+    tfidf_seconds = time.perf_counter() - start
+
+    n = len(answers)
+    print(f"{n} answers, {len(keywords)} keywords")
+    print(f"  keywords  {keyword_seconds * 1000:9.1f}ms  {keyword_seconds / n * 1e6:7.1f}us/answer"
+          f"  mean score {sum(keyword_scores) / n:.2f}")
+    print(f"  tfidf     {tfidf_seconds * 1000:9.1f}ms  {tfidf_seconds / n * 1e6:7.1f}us/answer"
+          f"  mean score {scores.mean():.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
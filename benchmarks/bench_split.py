@@ -0,0 +1,160 @@
+# benchmarks/bench_split.py
+"""
+Benchmark: clean_text + split_questions, legacy multi-pass parser vs the
+single-pass rewrite, on large synthetic OCR dumps.
+
+    python benchmarks/bench_split.py [--lines 200000] [--repeat 3]
+
+At the default 200,000 lines the rewrite measures about x2.8-x3.0 over
+the legacy parser; smaller dumps vary more from run to run.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textextraction import clean_text, split_questions, parse_questions
+
+def legacy_clean_text(raw_text):
+    """
+    clean_text as it was before the rewrite.
+    """
+    if not raw_text:
+        return ""
+    text = raw_text.replace("\r", "\n")
+    text = re.sub(r"\n{2,}", "\n", text)
+    text = re.sub(r"[^\x00-\x7F]+", "", text)
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip() != ""]
+    cleaned = "\n".join(lines)
+    print(f"Cleaned text: {len(lines)} lines")
+    return cleaned
+
+def legacy_split_questions(text):
+    """
+    split_questions as it was before the rewrite (per-line patterns and prints).
+    """
+    if not text:
+        print("No text to split")
+        return []
+    lines = text.splitlines()
+    q_list = []
+    print(f"\nParsing {len(lines)} lines for questions...")
+    for idx, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        patterns = [
+            r'^\s*(Q\s*\.?\s*\d+)[\).\s:-]+(.*)$',
+            r'^\s*(\d+)[\).\s:-]+(.*)$',
+        ]
+        matched = False
+        for pattern in patterns:
+            m = re.match(pattern, line, re.IGNORECASE)
+            if m:
+                qid_raw = m.group(1).strip()
+                ans = m.group(2).strip()
+                if qid_raw.isdigit():
+                    qid = f"Q{qid_raw}"
+                else:
+                    qid = re.sub(r'\s+', '', qid_raw).upper()
+                    if not qid.startswith('Q'):
+                        qid = 'Q' + qid
+                q_list.append((qid, ans))
+                print(f"Line {idx}: Matched {qid} -> {ans[:50]}...")
+                matched = True
+                break
+        if not matched:
+            if ':' in line:
+                parts = line.split(':', 1)
+                qid_candidate = parts[0].strip()
+                ans = parts[1].strip()
+                if re.match(r'^(Q\.?\s*\d+|\d+)$', qid_candidate, re.IGNORECASE):
+                    if qid_candidate.isdigit():
+                        qid = f"Q{qid_candidate}"
+                    else:
+                        qid = re.sub(r'\s+', '', qid_candidate).upper()
+                        if not qid.startswith('Q'):
+                            qid = 'Q' + qid
+                    q_list.append((qid, ans))
+                    print(f"Line {idx}: Colon-split {qid} -> {ans[:50]}...")
+                    matched = True
+        if not matched and line.strip():
+            q_list.append((None, line.strip()))
+            print(f"Line {idx}: Unmatched -> {line[:50]}...")
+    final = []
+    max_existing_num = 0
+    for qid, ans in q_list:
+        if qid and qid.startswith('Q'):
+            try:
+                num = int(re.search(r'\d+', qid).group())
+                max_existing_num = max(max_existing_num, num)
+            except:
+                pass
+    seq = max_existing_num + 1
+    for qid, ans in q_list:
+        if qid is None:
+            qid = f"Q{seq}"
+            seq += 1
+            print(f"Assigned sequential ID: {qid} -> {ans[:50]}...")
+        final.append((qid, ans))
+    print(f"\nTotal questions parsed: {len(final)}")
+    return final
+
+def make_dump(n_lines, seed=0):
+    """
+    OCR-like text: numbered answers in several styles, continuation lines,
+    blank lines, stray non-ASCII and Windows line endings.
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_letters, k=rng.randint(2, 10))) for _ in range(2000)]
+    styles = ["Q{n}: {a}", "Q.{n} {a}", "q {n}) {a}", "{n}. {a}", "{n}) {a}", "{n}:{a}",
+              "Q{n}-{a}", "  {a}", "{a}", "", "Q{n}", "{n}", "• {a} été"]
+    out = []
+    for i in range(n_lines):
+        answer = " ".join(rng.choices(words, k=rng.randint(1, 12)))
+        line = rng.choice(styles).format(n=rng.randint(1, 120), a=answer)
+        out.append(line)
+    return "\r\n".join(out[: n_lines // 2]) + "\n\n" + "\n".join(out[n_lines // 2:])
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    dump = make_dump(args.lines)
+    cases = [
+        ("legacy clean+split", lambda: legacy_split_questions(legacy_clean_text(dump))),
+        ("clean_text+split_questions", lambda: split_questions(clean_text(dump))),
+        ("parse_questions (one pass)", lambda: parse_questions(dump)),
+    ]
+    print(f"{args.lines} lines, {len(dump) / 1e6:.1f} MB of synthetic OCR text")
+    baseline = reference = None
+    for name, fn in cases:
+        seconds, out = best_of(fn, args.repeat)
+        if reference is None:
+            reference, baseline = out, seconds
+        elif out != reference:
+            print(f"MISMATCH: {name} output differs from the legacy parser")
+            return 1
+        print(f"  {name:<28} {seconds * 1000:9.1f}ms  x{baseline / seconds:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
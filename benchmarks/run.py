@@ -0,0 +1,180 @@
+# benchmarks/run.py
+"""
+Benchmark runner: times each grading stage and the end-to-end pipeline on
+synthetic data through the fake OCR engine, and compares with a baseline.
+
+    python benchmarks/run.py [--size small|medium|large] [--out results.json]
+                             [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+                             [--update-baseline]
+
+Exits with status 1 if any stage is slower per item than the baseline by
+more than the tolerance, and with status 2 if there is no baseline for this
+size to compare with (timings are machine-specific, so none is committed;
+store one with --update-baseline on the machine that runs the check).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The end-to-end stage must measure the pipeline, not the OCR cache
+os.environ["OCR_CACHE"] = "0"
+
+import results
+from batch import grade_sheet
+from evaluation import load_answer_key, get_answer_key, clear_answer_key_cache, evaluate_all
+from ocr_engines import FakeOCREngine, set_engine
+from textextraction import parse_questions
+
+import synthetic
+
+SIZES = {
+    "small": {"questions": 20, "students": 200},
+    "medium": {"questions": 60, "students": 1000},
+    "large": {"questions": 100, "students": 5000},
+}
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def run(size, noise, repeat, workdir):
+    params = SIZES[size]
+    key_rows = synthetic.generate_answer_key(params["questions"])
+    key_path = synthetic.write_answer_key(key_rows, os.path.join(workdir, "answer_key.csv"))
+    sheets = synthetic.generate_sheets(key_rows, params["students"], noise)
+    texts = [text for _, text in sheets]
+
+    # Empty placeholder scans; the fake engine answers by file name
+    scan_dir = os.path.join(workdir, "scans")
+    os.makedirs(scan_dir)
+    scans = []
+    for student, _ in sheets:
+        path = os.path.join(scan_dir, student + ".png")
+        open(path, "wb").close()
+        scans.append(path)
+    set_engine(FakeOCREngine(texts={student: text for student, text in sheets}))
+
+    key = get_answer_key(key_path)
+    parsed = [dict(parse_questions(text)) for text in texts]
+    evaluated = [evaluate_all(answers, key) for answers in parsed]
+
+    def key_load():
+        for _ in range(50):
+            load_answer_key(key_path)
+            clear_answer_key_cache()
+            get_answer_key(key_path)
+
+    def fresh_db(name):
+        results._CONNECTIONS.clear()
+        results.RESULTS_DB = os.path.join(workdir, f"{name}_{time.perf_counter_ns()}.db")
+
+    def save():
+        fresh_db("save")
+        for (student, _), (detailed, total) in zip(sheets, evaluated):
+            results.save_results(student, "bench", total, detailed, "answer_key.csv")
+
+    def end_to_end():
+        fresh_db("e2e")
+        for (student, _), scan in zip(sheets, scans):
+            result = grade_sheet(scan, key)
+            results.save_results(student, "bench", result["total"], result["detailed"], "answer_key.csv")
+
+    stages = [
+        ("key_load", 100, key_load),
+        ("parse", len(texts), lambda: [parse_questions(text) for text in texts]),
+        ("evaluate", len(parsed), lambda: [evaluate_all(answers, key) for answers in parsed]),
+        ("save", len(sheets), save),
+        ("end_to_end", len(sheets), end_to_end),
+    ]
+    out = {}
+    for name, items, fn in stages:
+        seconds = best_of(repeat, fn)
+        out[name] = {"seconds": seconds, "items": items, "us_per_item": seconds / items * 1e6}
+        print(f"  {name:<12} {seconds * 1000:10.1f}ms  {seconds / items * 1e6:10.1f}us/item")
+    return out
+
+def compare(current, baseline, tolerance):
+    """
+    Return the names of stages slower than baseline * (1 + tolerance).
+    """
+    regressions = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = stats["us_per_item"] / base["us_per_item"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"  {name:<12} x{ratio:5.2f} vs baseline  {flag}")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store this run as the baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    print(f"Benchmark size={args.size} {SIZES[args.size]} noise={args.noise}")
+    workdir = tempfile.mkdtemp(prefix="grading-bench-")
+    try:
+        stages = run(args.size, args.noise, args.repeat, workdir)
+    finally:
+        results._CONNECTIONS.clear()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "size": args.size,
+        "params": SIZES[args.size],
+        "noise": args.noise,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stages": stages,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baselines = json.load(f)
+        baselines[args.size] = report
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline for {args.size} written to {args.baseline}")
+        return 0
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get(args.size)
+    if not baseline:
+        # Not a pass: nothing was compared
+        print(f"SKIPPED: no {args.size} baseline in {args.baseline} "
+              f"(run with --update-baseline to store one)")
+        return 2
+    regressions = compare(stages, baseline["stages"], args.tolerance)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
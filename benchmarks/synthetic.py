@@ -0,0 +1,134 @@
+# benchmarks/synthetic.py
+"""
+Synthetic answer keys and OCR-like answer sheets for benchmarks.
+
+    python benchmarks/synthetic.py out_dir [--questions 60] [--students 500] [--noise 0.05]
+
+writes out_dir/answer_key.csv (QID,Question,Answer,Marks,Type) and one
+out_dir/sheets/<student>.txt of OCR-like text per student.
+"""
+import argparse
+import csv
+import os
+import random
+import string
+import sys
+
+# Characters OCR commonly confuses
+OCR_CONFUSIONS = {"e": "c", "c": "e", "l": "1", "1": "l", "o": "0", "0": "o",
+                  "s": "5", "5": "s", "i": "l", "rn": "m", "m": "rn", "b": "h"}
+QID_STYLES = ["Q{n}: {a}", "Q{n}. {a}", "Q.{n} {a}", "{n}. {a}", "{n}) {a}", "q {n} - {a}"]
+OBJECTIVE_CHOICES = ["A", "B", "C", "D", "True", "False"]
+
+def make_vocabulary(rng, size=3000):
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 11))) for _ in range(size)]
+
+def generate_answer_key(n_questions=60, objective_ratio=0.4, keywords=(6, 20), seed=0):
+    """
+    Return answer key rows as dicts with QID, Question, Answer, Marks, Type.
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(rng)
+    rows = []
+    for n in range(1, n_questions + 1):
+        if rng.random() < objective_ratio:
+            answer = rng.choice(OBJECTIVE_CHOICES)
+            qtype, marks = "O", 1
+        else:
+            answer = " ".join(rng.sample(vocab, rng.randint(*keywords)))
+            qtype, marks = "S", rng.choice([2, 3, 5, 10])
+        rows.append({"QID": str(n), "Question": f"Question {n}", "Answer": answer,
+                     "Marks": marks, "Type": qtype})
+    return rows
+
+def write_answer_key(rows, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["QID", "Question", "Answer", "Marks", "Type"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+def add_ocr_noise(text, rng, noise):
+    """
+    Apply character confusions, drops and stray non-ASCII at rate noise.
+    """
+    if noise <= 0:
+        return text
+    out = []
+    i = 0
+    while i < len(text):
+        r = rng.random()
+        two = text[i:i + 2]
+        if r < noise / 3 and two in OCR_CONFUSIONS:
+            out.append(OCR_CONFUSIONS[two])
+            i += 2
+            continue
+        ch = text[i]
+        if r < noise * 2 / 3 and ch in OCR_CONFUSIONS:
+            out.append(OCR_CONFUSIONS[ch])
+        elif r < noise * 0.8:
+            pass  # dropped character
+        elif r < noise:
+            out.append(ch + rng.choice(["’", "“", "•", "é"]))
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+def generate_sheet(key_rows, rng, noise=0.05, skill=None, filler=(0, 30), vocab=None):
+    """
+    OCR-like text for one student: numbered answers in mixed styles, a share
+    of the model answer's words (by skill), filler words, noise and the odd
+    continuation line or blank line.
+    """
+    skill = rng.random() if skill is None else skill
+    vocab = vocab or make_vocabulary(rng, 500)
+    lines = [rng.choice(["Name: student", "ANSWER SHEET", ""])]
+    for row in key_rows:
+        if rng.random() < 0.03:
+            continue  # question left blank
+        if row["Type"] == "O":
+            answer = row["Answer"] if rng.random() < skill else rng.choice(OBJECTIVE_CHOICES)
+        else:
+            words = [w for w in row["Answer"].split() if rng.random() < skill]
+            words += rng.choices(vocab, k=rng.randint(*filler))
+            rng.shuffle(words)
+            answer = " ".join(words)
+        line = rng.choice(QID_STYLES).format(n=row["QID"], a=answer)
+        lines.append(add_ocr_noise(line, rng, noise))
+        if rng.random() < 0.05:
+            lines.append(add_ocr_noise(" ".join(rng.choices(vocab, k=6)), rng, noise))
+        if rng.random() < 0.1:
+            lines.append("")
+    return "\r\n".join(lines) if rng.random() < 0.5 else "\n".join(lines)
+
+def generate_sheets(key_rows, n_students=500, noise=0.05, seed=1):
+    """
+    Return a list of (student name, OCR-like text).
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(rng, 500)
+    return [(f"student_{i:05d}", generate_sheet(key_rows, rng, noise=noise, vocab=vocab))
+            for i in range(n_students)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--objective-ratio", type=float, default=0.4)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.join(args.out_dir, "sheets"), exist_ok=True)
+    rows = generate_answer_key(args.questions, args.objective_ratio, seed=args.seed)
+    write_answer_key(rows, os.path.join(args.out_dir, "answer_key.csv"))
+    for student, text in generate_sheets(rows, args.students, args.noise, seed=args.seed + 1):
+        with open(os.path.join(args.out_dir, "sheets", student + ".txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+    print(f"Wrote a {args.questions}-question key and {args.students} sheets to {args.out_dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
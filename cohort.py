@@ -0,0 +1,122 @@
+# cohort.py
+import logging
+
+import numpy as np
+
+import metrics
+from evaluation import compile_answer_key, evaluate_objective, evaluate_subjective, keyword_score
+from records import QuestionResult
+
+logger = logging.getLogger(__name__)
+
+class CohortResult:
+    """
+    Scores of a whole cohort, question-major: scores is a students x QIDs
+    float array (QIDs in answer key order), totals the per-student totals.
+    Remarks are kept per question column; identical answers share one remark
+    string. detailed(i) rebuilds exactly what evaluate_all returns for
+    student i.
+    """
+
+    def __init__(self, answer_key, qids, answers, scores, remarks, totals):
+        self.answer_key = answer_key
+        self.qids = qids
+        self.answers = answers
+        self.scores = scores
+        self.remarks = remarks
+        self.totals = totals
+
+    def __len__(self):
+        return len(self.totals)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.detailed(i)
+
+    def column(self, qid):
+        return self.scores[:, self.qids.index(qid)]
+
+    def detailed(self, i):
+        """
+        (detailed_results, total_score) for student i, as evaluate_all returns them.
+        """
+        detailed = {}
+        for j, qid in enumerate(self.qids):
+            detailed[qid] = QuestionResult(self.answers[j][i], float(self.scores[i, j]),
+                                           self.remarks[j][i], self.answer_key[qid])
+        return detailed, self.totals[i]
+
+def _score_subjective(answers, correct, marks, keydata):
+    """
+    {answer: (score, remark)} for one subjective question. With exact
+    matching, each answer only needs its count of keywords present (one C
+    substring scan per keyword), and answers with the same count share one
+    score and remark.
+    """
+    keywords = keydata.get("keywords")
+    matcher = keydata.get("matcher")
+    if not keywords or matcher is None or matcher.max_distance:
+        return {ans: evaluate_subjective(ans, correct, marks, keywords, matcher) for ans in answers}
+
+    lowered = matcher.lowered
+    by_count = {}
+    scored = {}
+    for ans in answers:
+        if ans is None or ans.strip() == "":
+            scored[ans] = evaluate_subjective(ans, correct, marks, keywords, matcher)
+            continue
+        count = sum(map(ans.lower().__contains__, lowered))
+        result = by_count.get(count)
+        if result is None:
+            result = by_count[count] = keyword_score(count, keywords, marks)
+        scored[ans] = result
+    return scored
+
+def evaluate_cohort(students, answer_key):
+    """
+    Evaluate every student's answers one question at a time.
+
+    Args:
+        students: list of dicts QID -> answer text (one per student)
+        answer_key: dict QID -> {answer, marks, type}, compiled or not
+
+    Returns:
+        CohortResult whose scores, remarks and totals are identical to
+        calling evaluate_all on each student in turn
+    """
+    with metrics.timer("evaluate_cohort"):
+        return _evaluate_cohort(students, compile_answer_key(answer_key))
+
+def _evaluate_cohort(students, answer_key):
+    qids = list(answer_key)
+    n = len(students)
+    scores = np.zeros((n, len(qids)))
+    answers = []
+    remarks = []
+    # Same float additions in the same (key) order as evaluate_all
+    totals = [0.0] * n
+
+    for j, qid in enumerate(qids):
+        keydata = answer_key[qid]
+        correct = keydata.get("answer", "")
+        marks = keydata.get("marks", 1.0)
+        column = [student.get(qid, "") for student in students]
+
+        # A column holds few distinct answers (objective ones especially),
+        # and scoring depends on nothing else, so each is scored once
+        if keydata.get("type", "S") == "O":
+            answer_lower = keydata.get("answer_lower")
+            scored = {ans: evaluate_objective(ans, correct, marks, answer_lower)
+                      for ans in set(column)}
+        else:
+            scored = _score_subjective(set(column), correct, marks, keydata)
+
+        column_scores = [float(scored[ans][0]) for ans in column]
+        scores[:, j] = column_scores
+        remarks.append([scored[ans][1] for ans in column])
+        answers.append(column)
+        totals = [total + score for total, score in zip(totals, column_scores)]
+
+    logger.info("Evaluated %d students on %d questions", n, len(qids))
+    return CohortResult(answer_key, qids, answers, scores, remarks,
+                        [round(total, 2) for total in totals])
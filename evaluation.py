@@ -1,83 +1,176 @@
 # evaluation.py
 import csv
+import hashlib
+import io
+import logging
 import os
 import re
+import sys
+
+import metrics
+from matcher import KeywordMatcher
+from records import QuestionResult
+
+logger = logging.getLogger(__name__)
+
+# Compiled answer keys keyed by absolute path -> (mtime_ns, size, sha256, AnswerKey)
+_KEY_CACHE = {}
 
 def load_answer_key(file_path):
     """
     Expect CSV with header: QID,Question,Answer,Marks,Type
     Type: O or S (Objective or Subjective)
     """
-    key = {}
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Answer key file not found: {file_path}")
     
     try:
-        with open(file_path, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                qid = row["QID"].strip()
-
-                # Normalize QID format
-                if qid.isdigit():
-                    qid = f"Q{qid}"
-                elif not qid.upper().startswith("Q"):
-                    qid = "Q" + qid
-
-                qid = qid.upper()
-
-                if not qid:
-                    continue
-                
-                answer = (row.get("Answer") or "").strip()
-                marks_raw = row.get("Marks") or row.get("Score") or "1"
-                try:
-                    marks = float(marks_raw)
-                except:
-                    marks = 1.0
-                
-                qtype = (row.get("Type") or "S").strip().upper()
-                # Map common type variations
-                if qtype.startswith("O"):
-                    qtype = "O"
-                elif qtype.startswith("S"):
-                    qtype = "S"
-                else:
-                    qtype = "S"  # Default to subjective
-                
-                key[qid] = {"answer": answer, "marks": marks, "type": qtype}
-        
-        print(f"Loaded {len(key)} questions from answer key")
-        return key
+        with metrics.timer("key_load"), open(file_path, newline='', encoding='utf-8') as f:
+            return _parse_answer_key(f)
     except Exception as e:
-        print(f"Error loading answer key: {e}")
+        logger.error("Error loading answer key: %s", e)
         raise
 
-def evaluate_objective(student_ans, correct_ans, marks):
+def _parse_answer_key(f):
+    key = {}
+    reader = csv.DictReader(f)
+    for row in reader:
+        qid = row["QID"].strip()
+
+        # Normalize QID format
+        if qid.isdigit():
+            qid = f"Q{qid}"
+        elif not qid.upper().startswith("Q"):
+            qid = "Q" + qid
+
+        qid = qid.upper()
+
+        if not qid:
+            continue
+        
+        answer = (row.get("Answer") or "").strip()
+        marks_raw = row.get("Marks") or row.get("Score") or "1"
+        try:
+            marks = float(marks_raw)
+        except:
+            marks = 1.0
+        
+        qtype = (row.get("Type") or "S").strip().upper()
+        # Map common type variations
+        if qtype.startswith("O"):
+            qtype = "O"
+        elif qtype.startswith("S"):
+            qtype = "S"
+        else:
+            qtype = "S"  # Default to subjective
+        
+        key[qid] = {"answer": answer, "marks": marks, "type": qtype}
+
+    logger.info("Loaded %d questions from answer key", len(key))
+    return key
+
+class AnswerKey(dict):
+    """
+    Answer key compiled once for repeated grading.
+    Maps QID -> {answer, marks, type, answer_lower, keywords, matcher} so it can be
+    passed anywhere a plain answer key dict is accepted.
     """
-    Exact match comparison for objective questions
+
+    def __init__(self, key, path=None, content_hash=None):
+        super().__init__()
+        self.path = path
+        self.content_hash = content_hash
+        for qid, keydata in key.items():
+            answer = keydata.get("answer", "")
+            keywords = subjective_keywords(answer)
+            self[qid] = {
+                "answer": answer,
+                "marks": keydata.get("marks", 1.0),
+                "type": keydata.get("type", "S"),
+                "answer_lower": answer.strip().lower(),
+                "keywords": keywords,
+                "matcher": KeywordMatcher(keywords),
+            }
+
+def compile_answer_key(key, path=None, content_hash=None):
+    """
+    Pre-compute the normalized answers and keyword lists for an answer key dict.
+    """
+    if isinstance(key, AnswerKey):
+        return key
+    return AnswerKey(key, path=path, content_hash=content_hash)
+
+def get_answer_key(file_path):
+    """
+    Load and compile an answer key, re-using the cached copy while the file
+    is unchanged (same mtime and size, or same content hash).
+    """
+    path = os.path.abspath(file_path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Answer key file not found: {file_path}")
+
+    cached = _KEY_CACHE.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        metrics.inc("answer_key_cache_total", result="hit")
+        return cached[3]
+
+    with metrics.timer("key_load"):
+        with open(path, "rb") as f:
+            data = f.read()
+        content_hash = hashlib.sha256(data).hexdigest()
+
+        if cached and cached[2] == content_hash:
+            metrics.inc("answer_key_cache_total", result="hit")
+            key = cached[3]
+        else:
+            metrics.inc("answer_key_cache_total", result="miss")
+            try:
+                text = data.decode("utf-8")
+                key = compile_answer_key(_parse_answer_key(io.StringIO(text, newline="")),
+                                         path=path, content_hash=content_hash)
+            except Exception as e:
+                logger.error("Error loading answer key: %s", e)
+                raise
+
+    _KEY_CACHE[path] = (st.st_mtime_ns, st.st_size, content_hash, key)
+    return key
+
+def clear_answer_key_cache():
+    _KEY_CACHE.clear()
+
+def evaluate_objective(student_ans, correct_ans, marks, correct_normalized=None):
+    """
+    Exact match comparison for objective questions.
+    correct_normalized can be passed in from a compiled answer key.
     """
     if student_ans is None:
         student_ans = ""
     
     # Normalize both answers for comparison
     student_normalized = student_ans.strip().lower()
-    correct_normalized = correct_ans.strip().lower()
+    if correct_normalized is None:
+        correct_normalized = correct_ans.strip().lower()
     
     if student_normalized == correct_normalized:
         return marks, "Correct"
     else:
         return 0.0, f"Incorrect (Expected: {correct_ans})"
 
-def evaluate_subjective(student_ans, correct_ans, marks):
+def evaluate_subjective(student_ans, correct_ans, marks, keywords=None, matcher=None):
     """
     Keyword-based matching for subjective questions.
     Awards proportional marks based on keyword presence.
+    keywords/matcher can be passed in from a compiled answer key.
     """
     if student_ans is None or student_ans.strip() == "":
         return 0.0, "No answer provided"
     
-    keywords = [k for k in re_split_keywords(correct_ans) if k and len(k) > 2]
+    if matcher is not None:
+        keywords = matcher.keywords
+    elif keywords is None:
+        keywords = subjective_keywords(correct_ans)
     
     if not keywords:
         # If no valid keywords, give full marks if student wrote something
@@ -85,29 +178,42 @@ def evaluate_subjective(student_ans, correct_ans, marks):
             return marks, "Answer provided (no keywords to match)"
         return 0.0, "No answer or keywords"
     
-    student_lower = student_ans.lower()
-    matched_keywords = []
-    
-    for kw in keywords:
-        if kw.lower() in student_lower:
-            matched_keywords.append(kw)
+    if matcher is None:
+        matcher = KeywordMatcher(keywords)
+    matched_keywords, fuzzy = matcher.match(student_ans)
+    score, remark = keyword_score(len(matched_keywords), keywords, marks)
+
+    if fuzzy:
+        remark += " (fuzzy: " + ", ".join(f"{word}~{kw}" for kw, word in fuzzy.items()) + ")"
     
+    return score, remark
+
+def keyword_score(matched, keywords, marks):
+    """
+    Score and remark for matched out of len(keywords) keywords present.
+    """
     # Calculate score based on matched keywords
-    score = (len(matched_keywords) / len(keywords)) * marks
+    score = (matched / len(keywords)) * marks
     score = round(score, 2)
     
     # Generate remark
     if score == marks:
         remark = "Excellent - All keywords present"
     elif score >= marks * 0.7:
-        remark = f"Good - Matched {len(matched_keywords)}/{len(keywords)} keywords"
+        remark = f"Good - Matched {matched}/{len(keywords)} keywords"
     elif score > 0:
-        remark = f"Partial - Matched {len(matched_keywords)}/{len(keywords)} keywords"
+        remark = f"Partial - Matched {matched}/{len(keywords)} keywords"
     else:
         remark = f"Insufficient - Expected keywords: {', '.join(keywords[:5])}"
     
     return score, remark
 
+def subjective_keywords(correct_ans):
+    """
+    Keywords a subjective answer is scored against
+    """
+    return [k for k in re_split_keywords(correct_ans) if k and len(k) > 2]
+
 def re_split_keywords(text):
     """
     Split text into meaningful keywords
@@ -128,14 +234,21 @@ def evaluate_all(student_answers, answer_key):
         answer_key: dict QID -> {answer, marks, type}
     
     Returns:
-        detailed_results: dict with per-question results
+        detailed_results: dict QID -> QuestionResult (a read-only mapping
+            with StudentAnswer, Score, Marks, Remark, CorrectAnswer, Type)
         total_score: float total score achieved
     """
+    with metrics.timer("evaluate"):
+        return _evaluate_all(student_answers, answer_key)
+
+def _evaluate_all(student_answers, answer_key):
     detailed = {}
     total_score = 0.0
+    # Checked once so the per-question logging costs nothing when disabled
+    debug = logger.isEnabledFor(logging.DEBUG)
     
-    print(f"\nEvaluating {len(answer_key)} questions...")
-    print(f"Student provided answers for {len(student_answers)} questions")
+    logger.info("Evaluating %d questions (student answered %d)",
+                len(answer_key), len(student_answers))
     
     for qid, keydata in answer_key.items():
         correct = keydata.get("answer", "")
@@ -144,25 +257,25 @@ def evaluate_all(student_answers, answer_key):
         
         student_ans = student_answers.get(qid, "")
         
-        print(f"\n{qid}: Type={qtype}, Marks={marks}")
-        print(f"  Expected: {correct}")
-        print(f"  Student:  {student_ans}")
+        if debug:
+            logger.debug("%s: Type=%s, Marks=%s | Expected: %s | Student: %s",
+                         qid, qtype, marks, correct, student_ans)
         
         if qtype == "O":
-            score, remark = evaluate_objective(student_ans, correct, marks)
+            score, remark = evaluate_objective(student_ans, correct, marks,
+                                               keydata.get("answer_lower"))
         else:
-            score, remark = evaluate_subjective(student_ans, correct, marks)
+            score, remark = evaluate_subjective(student_ans, correct, marks,
+                                                keydata.get("keywords"),
+                                                keydata.get("matcher"))
         
-        print(f"  Result: {score}/{marks} - {remark}")
+        if debug:
+            logger.debug("%s: Result %s/%s - %s", qid, score, marks, remark)
         
-        detailed[qid] = {
-            "StudentAnswer": student_ans,
-            "Score": float(score),
-            "Marks": float(marks),
-            "Remark": remark,
-            "CorrectAnswer": correct,
-            "Type": qtype
-        }
+        if qtype == "O" and isinstance(student_ans, str):
+            # Objective answers repeat across a cohort ("A", "True", ...)
+            student_ans = sys.intern(student_ans)
+        detailed[qid] = QuestionResult(student_ans, float(score), remark, keydata)
         total_score += float(score)
     
     return detailed, round(total_score, 2)
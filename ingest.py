@@ -0,0 +1,248 @@
+# ingest.py
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from ocr_cache import get_cache, file_digest, cache_key
+from ocr_engines import get_engine
+from preprocess import GEOMETRY_STEPS, parse_steps, preprocess_image, describe
+from sheet_template import format_answers
+from textextraction import extract_text_from_image
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_EXTENSIONS = (".pdf", ".tif", ".tiff")
+PDF_DPI = 300
+
+# OCR threads for one booklet's pages or one sheet's boxes when the caller
+# does not pass workers: $OCR_THREADS, else the CPU count. batch.py and
+# server.py lower it in their pool processes so they do not each start a
+# thread per CPU.
+OCR_THREADS_ENV = "OCR_THREADS"
+_THREAD_BUDGET = None
+
+def set_thread_budget(threads):
+    global _THREAD_BUDGET
+    _THREAD_BUDGET = threads
+
+def share_of_cpus(processes):
+    """
+    Thread budget for each of processes OCR processes on this machine.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, processes))
+
+def default_workers(tasks):
+    """
+    Threads for tasks parallel OCR calls within the thread budget.
+    """
+    budget = _THREAD_BUDGET
+    if budget is None:
+        try:
+            budget = int(os.environ.get(OCR_THREADS_ENV, "0"))
+        except ValueError:
+            budget = 0
+    return max(1, min(tasks, budget or os.cpu_count() or 1))
+
+def is_pdf(path):
+    return path.lower().endswith(".pdf")
+
+def page_count(path):
+    """
+    Number of pages in a PDF, or frames in a TIFF/image.
+    """
+    if is_pdf(path):
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(path)["Pages"])
+    from PIL import Image
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+def load_page(path, index, dpi=PDF_DPI):
+    """
+    Decode one page (0-based). Only that page is rendered or read into memory.
+    """
+    if is_pdf(path):
+        from pdf2image import convert_from_path
+        return convert_from_path(path, dpi=dpi, first_page=index + 1, last_page=index + 1)[0]
+    from PIL import Image
+    with Image.open(path) as img:
+        img.seek(index)
+        return img.copy()
+
+def iter_pages(path, dpi=PDF_DPI):
+    """
+    Yield the pages of a booklet one at a time.
+    """
+    for index in range(page_count(path)):
+        yield load_page(path, index, dpi)
+
+def is_multipage(path):
+    if not path.lower().endswith(DOCUMENT_EXTENSIONS):
+        return False
+    if is_pdf(path):
+        return True
+    try:
+        return page_count(path) > 1
+    except Exception:
+        return False
+
+def _ocr_page(path, index, key, cache, engine, steps, psm, lang):
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.inc("ocr_cache_total", result="hit")
+            return cached
+        metrics.inc("ocr_cache_total", result="miss")
+    with metrics.timer("image_load"):
+        page = load_page(path, index)
+    if steps:
+        page, timings = preprocess_image(page, steps)
+        for name, seconds in timings.items():
+            metrics.observe(metrics.STAGE_METRIC, seconds, stage=f"preprocess_{name}")
+    with metrics.timer("ocr"):
+        text = engine.image_to_string(page, psm=psm, lang=lang)
+    if cache is not None:
+        cache.put(key, text)
+    return text
+
+def extract_text_from_document(path, psm=6, lang="eng", use_cache=True, engine=None,
+                               preprocess=None, workers=None):
+    """
+    OCR a multi-page PDF/TIFF booklet, pages in parallel, and return the page
+    texts merged in page order (so it can go straight to clean_text and
+    split_questions). At most 2 x workers pages are decoded at any time,
+    however many pages the booklet has.
+    """
+    if not os.path.exists(path):
+        logger.error("Document not found: %s", path)
+        return ""
+
+    try:
+        engine = engine or get_engine()
+    except Exception as e:
+        logger.error("OCR engine error: %s", e)
+        return ""
+    if not engine.needs_image:
+        # Fixture-driven engines answer for the whole file
+        return extract_text_from_image(path, psm=psm, lang=lang, use_cache=use_cache, engine=engine)
+
+    try:
+        pages = page_count(path)
+    except Exception as e:
+        logger.error("Error opening %s: %s", path, e)
+        return ""
+
+    steps = parse_steps(preprocess)
+    cache = get_cache() if use_cache else None
+    digest = file_digest(path) if cache is not None else None
+    workers = workers or default_workers(pages)
+    window = 2 * workers
+
+    logger.info("Document loaded: %d page(s), OCR with %d thread(s)", pages, workers)
+    texts = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            for index in range(pages):
+                key = None
+                if cache is not None:
+                    key = cache_key(digest, psm, lang, engine.version(),
+                                    f"{describe(steps)}#page{index}")
+                in_flight.append(pool.submit(_ocr_page, path, index, key, cache,
+                                             engine, steps, psm, lang))
+                if len(in_flight) >= window:
+                    texts.append(in_flight.popleft().result())
+            while in_flight:
+                texts.append(in_flight.popleft().result())
+    except Exception as e:
+        logger.error("OCR error: %s", e)
+        logger.error("Make sure Tesseract-OCR is installed and path is configured correctly")
+        return ""
+
+    raw = "\n".join(texts)
+    logger.info("OCR extracted %d characters from %d page(s)", len(raw), pages)
+    return raw
+
+def _ocr_region(engine, qid, psm, region, lang):
+    with metrics.timer("ocr"):
+        return qid, engine.image_to_string(region, psm=psm, lang=lang)
+
+def extract_text_from_regions(path, template, lang="eng", use_cache=True, engine=None,
+                              preprocess=None, workers=None):
+    """
+    OCR only the answer boxes of a sheet template (sheet_template.SheetTemplate):
+    each page is preprocessed once, every box on it is cropped and OCRed in
+    parallel with the box's page segmentation mode, and the texts come back
+    as one "QID: answer" line per box (sheet_template.format_answers).
+    Border cropping and deskewing move the page content, so they are skipped
+    to keep the boxes aligned.
+    """
+    if not os.path.exists(path):
+        logger.error("Image file not found: %s", path)
+        return ""
+
+    try:
+        engine = engine or get_engine()
+    except Exception as e:
+        logger.error("OCR engine error: %s", e)
+        return ""
+
+    steps = tuple(step for step in parse_steps(preprocess) if step not in GEOMETRY_STEPS)
+    cache = get_cache() if use_cache else None
+    key = None
+    if cache is not None:
+        key = cache_key(file_digest(path), "regions", lang, engine.version(),
+                        f"{describe(steps)}#template-{template.digest[:16]}")
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.inc("ocr_cache_total", result="hit")
+            logger.info("OCR cache hit: %d characters", len(cached))
+            return cached
+        metrics.inc("ocr_cache_total", result="miss")
+
+    answers = dict.fromkeys(template.qids(), "")
+    workers = workers or default_workers(len(answers))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # One decoded page at a time; its boxes are OCRed concurrently
+            for page_index in template.pages:
+                with metrics.timer("image_load"):
+                    page = load_page(path, page_index)
+                if steps:
+                    page, timings = preprocess_image(page, steps)
+                    for name, seconds in timings.items():
+                        metrics.observe(metrics.STAGE_METRIC, seconds, stage=f"preprocess_{name}")
+                futures = [pool.submit(_ocr_region, engine, qid, psm, region, lang)
+                           for qid, psm, region in template.crop_regions(page, page_index)]
+                for future in futures:
+                    qid, text = future.result()
+                    answers[qid] = text
+    except Exception as e:
+        logger.error("OCR error: %s", e)
+        logger.error("Make sure Tesseract-OCR is installed and path is configured correctly")
+        return ""
+
+    raw = format_answers(answers)
+    logger.info("OCR extracted %d characters from %d region(s)", len(raw), len(answers))
+    if cache is not None:
+        cache.put(key, raw)
+    return raw
+
+def extract_text(path, psm=6, lang="eng", use_cache=True, engine=None, preprocess=None,
+                 template=None):
+    """
+    OCR a scan of any supported kind: with a sheet template only its answer
+    boxes are read (extract_text_from_regions); otherwise single images go
+    through extract_text_from_image, multi-page PDFs/TIFFs through
+    extract_text_from_document.
+    """
+    if template is not None:
+        return extract_text_from_regions(path, template, lang=lang, use_cache=use_cache,
+                                         engine=engine, preprocess=preprocess)
+    if is_multipage(path):
+        return extract_text_from_document(path, psm=psm, lang=lang, use_cache=use_cache,
+                                          engine=engine, preprocess=preprocess)
+    return extract_text_from_image(path, psm=psm, lang=lang, use_cache=use_cache,
+                                   engine=engine, preprocess=preprocess)
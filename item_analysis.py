@@ -0,0 +1,206 @@
+# item_analysis.py
+import argparse
+import csv
+import logging
+import operator
+import os
+import sys
+from itertools import repeat
+
+import numpy as np
+
+from evaluation import get_answer_key, subjective_keywords
+from results import ANSWER_KEYS_DIR, connect
+
+logger = logging.getLogger(__name__)
+
+# Share of students in each of the upper and lower groups for discrimination
+GROUP_FRACTION = 0.27
+FETCH_ROWS = 50000
+REPORT_COLUMNS = ["QID", "Type", "Marks", "Students", "Mean", "StdDev", "Difficulty",
+                  "Discrimination", "PointBiserial", "FullMarks", "Zero"]
+
+class ScoreMatrix:
+    """
+    students x questions matrix of per-question scores for one answer key,
+    rows in result ID order and columns in answer key order.
+    """
+
+    def __init__(self, answer_key, result_ids, qids, types, marks, scores):
+        self.answer_key = answer_key
+        self.result_ids = result_ids
+        self.qids = qids
+        self.types = types
+        self.marks = marks
+        self.scores = scores
+
+    @property
+    def totals(self):
+        return self.scores.sum(axis=1)
+
+def load_score_matrix(answer_key, db_path=None):
+    """
+    Build the score matrix from the stored detail rows, streamed in chunks
+    straight into one preallocated array (no per-row Python objects kept).
+    """
+    conn = connect(db_path)
+    result_ids = np.fromiter((row[0] for row in conn.execute(
+        "SELECT id FROM results WHERE answer_key = ? ORDER BY id", (answer_key,))), dtype=np.int64)
+    # Columns as the latest result has them (a primary key range read);
+    # QIDs only older results have are added as they turn up
+    columns = conn.execute(
+        "SELECT qid, type, marks FROM details WHERE answer_key = ? AND result_id = ? ORDER BY seq",
+        (answer_key, int(result_ids[-1]) if len(result_ids) else -1)).fetchall()
+    qids = [qid for qid, _, _ in columns]
+    types = [qtype or "S" for _, qtype, _ in columns]
+    marks = [m for _, _, m in columns]
+    column_of = {qid: j for j, qid in enumerate(qids)}
+    scores = np.zeros((len(result_ids), len(qids)), dtype=np.float64)
+
+    cur = conn.execute("SELECT result_id, qid, score FROM details WHERE answer_key = ?", (answer_key,))
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        ids, qs, values = zip(*rows)
+        for q in set(qs).difference(column_of):
+            qtype, m = conn.execute(
+                "SELECT type, MAX(marks) FROM details WHERE answer_key = ? AND qid = ?",
+                (answer_key, q)).fetchone()
+            column_of[q] = len(qids)
+            qids.append(q)
+            types.append(qtype or "S")
+            marks.append(m)
+        if scores.shape[1] < len(qids):
+            scores = np.pad(scores, ((0, 0), (0, len(qids) - scores.shape[1])))
+        rows_idx = np.searchsorted(result_ids, np.fromiter(ids, dtype=np.int64, count=len(ids)))
+        cols_idx = np.fromiter(map(column_of.__getitem__, qs), dtype=np.int64, count=len(qs))
+        scores[rows_idx, cols_idx] = values
+
+    logger.info("Loaded %d students x %d questions for %s", len(result_ids), len(qids), answer_key)
+    return ScoreMatrix(answer_key, result_ids, qids, types, np.array(marks, dtype=np.float64), scores)
+
+def item_statistics(scores, marks, group_fraction=GROUP_FRACTION):
+    """
+    Per-question statistics of a students x questions score matrix, all
+    computed column-wise at once:
+      Difficulty      mean score / marks (share of marks earned; higher is easier)
+      Discrimination  difficulty in the top group by total minus the bottom group
+      PointBiserial   correlation of the item with the total of the other items
+    Returns a dict of arrays, one value per question.
+    """
+    n, q = scores.shape
+    safe_marks = np.where(marks > 0, marks, 1.0)
+    mean = scores.mean(axis=0) if n else np.zeros(q)
+    std = scores.std(axis=0) if n else np.zeros(q)
+    totals = scores.sum(axis=1)
+
+    k = max(1, int(round(n * group_fraction))) if n else 0
+    if n >= 2:
+        order = np.argsort(totals, kind="stable")
+        lower = scores[order[:k]].mean(axis=0)
+        upper = scores[order[-k:]].mean(axis=0)
+        discrimination = (upper - lower) / safe_marks
+    else:
+        discrimination = np.full(q, np.nan)
+
+    # Corrected item-total correlation: the item itself is left out of the
+    # total, via cov(x, T - x) = cov(x, T) - var(x), so no rest-of-test
+    # matrix is materialised
+    var_item = std ** 2
+    var_total = totals.var() if n else 0.0
+    cov_total = ((totals - totals.mean()) @ scores) / n if n else np.zeros(q)
+    cov_rest = cov_total - var_item
+    var_rest = var_total + var_item - 2 * cov_total
+    denom = np.sqrt(np.clip(var_item * var_rest, 0, None))
+    point_biserial = np.divide(cov_rest, denom, out=np.full(q, np.nan), where=denom > 1e-12)
+
+    return {
+        "Mean": mean,
+        "StdDev": std,
+        "Difficulty": mean / safe_marks,
+        "Discrimination": discrimination,
+        "PointBiserial": point_biserial,
+        "FullMarks": (scores >= marks).mean(axis=0) if n else np.zeros(q),
+        "Zero": (scores <= 0).mean(axis=0) if n else np.zeros(q),
+    }
+
+def keyword_hit_rates(answer_key, key_path, qids=None, db_path=None):
+    """
+    {QID: {keyword: share of students whose answer contains it}} for the
+    subjective questions of a stored answer key, from the saved answers.
+    """
+    key = get_answer_key(key_path)
+    conn = connect(db_path)
+    rates = {}
+    for qid, keydata in key.items():
+        if keydata["type"] != "S" or (qids and qid not in qids):
+            continue
+        keywords = keydata.get("keywords") or subjective_keywords(keydata["answer"])
+        if not keywords:
+            continue
+        texts = [(answer or "").lower() for (answer,) in conn.execute(
+            "SELECT student_answer FROM details WHERE answer_key = ? AND qid = ?", (answer_key, qid))]
+        if not texts:
+            continue
+        # One C-level substring scan per keyword over the whole column
+        rates[qid] = {kw: sum(map(operator.contains, texts, repeat(kw))) / len(texts)
+                      for kw in dict.fromkeys(kw.lower() for kw in keywords)}
+    return rates
+
+def item_analysis(answer_key, db_path=None):
+    """
+    Item analysis report for one stored answer key: one dict per question
+    with REPORT_COLUMNS, or None if the key has no results.
+    """
+    matrix = load_score_matrix(answer_key, db_path)
+    if not len(matrix.result_ids):
+        return None
+    stats = item_statistics(matrix.scores, matrix.marks)
+    report = []
+    for j, qid in enumerate(matrix.qids):
+        row = {"QID": qid, "Type": matrix.types[j], "Marks": float(matrix.marks[j]),
+               "Students": len(matrix.result_ids)}
+        for name, values in stats.items():
+            row[name] = round(float(values[j]), 3)
+        report.append(row)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-question item analysis of a graded cohort.")
+    parser.add_argument("answer_key", help="Answer key name in the results database")
+    parser.add_argument("--out", default=None, help="Write the report to this CSV")
+    parser.add_argument("--keywords", action="store_true",
+                        help="Also report keyword hit rates (needs the stored answer key file)")
+    args = parser.parse_args(argv)
+
+    report = item_analysis(args.answer_key)
+    if report is None:
+        print(f"No results for {args.answer_key}")
+        return 1
+
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(report)
+        print(f"Wrote {len(report)} questions to {args.out}")
+    else:
+        print(f"{'QID':<8}{'Type':<5}{'Marks':>6}{'Diff':>7}{'Disc':>7}{'r_pb':>7}{'Full':>7}{'Zero':>7}")
+        for row in report:
+            print(f"{row['QID']:<8}{row['Type']:<5}{row['Marks']:>6g}{row['Difficulty']:>7.2f}"
+                  f"{row['Discrimination']:>7.2f}{row['PointBiserial']:>7.2f}"
+                  f"{row['FullMarks']:>7.2f}{row['Zero']:>7.2f}")
+
+    if args.keywords:
+        key_path = os.path.join(ANSWER_KEYS_DIR, args.answer_key)
+        if not os.path.exists(key_path):
+            print(f"Answer key file not found: {key_path}")
+            return 1
+        for qid, rates in keyword_hit_rates(args.answer_key, key_path).items():
+            print(f"{qid}: " + ", ".join(f"{kw} {rate:.0%}" for kw, rate in
+                                         sorted(rates.items(), key=lambda item: -item[1])))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
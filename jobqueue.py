@@ -0,0 +1,310 @@
+# jobqueue.py
+import argparse
+import os
+import socket
+import sqlite3
+import sys
+import time
+
+from utils import configure_sqlite
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+JOBS_DB = os.path.join(DATA_DIR, "jobs.db")
+
+# Priority lanes: higher is claimed first
+PRIORITY_NORMAL = 0
+PRIORITY_URGENT = 10
+PRIORITIES = {"normal": PRIORITY_NORMAL, "urgent": PRIORITY_URGENT}
+
+# Sheet stages, in order
+QUEUED = "queued"
+RUNNING = "running"
+OCR_DONE = "ocr_done"
+DONE = "done"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 3
+# Seconds a worker may hold a claimed sheet without renewing its lease
+DEFAULT_LEASE = 60
+SCHEMA_VERSION = 3
+
+def worker_name():
+    """
+    Identifies one worker process across hosts sharing a journal.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def result_source(row):
+    """
+    Idempotency key of a claimed sheet's result (results.save_results
+    source): the same sheet of the same run saves at most one result, however
+    often it is claimed after a crash or a lost lease, until it is queued
+    for a re-grade.
+    """
+    return f"{row['run']}|{row['image_path']}#{row['regrades']}"
+
+class JobJournal:
+    """
+    Persistent record of every sheet in a grading run and how far it got.
+    A sheet moves queued -> running -> done (or failed); the raw OCR text is
+    kept as soon as it exists, so a restarted run skips finished sheets and
+    does not OCR the same sheet twice.
+    Sheets claimed with a lease belong to that worker until the lease
+    expires; a worker that dies stops renewing it and its sheets are
+    reclaimed by the others.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or JOBS_DB
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        configure_sqlite(self.conn)
+        self._migrate()
+
+    def _migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            with self.conn:
+                self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS sheets (
+                    id INTEGER PRIMARY KEY,
+                    run TEXT NOT NULL,
+                    image_path TEXT NOT NULL,
+                    student TEXT NOT NULL,
+                    answer_key_path TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    stage TEXT NOT NULL DEFAULT 'queued',
+                    raw_text TEXT,
+                    total REAL,
+                    result_id INTEGER,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    UNIQUE (run, image_path)
+                )""")
+                self.conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_sheets_pending ON sheets (run, stage, priority DESC, id)")
+                self.conn.execute("PRAGMA user_version = 1")
+        if version < 2:
+            with self.conn:
+                self.conn.execute("ALTER TABLE sheets ADD COLUMN worker TEXT")
+                self.conn.execute("ALTER TABLE sheets ADD COLUMN lease_expires REAL")
+                self.conn.execute("ALTER TABLE sheets ADD COLUMN evaluator TEXT")
+                self.conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_sheets_lease ON sheets (stage, lease_expires)")
+                self.conn.execute("PRAGMA user_version = 2")
+        if version < 3:
+            with self.conn:
+                # Bumped when a finished sheet is queued again, so its new
+                # result gets a new result_source
+                self.conn.execute("ALTER TABLE sheets ADD COLUMN regrades INTEGER NOT NULL DEFAULT 0")
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, run, sheets, answer_key_path, priority=PRIORITY_NORMAL, evaluator=None):
+        """
+        Add (image_path, student) pairs to a run. Sheets already in the run
+        keep their progress; only their priority can go up.
+        Returns the number of newly added sheets.
+        """
+        now = time.time()
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO sheets (run, image_path, student, answer_key_path, priority, "
+                "evaluator, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run, image, student, answer_key_path, priority, evaluator, now, now)
+                 for image, student in sheets])
+            added = self.conn.total_changes - before
+            self.conn.executemany(
+                "UPDATE sheets SET priority = ? WHERE run = ? AND image_path = ? AND priority < ?",
+                [(priority, run, image, priority) for image, _ in sheets])
+        return added
+
+    def prioritize(self, run, image_paths, priority=PRIORITY_URGENT):
+        """
+        Move sheets to a higher lane; finished sheets are queued again
+        (an urgent re-grade).
+        """
+        with self.conn:
+            cur = self.conn.executemany(
+                "UPDATE sheets SET priority = ?, updated = ?, attempts = 0, "
+                "regrades = regrades + (stage = 'done'), "
+                "stage = CASE WHEN stage IN ('done', 'failed') THEN 'queued' ELSE stage END "
+                "WHERE run = ? AND image_path = ?",
+                [(priority, time.time(), run, path) for path in image_paths])
+        return cur.rowcount
+
+    def recover(self, run):
+        """
+        After a crash: put sheets left running back in the queue and give
+        failed sheets another try while they have attempts left. Sheets
+        leased by live workers are left alone.
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE sheets SET worker = NULL, lease_expires = NULL, "
+                "stage = CASE WHEN raw_text IS NULL THEN 'queued' ELSE 'ocr_done' END "
+                "WHERE run = ? AND ((stage = 'running' AND (lease_expires IS NULL OR lease_expires < ?)) "
+                "OR (stage = 'failed' AND attempts < ?))",
+                (run, time.time(), MAX_ATTEMPTS))
+
+    def reclaim_expired(self, run=None):
+        """
+        Queue again the sheets whose worker stopped renewing its lease;
+        sheets out of attempts are marked failed instead.
+        Returns the number of sheets reclaimed.
+        """
+        where = "stage = 'running' AND lease_expires < ?"
+        params = [time.time()]
+        if run is not None:
+            where += " AND run = ?"
+            params.append(run)
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE sheets SET stage = 'failed', error = 'lease expired', worker = NULL, "
+                f"lease_expires = NULL WHERE {where} AND attempts >= ?", params + [MAX_ATTEMPTS])
+            cur = self.conn.execute(
+                f"UPDATE sheets SET worker = NULL, lease_expires = NULL, "
+                f"stage = CASE WHEN raw_text IS NULL THEN 'queued' ELSE 'ocr_done' END "
+                f"WHERE {where}", params)
+        return cur.rowcount
+
+    def claim(self, run, limit, worker=None, lease=None):
+        """
+        Take up to limit pending sheets (of one run, or of any run when run
+        is None), highest priority first, and mark them running. With a
+        lease, the sheets belong to worker for that many seconds unless
+        renewed with heartbeat(). Safe to call from several processes or
+        hosts at once: the select and update happen under one write lock.
+        """
+        where = "stage IN ('queued', 'ocr_done')"
+        params = []
+        if run is not None:
+            where += " AND run = ?"
+            params.append(run)
+        now = time.time()
+        expires = now + lease if lease else None
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                f"SELECT * FROM sheets WHERE {where} ORDER BY priority DESC, id LIMIT ?",
+                params + [limit]).fetchall()
+            self.conn.executemany(
+                "UPDATE sheets SET stage = 'running', attempts = attempts + 1, worker = ?, "
+                "lease_expires = ?, updated = ? WHERE id = ?",
+                [(worker, expires, now, row["id"]) for row in rows])
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return rows
+
+    def heartbeat(self, worker, sheet_ids, lease=DEFAULT_LEASE):
+        """
+        Renew worker's lease on the sheets it is still grading. Returns the
+        IDs it still holds; a sheet missing from the result was reclaimed
+        and its outcome must not be recorded.
+        """
+        if not sheet_ids:
+            return set()
+        now = time.time()
+        held = set()
+        with self.conn:
+            for sheet_id in sheet_ids:
+                cur = self.conn.execute(
+                    "UPDATE sheets SET lease_expires = ?, updated = ? "
+                    "WHERE id = ? AND worker = ? AND stage = 'running'",
+                    (now + lease, now, sheet_id, worker))
+                if cur.rowcount:
+                    held.add(sheet_id)
+        return held
+
+    def holds(self, sheet_id, worker):
+        row = self.conn.execute("SELECT 1 FROM sheets WHERE id = ? AND worker = ? AND stage = 'running'",
+                                (sheet_id, worker)).fetchone()
+        return row is not None
+
+    def record_ocr(self, sheet_id, raw_text):
+        with self.conn:
+            self.conn.execute("UPDATE sheets SET raw_text = ?, updated = ? WHERE id = ?",
+                              (raw_text, time.time(), sheet_id))
+
+    def record_done(self, sheet_id, total, result_id, worker=None):
+        """
+        Mark a sheet graded. With worker, only while that worker still
+        holds it; returns whether the sheet was updated.
+        """
+        return self._finish(sheet_id, worker, "stage = 'done', total = ?, result_id = ?, error = NULL",
+                            (total, result_id))
+
+    def record_failed(self, sheet_id, error, worker=None):
+        return self._finish(sheet_id, worker, "stage = 'failed', error = ?", (error,))
+
+    def _finish(self, sheet_id, worker, assignments, values):
+        sql = (f"UPDATE sheets SET {assignments}, worker = NULL, lease_expires = NULL, updated = ? "
+               f"WHERE id = ?")
+        params = list(values) + [time.time(), sheet_id]
+        if worker is not None:
+            sql += " AND worker = ? AND stage = 'running'"
+            params.append(worker)
+        with self.conn:
+            cur = self.conn.execute(sql, params)
+        return cur.rowcount > 0
+
+    def workers(self):
+        """
+        {worker: sheets held} for workers with a live lease.
+        """
+        return dict(self.conn.execute(
+            "SELECT worker, COUNT(*) FROM sheets WHERE stage = 'running' AND worker IS NOT NULL "
+            "AND lease_expires >= ? GROUP BY worker", (time.time(),)).fetchall())
+
+    def pending(self, run):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM sheets WHERE run = ? AND stage IN ('queued', 'ocr_done')",
+            (run,)).fetchone()[0]
+
+    def counts(self, run=None):
+        """
+        {stage: count} for one run, or for every run.
+        """
+        if run is None:
+            rows = self.conn.execute("SELECT stage, COUNT(*) FROM sheets GROUP BY stage")
+        else:
+            rows = self.conn.execute("SELECT stage, COUNT(*) FROM sheets WHERE run = ? GROUP BY stage",
+                                     (run,))
+        return dict(rows.fetchall())
+
+    def runs(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT run FROM sheets ORDER BY run")]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grading job journal.")
+    parser.add_argument("--journal", default=None, help="Journal database (default: data/jobs.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    status = sub.add_parser("status", help="Show sheet counts per stage")
+    status.add_argument("run", nargs="?", default=None)
+    urgent = sub.add_parser("prioritize", help="Move sheets of a run to the urgent lane (re-grade)")
+    urgent.add_argument("run")
+    urgent.add_argument("images", nargs="+")
+    args = parser.parse_args(argv)
+
+    journal = JobJournal(args.journal)
+    if args.command == "status":
+        for run in ([args.run] if args.run else journal.runs()):
+            counts = journal.counts(run)
+            print(f"{run}: " + ", ".join(f"{stage} {n}" for stage, n in sorted(counts.items())))
+        for worker, held in sorted(journal.workers().items()):
+            print(f"worker {worker}: {held} sheet(s) leased")
+    elif args.command == "prioritize":
+        images = [os.path.abspath(path) for path in args.images]
+        print(f"Moved {journal.prioritize(args.run, images)} sheet(s) to the urgent lane")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,42 +2,44 @@
 import os
 import sys
 import re
-from textextraction import extract_text_from_image, clean_text, split_questions
-from evaluation import load_answer_key, evaluate_all
-from results import save_results, list_answer_keys, class_analysis
-from utils import ensure_dirs, copy_answer_key_to_store
+import metrics
+from textextraction import parse_questions
+from ingest import extract_text
+from sheet_template import template_for_key
+from evaluation import get_answer_key, evaluate_all
+from results import save_results, class_analysis, graded_answer_keys
+from utils import ensure_dirs, configure_logging
+import registry
 
 def pause():
     input("\nPress Enter to continue...")
 
 def choose_answer_key():
     """
-    Let user choose from available answer keys
+    Let user choose from available answer keys, by number or key ID
     """
-    keys = list_answer_keys()
+    keys = registry.list_keys()
     if not keys:
         print("\n❌ No answer keys uploaded yet.")
         print("Please upload an answer key first (Option 1 from main menu)")
         return None
     
     print("\n📋 Available answer keys:")
-    for i, k in enumerate(keys, 1):
-        print(f"  {i}. {k}")
+    for i, entry in enumerate(keys, 1):
+        print(f"  {i}. {registry.format_entry(entry)}")
     
-    choice = input("\nChoose by number (or 0 to cancel): ").strip()
-    try:
-        if choice == "0":
-            return None
-        idx = int(choice) - 1
-        if idx < 0 or idx >= len(keys):
-            print("Invalid choice.")
-            return None
-        
-        answer_key_path = os.path.join(os.path.dirname(__file__), "data", "answer_keys", keys[idx])
-        return answer_key_path, keys[idx]
-    except ValueError:
-        print("Invalid input. Please enter a number.")
+    choice = input("\nChoose by number or key ID (or 0 to cancel): ").strip()
+    if choice == "0":
+        return None
+    entry = None
+    if choice.isdigit() and 1 <= int(choice) <= len(keys):
+        entry = keys[int(choice) - 1]
+    else:
+        entry = registry.get_key(choice)
+    if entry is None:
+        print("Invalid choice.")
         return None
+    return registry.key_path(entry), entry["name"]
 
 def upload_answer_key_flow():
     """
@@ -59,9 +61,13 @@ def upload_answer_key_flow():
         return
     
     try:
-        dest_path, dest_name = copy_answer_key_to_store(path)
-        print(f"✅ Successfully uploaded answer key!")
-        print(f"   Saved as: data/answer_keys/{dest_name}")
+        entry, created = registry.register(path)
+        if created:
+            print(f"✅ Successfully uploaded answer key!")
+            print(f"   Saved as: data/answer_keys/{entry['name']}")
+        else:
+            print(f"ℹ️  This answer key is already uploaded as data/answer_keys/{entry['name']}")
+        print(f"   Key ID: {entry['id']} ({entry['questions']} questions, {entry['total_marks']:g} marks)")
     except Exception as e:
         print(f"❌ Error uploading answer key: {e}")
 
@@ -80,9 +86,10 @@ def grade_flow(username):
     
     path, keyname = ak
     print(f"✅ Using answer key: {keyname}")
+    metrics.reset()
     
     # Get image path
-    image_path = input("\nEnter path to student's scanned image (PNG/JPG): ").strip()
+    image_path = input("\nEnter path to student's scanned sheet (PNG/JPG/TIFF/PDF): ").strip()
     image_path = image_path.strip('"').strip("'")
     
     if not os.path.exists(image_path):
@@ -94,11 +101,23 @@ def grade_flow(username):
     if not student_name:
         student_name = "Unknown"
     
+    # Load key
+    try:
+        answer_key = get_answer_key(path)
+    except Exception as e:
+        print(f"❌ Error loading answer key: {e}")
+        return
+    
+    print(f"✅ Loaded {len(answer_key)} questions from answer key")
+    template = template_for_key(answer_key)
+    
     print("\n🔍 Running OCR on image...")
+    if template is not None:
+        print(f"   Reading {len(template.regions)} answer boxes from the sheet template")
     print("-" * 50)
     
     # Extract text
-    raw = extract_text_from_image(image_path)
+    raw = extract_text(image_path, template=template)
     if not raw or len(raw.strip()) < 10:
         print("⚠️  Warning: Very little text extracted from image.")
         print("   This might be due to:")
@@ -110,8 +129,7 @@ def grade_flow(username):
             return
     
     # Clean and parse
-    cleaned = clean_text(raw)
-    q_pairs = split_questions(cleaned)
+    q_pairs = parse_questions(raw)
     
     if not q_pairs:
         print("❌ No questions detected in the image!")
@@ -125,15 +143,6 @@ def grade_flow(username):
     
     print(f"\n✅ Detected {len(student_answers)} questions from student sheet")
     
-    # Load key and evaluate
-    try:
-        answer_key = load_answer_key(path)
-    except Exception as e:
-        print(f"❌ Error loading answer key: {e}")
-        return
-    
-    print(f"✅ Loaded {len(answer_key)} questions from answer key")
-    
     # Check for mismatches
     key_qids = set(answer_key.keys())
     student_qids = set(student_answers.keys())
@@ -178,27 +187,93 @@ def grade_flow(username):
     
     # Save results
     try:
-        summary, details_file = save_results(student_name, username, total_score, detailed, keyname)
+        summary, result_id = save_results(student_name, username, total_score, detailed, keyname)
         print(f"\n✅ Results saved successfully!")
-        print(f"   Summary: data/results.csv")
-        print(f"   Details: {os.path.basename(details_file)}")
+        print(f"   Stored in: data/results.db (result #{result_id})")
     except Exception as e:
         print(f"❌ Error saving results: {e}")
 
+    stages = metrics.stage_seconds()
+    if stages:
+        print("\n⏱️  Stage times: " +
+              ", ".join(f"{stage} {seconds:.2f}s" for stage, (seconds, _) in stages.items()))
+
+def regrade_flow():
+    """
+    Re-score graded sheets against a corrected answer key (no re-scanning)
+    """
+    print("\n🔁 Re-grade with a Corrected Answer Key")
+    print("=" * 50)
+
+    keys = graded_answer_keys()
+    if not keys:
+        print("No results yet.")
+        return
+    print("\n📋 Answer keys with results:")
+    for i, k in enumerate(keys, 1):
+        print(f"  {i}. {k}")
+    choice = input("\nChoose the key to correct by number: ").strip()
+    if not (choice.isdigit() and 1 <= int(choice) <= len(keys)):
+        print("Invalid choice.")
+        return
+    answer_key = keys[int(choice) - 1]
+
+    print("\nChoose the corrected answer key (upload it first with option 1):")
+    ak = choose_answer_key()
+    if not ak:
+        return
+    path, keyname = ak
+
+    # Imported here: scoring a whole column at a time needs numpy
+    from regrade import regrade
+    report = regrade(answer_key, get_answer_key(path), dry_run=True)
+    if not (report["Changed"] or report["Removed"] or report["Added"]):
+        print(f"ℹ️  {keyname} scores the same as {answer_key}; nothing to re-grade.")
+        return
+    for label in ("Changed", "Removed", "Added"):
+        if report[label]:
+            print(f"{label} questions: {', '.join(report[label])}")
+    if report["Added"]:
+        print("⚠️  Added questions have no stored answers; re-scan those sheets to score them.")
+    print(f"{report['StudentsChanged']} of {report['Students']} students' totals will change.")
+
+    move = input(f"Move the results to {keyname}? (y/n): ").strip().lower() == "y"
+    if input("Apply the re-grade? (y/n): ").strip().lower() != "y":
+        print("Cancelled.")
+        return
+    regrade(answer_key, get_answer_key(path), relabel=keyname if move and keyname != answer_key else None)
+    print(f"✅ Re-graded {report['Rescored']} answers; {report['StudentsChanged']} students' totals changed.")
+
 def analytics_flow():
     """
     Show class performance analytics
     """
     print("\n📈 Class Performance Analytics")
     print("=" * 50)
-    
-    analysis = class_analysis()
+
+    answer_key = None
+    keys = graded_answer_keys()
+    if len(keys) > 1:
+        print("\n📋 Answer keys with results:")
+        for i, k in enumerate(keys, 1):
+            print(f"  {i}. {k}")
+        choice = input("\nChoose by number (Enter for all keys): ").strip()
+        if choice:
+            if not (choice.isdigit() and 1 <= int(choice) <= len(keys)):
+                print("Invalid choice.")
+                return
+            answer_key = keys[int(choice) - 1]
+    
+    analysis = class_analysis(answer_key=answer_key)
     if not analysis:
+        print("No results yet.")
         return
     
-    print(f"\nTotal Students:    {analysis['Total Students']}")
-    print(f"Average Score:     {analysis['Average Score']:.2f}")
+    print(f"\nAnswer Key:        {answer_key or 'all'}")
+    print(f"Total Students:    {analysis['Total Students']}")
+    print(f"Average Score:     {analysis['Average Score']:.2f} (std dev {analysis['Std Dev']:.2f})")
     print(f"Highest Score:     {analysis['Highest Score']:.2f}")
+    print(f"Median Score:      {analysis['Median']:.2f}")
     print(f"Lowest Score:      {analysis['Lowest Score']:.2f}")
     print(f"Pass Threshold:    {analysis['PassThreshold']:.2f} (33% of max)")
     print(f"Passed:            {analysis['Passed']} students")
@@ -209,6 +284,7 @@ def analytics_flow():
         print(f"Pass Rate:         {pass_rate:.1f}%")
 
 def main():
+    configure_logging()
     ensure_dirs()
     
     print("=" * 60)
@@ -225,6 +301,7 @@ def main():
         print("    3) Grade a scanned answer sheet")
         print("    4) View class analytics")
         print("    5) Logout / Exit")
+        print("    6) Re-grade with a corrected answer key")
         print("=" * 60)
         
         choice = input("\nChoose option: ").strip()
@@ -233,13 +310,13 @@ def main():
             upload_answer_key_flow()
             pause()
         elif choice == "2":
-            keys = list_answer_keys()
+            keys = registry.list_keys()
             if not keys:
                 print("\n📋 No answer keys uploaded yet.")
             else:
                 print("\n📋 Available Answer Keys:")
-                for i, k in enumerate(keys, 1):
-                    print(f"  {i}. {k}")
+                for i, entry in enumerate(keys, 1):
+                    print(f"  {i}. {registry.format_entry(entry)}")
             pause()
         elif choice == "3":
             grade_flow(user)
@@ -250,8 +327,11 @@ def main():
         elif choice == "5":
             print("\n👋 Logging out. Goodbye!")
             break
+        elif choice == "6":
+            regrade_flow()
+            pause()
         else:
-            print("❌ Invalid choice. Please choose 1-5.")
+            print("❌ Invalid choice. Please choose 1-6.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
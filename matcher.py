@@ -0,0 +1,204 @@
+# matcher.py
+import os
+import re
+from collections import Counter, defaultdict
+
+# pyahocorasick is optional and only imported when a matcher needs an automaton
+_AHOCORASICK = []
+
+def load_ahocorasick():
+    """
+    The pyahocorasick module, or None if it is not installed.
+    """
+    if not _AHOCORASICK:
+        try:
+            import ahocorasick
+        except ImportError:  # optional: pip install pyahocorasick
+            ahocorasick = None
+        _AHOCORASICK.append(ahocorasick)
+    return _AHOCORASICK[0]
+
+# Below this many keywords the per-keyword C substring scan is as fast or faster:
+# bench_matcher on 800-word answers measures the automaton at x0.68 of the legacy
+# loop with 16 keywords, level with the scan at 40 and ahead from about 80 on
+# (x2.4 vs x1.2 at 120); shorter answers favour it sooner
+AUTOMATON_MIN_KEYWORDS = 100
+
+# Fuzzy matching: FUZZY_MAX_DISTANCE edits at most, and one edit per
+# FUZZY_MIN_LENGTH characters of keyword (shorter keywords match exactly only)
+FUZZY_DISTANCE_ENV = "FUZZY_MAX_DISTANCE"
+FUZZY_MIN_LENGTH = 5
+
+TOKEN_RE = re.compile(r"\w+")
+
+def default_max_distance():
+    """
+    Fuzzy edit distance from the environment; 0 (exact matching) by default.
+    """
+    try:
+        return max(0, int(os.environ.get(FUZZY_DISTANCE_ENV, "0")))
+    except ValueError:
+        return 0
+
+def bigrams(word):
+    return {word[i:i + 2] for i in range(len(word) - 1)}
+
+def bounded_edit_distance(a, b, limit):
+    """
+    Levenshtein distance between a and b if it is at most limit, else None.
+    Only the diagonal band of width 2 x limit + 1 is computed, and the scan
+    stops as soon as every cell in a row exceeds the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    big = limit + 1
+    previous = [j if j <= limit else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [big] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        lo = max(1, i - limit)
+        hi = min(len(b), i + limit)
+        ca = a[i - 1]
+        row_min = current[0]
+        for j in range(lo, hi + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost if cost < big else big
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+class TokenIndex:
+    """
+    Character-bigram index over the distinct words of one student answer.
+    A word within d edits of a keyword still shares all but at most 2 x d of
+    the keyword's distinct bigrams, so only words passing that count (and
+    the length filter) are checked with the edit distance.
+    """
+
+    def __init__(self, text):
+        self.tokens = list(set(TOKEN_RE.findall(text.lower())))
+        self.by_gram = defaultdict(list)
+        for token_id, token in enumerate(self.tokens):
+            for gram in bigrams(token):
+                self.by_gram[gram].append(token_id)
+
+    def search(self, word, max_distance):
+        """
+        Return (token, distance) for the closest word within max_distance
+        edits, or None.
+        """
+        grams = bigrams(word)
+        needed = len(grams) - 2 * max_distance
+        if needed > 0:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.by_gram.get(gram, ()))
+            candidates = [token_id for token_id, n in shared.items() if n >= needed]
+        else:
+            candidates = range(len(self.tokens))
+
+        best = None
+        for token_id in candidates:
+            token = self.tokens[token_id]
+            distance = bounded_edit_distance(word, token, max_distance)
+            if distance is not None and (best is None or distance < best[1]):
+                best = (token, distance)
+                if distance == 0:
+                    break
+        return best
+
+class KeywordMatcher:
+    """
+    Finds which keywords of a model answer occur in a student answer.
+    Matching is case-insensitive substring matching, the same rule
+    evaluate_subjective has always used (kw.lower() in student_ans.lower()).
+
+    With pyahocorasick installed, the keywords are compiled once into an
+    Aho-Corasick automaton and every keyword is found in a single scan of the
+    student text. Without it (or for short keyword lists), the lowered keywords
+    are checked one by one with str's C-level substring search, which beats a
+    pure-Python automaton.
+
+    With max_distance > 0, keywords not found exactly are looked up in a
+    bigram index of the student's words and accepted within a bounded edit
+    distance (OCR turning "photosynthesis" into "photosynthcsis").
+    """
+
+    def __init__(self, keywords, use_automaton=None, max_distance=None):
+        """
+        use_automaton: None picks by keyword count, True/False forces it on/off.
+        max_distance: fuzzy edit distance, None reads FUZZY_MAX_DISTANCE.
+        """
+        self.keywords = list(keywords)
+        self.lowered = [kw.lower() for kw in self.keywords]
+        self.max_distance = default_max_distance() if max_distance is None else max_distance
+        self.automaton = None
+        if use_automaton is None:
+            use_automaton = len(set(self.lowered)) >= AUTOMATON_MIN_KEYWORDS
+        ahocorasick = load_ahocorasick() if use_automaton and self.lowered else None
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for kw in set(self.lowered):
+                automaton.add_word(kw, kw)
+            automaton.make_automaton()
+            self.automaton = automaton
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def find(self, text):
+        """
+        Return the matched keywords, in keyword order (duplicates kept).
+        """
+        text_lower = text.lower()
+        if self.automaton is None:
+            return [kw for kw, low in zip(self.keywords, self.lowered) if low in text_lower]
+
+        found = set()
+        wanted = len(set(self.lowered))
+        for _, kw in self.automaton.iter(text_lower):
+            found.add(kw)
+            if len(found) == wanted:
+                break
+        return [kw for kw, low in zip(self.keywords, self.lowered) if low in found]
+
+    def allowed_distance(self, keyword):
+        return min(self.max_distance, len(keyword) // FUZZY_MIN_LENGTH)
+
+    def match(self, text):
+        """
+        Return (matched keywords in keyword order, {keyword: word it was
+        fuzzily matched to}). Without fuzzy matching the dict is empty and
+        the list equals find(text).
+        """
+        matched = self.find(text)
+        if not self.max_distance or len(matched) == len(self.keywords):
+            return matched, {}
+
+        found = {kw.lower() for kw in matched}
+        index = None
+        fuzzy = {}
+        for low in dict.fromkeys(self.lowered):
+            limit = self.allowed_distance(low)
+            if low in found or not limit:
+                continue
+            if index is None:
+                index = TokenIndex(text)
+            hit = index.search(low, limit)
+            if hit is not None:
+                fuzzy[low] = hit[0]
+
+        if not fuzzy:
+            return matched, {}
+        matched = [kw for kw, low in zip(self.keywords, self.lowered) if low in found or low in fuzzy]
+        return matched, {kw: fuzzy[low] for kw, low in zip(self.keywords, self.lowered) if low in fuzzy}
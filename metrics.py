@@ -0,0 +1,139 @@
+# metrics.py
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage-duration histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_METRIC = "grading_stage_seconds"
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+def inc(name, value=1, **labels):
+    """
+    Add value to a counter.
+    """
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    """
+    Record one observation in a histogram.
+    """
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"buckets": [0] * len(DEFAULT_BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                hist["buckets"][i] += 1
+                break
+        hist["sum"] += value
+        hist["count"] += 1
+
+@contextmanager
+def timer(stage):
+    """
+    Time a pipeline stage into the grading_stage_seconds histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(STAGE_METRIC, time.perf_counter() - start, stage=stage)
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def snapshot():
+    """
+    Picklable copy of every metric, e.g. to send from a worker process.
+    """
+    with _lock:
+        return {
+            "counters": [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            "histograms": [[name, dict(labels), {"buckets": list(h["buckets"]), "sum": h["sum"],
+                                                 "count": h["count"]}]
+                           for (name, labels), h in _histograms.items()],
+        }
+
+def merge(snap):
+    """
+    Add a snapshot (from another process) into this process's metrics.
+    """
+    with _lock:
+        for name, labels, value in snap["counters"]:
+            key = _key(name, labels)
+            _counters[key] = _counters.get(key, 0) + value
+        for name, labels, other in snap["histograms"]:
+            key = _key(name, labels)
+            hist = _histograms.get(key)
+            if hist is None:
+                hist = _histograms[key] = {"buckets": [0] * len(DEFAULT_BUCKETS), "sum": 0.0, "count": 0}
+            hist["buckets"] = [a + b for a, b in zip(hist["buckets"], other["buckets"])]
+            hist["sum"] += other["sum"]
+            hist["count"] += other["count"]
+
+def stage_seconds():
+    """
+    Total seconds and call count per stage: {stage: (sum, count)}.
+    """
+    with _lock:
+        return {dict(labels)["stage"]: (h["sum"], h["count"])
+                for (name, labels), h in _histograms.items() if name == STAGE_METRIC}
+
+def export_json():
+    snap = snapshot()
+    snap["bucket_bounds"] = list(DEFAULT_BUCKETS)
+    return json.dumps(snap, indent=2, sort_keys=True)
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (extra or [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def export_prometheus():
+    """
+    Prometheus text exposition format.
+    """
+    lines = []
+    with _lock:
+        for name in sorted({name for name, _ in _counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(_counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in _histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), h in sorted(_histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(DEFAULT_BUCKETS, h["buckets"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {h['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {h['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+def write(path):
+    """
+    Write metrics to path: Prometheus text for .prom/.txt, JSON otherwise.
+    """
+    text = export_prometheus() if path.endswith((".prom", ".txt")) else export_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
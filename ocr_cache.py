@@ -0,0 +1,236 @@
+# ocr_cache.py
+import argparse
+import atexit
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from utils import configure_sqlite
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+OCR_CACHE_DB = os.path.join(DATA_DIR, "ocr_cache.db")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Set OCR_CACHE=0 to bypass the cache, OCR_CACHE_MAX_MB to change its size bound
+OCR_CACHE_ENV = "OCR_CACHE"
+OCR_CACHE_MAX_ENV = "OCR_CACHE_MAX_MB"
+# Lookups only read: hit/miss counts and last_used touches are kept in
+# memory and written together every FLUSH_EVERY lookups or FLUSH_SECONDS,
+# and last_used is only refreshed once it is TOUCH_SECONDS old (LRU order
+# does not need finer resolution)
+FLUSH_EVERY = 100
+FLUSH_SECONDS = 5.0
+TOUCH_SECONDS = 300.0
+
+_CACHE = None
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    SHA-256 of a file's content, read in chunks.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cache_key(content_hash, psm, lang, engine_version, extra=""):
+    """
+    Cache key for one OCR run: image content + every setting that changes the text.
+    """
+    parts = [content_hash, str(psm), lang, str(engine_version), extra]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+class OCRCache:
+    """
+    Persistent raw-OCR-text cache in SQLite with size-bounded LRU eviction.
+    Safe to share between processes; each process opens its own connection.
+    Lookups never take the write lock; their bookkeeping is flushed in
+    batches (see FLUSH_EVERY), on put, stats and at exit.
+    """
+
+    def __init__(self, path=OCR_CACHE_DB, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._pending_lock = threading.Lock()
+        self._reset_pending()
+        atexit.register(self.flush)
+
+    def _reset_pending(self):
+        self._pending_hits = 0
+        self._pending_misses = 0
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+
+    def _connect(self):
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if self._pid is not None:
+            # A forked child: the buffered bookkeeping is the parent's to write
+            with self._pending_lock:
+                self._reset_pending()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        configure_sqlite(conn, synchronous="NORMAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )""")
+            conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                             [("hits",), ("misses",), ("bytes",)])
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT text, last_used FROM entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        with self._pending_lock:
+            if row is None:
+                self.misses += 1
+                self._pending_misses += 1
+            else:
+                self.hits += 1
+                self._pending_hits += 1
+                if now - row[1] > TOUCH_SECONDS:
+                    self._touched[key] = now
+            due = (self._pending_hits + self._pending_misses >= FLUSH_EVERY
+                   or time.monotonic() - self._flushed_at >= FLUSH_SECONDS)
+        if due:
+            self.flush()
+        return row[0] if row is not None else None
+
+    def _write_pending(self, conn):
+        with self._pending_lock:
+            hits, misses, touched = self._pending_hits, self._pending_misses, self._touched
+            self._reset_pending()
+        if hits or misses:
+            conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                             [(hits, "hits"), (misses, "misses")])
+        if touched:
+            conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                             [(when, key) for key, when in touched.items()])
+
+    def flush(self):
+        """
+        Write the buffered hit/miss counts and last_used touches.
+        """
+        if self._conn is None or self._pid != os.getpid():
+            return
+        with self._pending_lock:
+            if not (self._pending_hits or self._pending_misses or self._touched):
+                return
+        try:
+            with self._conn:
+                self._write_pending(self._conn)
+        except sqlite3.Error:
+            pass  # bookkeeping only; the entries themselves are intact
+
+    def put(self, key, text):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        conn = self._connect()
+        with conn:
+            self._write_pending(conn)
+            old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO entries (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                         (key, text, size, time.time()))
+            delta = size - (old[0] if old else 0)
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = 'bytes'", (delta,))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        conn.execute("UPDATE counters SET value = value - ? WHERE name = 'bytes'", (freed,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("UPDATE counters SET value = 0")
+        with self._pending_lock:
+            self._reset_pending()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Process-local hit/miss counts plus the persistent totals.
+        """
+        conn = self._connect()
+        self.flush()
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "Hits": self.hits,
+            "Misses": self.misses,
+            "TotalHits": counters["hits"],
+            "TotalMisses": counters["misses"],
+            "Entries": entries,
+            "Bytes": counters["bytes"],
+            "MaxBytes": self.max_bytes,
+        }
+
+def cache_enabled():
+    return os.environ.get(OCR_CACHE_ENV, "1").strip().lower() not in ("0", "false", "no", "off")
+
+def get_cache():
+    """
+    Shared cache instance, or None when bypassed with OCR_CACHE=0.
+    """
+    global _CACHE
+    if not cache_enabled():
+        return None
+    if _CACHE is None:
+        _CACHE = OCRCache(max_bytes=_max_bytes_from_env())
+    return _CACHE
+
+def _max_bytes_from_env():
+    max_mb = os.environ.get(OCR_CACHE_MAX_ENV)
+    return int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OCR result cache maintenance.")
+    parser.add_argument("command", choices=["stats", "clear"])
+    args = parser.parse_args(argv)
+
+    cache = OCRCache(max_bytes=_max_bytes_from_env())
+    if args.command == "clear":
+        cache.clear()
+        print("OCR cache cleared")
+    else:
+        for name, value in cache.stats().items():
+            print(f"{name + ':':<14} {value}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
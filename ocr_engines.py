@@ -0,0 +1,226 @@
+# ocr_engines.py
+import hashlib
+import json
+import os
+import queue
+import threading
+
+# Optionally configure this externally via environment var or modify path below
+DEFAULT_TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+# OCR_ENGINE selects the default backend: tesseract (default), pooled or fake
+OCR_ENGINE_ENV = "OCR_ENGINE"
+OCR_FIXTURES_ENV = "OCR_FIXTURES"
+
+_ENGINES = {}
+_DEFAULT_ENGINE = None
+
+class OCREngine:
+    """
+    Base class for OCR backends used by extract_text_from_image.
+    needs_image: True if image_to_string wants a PIL image, False if it
+    accepts a file path directly (so the caller can skip decoding).
+    """
+    name = "base"
+    needs_image = True
+
+    def image_to_string(self, image, psm=6, lang="eng"):
+        raise NotImplementedError
+
+    def version(self):
+        """
+        Identifies the engine build in OCR cache keys.
+        """
+        return self.name
+
+    def close(self):
+        pass
+
+class TesseractEngine(OCREngine):
+    """
+    The original backend: pytesseract, one tesseract process per call.
+    """
+    name = "tesseract"
+
+    def __init__(self, tesseract_cmd=None):
+        import pytesseract
+        self._pytesseract = pytesseract
+        cmd = tesseract_cmd or os.environ.get("TESSERACT_CMD")
+        if cmd:
+            pytesseract.pytesseract.tesseract_cmd = cmd
+        elif os.path.exists(DEFAULT_TESSERACT_CMD):
+            # If windows default exists, set it; otherwise assume tesseract is in PATH
+            pytesseract.pytesseract.tesseract_cmd = DEFAULT_TESSERACT_CMD
+        self._version = None
+
+    def image_to_string(self, image, psm=6, lang="eng"):
+        return self._pytesseract.image_to_string(image, lang=lang, config=f'--psm {psm}')
+
+    def version(self):
+        if self._version is None:
+            try:
+                self._version = f"tesseract-{self._pytesseract.get_tesseract_version()}"
+            except Exception:
+                self._version = "tesseract-unknown"
+        return self._version
+
+class PooledTesseractEngine(OCREngine):
+    """
+    Keeps warm Tesseract API instances (via tesserocr) in a pool, so the
+    language model is loaded once per instance instead of once per call and
+    no process or temp file is created per image. Thread-safe: each call
+    borrows one instance; tesserocr releases the GIL while recognizing.
+    Instances are created on demand, up to size per language, so a process
+    that OCRs one image at a time only ever loads one.
+    """
+    name = "pooled"
+
+    def __init__(self, size=None, tessdata=None):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.size = size or os.cpu_count() or 1
+        self.tessdata = tessdata
+        self._pools = {}
+        self._created = {}
+        self._lock = threading.Lock()
+
+    def _borrow(self, lang):
+        """
+        An idle instance for lang, a new one while fewer than size exist,
+        otherwise wait for one to be returned. Returns (pool, instance).
+        """
+        with self._lock:
+            pool = self._pools.setdefault(lang, queue.LifoQueue())
+            try:
+                return pool, pool.get_nowait()
+            except queue.Empty:
+                create = self._created.get(lang, 0) < self.size
+                if create:
+                    self._created[lang] = self._created.get(lang, 0) + 1
+        if not create:
+            return pool, pool.get()
+        kwargs = {"lang": lang}
+        if self.tessdata:
+            kwargs["path"] = self.tessdata
+        try:
+            return pool, self._tesserocr.PyTessBaseAPI(**kwargs)
+        except Exception:
+            with self._lock:
+                self._created[lang] -= 1
+            raise
+
+    def image_to_string(self, image, psm=6, lang="eng"):
+        pool, api = self._borrow(lang)
+        try:
+            api.SetPageSegMode(psm)
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            pool.put(api)
+
+    def version(self):
+        return f"tesserocr-{self._tesserocr.tesseract_version().split()[1]}"
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                while not pool.empty():
+                    pool.get().End()
+            self._pools.clear()
+            self._created.clear()
+
+class FakeOCREngine(OCREngine):
+    """
+    Deterministic engine for tests and benchmarks on machines without Tesseract.
+    Text for an image is looked up, in order, from:
+      - texts: a dict of file name (or stem) -> text
+      - fixture_dir/<stem>.txt
+      - a sidecar file <image path>.txt next to the image
+      - texts / fixture_dir keyed by the sha256 of the image content
+      - default (None means missing fixtures raise FileNotFoundError)
+    fixture_dir may also hold an index.json with the same shape as texts.
+    """
+    name = "fake"
+    needs_image = False
+
+    def __init__(self, fixture_dir=None, texts=None, default=None):
+        self.fixture_dir = fixture_dir
+        self.texts = dict(texts or {})
+        self.default = default
+        if fixture_dir:
+            index = os.path.join(fixture_dir, "index.json")
+            if os.path.exists(index):
+                with open(index, encoding="utf-8") as f:
+                    for name, text in json.load(f).items():
+                        self.texts.setdefault(name, text)
+
+    def image_to_string(self, image, psm=6, lang="eng"):
+        if isinstance(image, (str, os.PathLike)):
+            path = os.fspath(image)
+            name = os.path.basename(path)
+            stem = os.path.splitext(name)[0]
+            for candidate in (name, stem):
+                if candidate in self.texts:
+                    return self.texts[candidate]
+            if self.fixture_dir:
+                fixture = os.path.join(self.fixture_dir, stem + ".txt")
+                if os.path.exists(fixture):
+                    return _read_text(fixture)
+            sidecar = path + ".txt"
+            if os.path.exists(sidecar):
+                return _read_text(sidecar)
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        else:
+            # In-memory image (a page or a cropped region)
+            digest = hashlib.sha256(image.tobytes()).hexdigest()
+
+        if digest in self.texts:
+            return self.texts[digest]
+        if self.fixture_dir:
+            fixture = os.path.join(self.fixture_dir, digest + ".txt")
+            if os.path.exists(fixture):
+                return _read_text(fixture)
+        if self.default is not None:
+            return self.default
+        raise FileNotFoundError(f"No OCR fixture for image {digest[:12]}")
+
+def _read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+ENGINE_TYPES = {
+    "tesseract": TesseractEngine,
+    "pooled": PooledTesseractEngine,
+    "fake": FakeOCREngine,
+}
+
+def get_engine(name=None):
+    """
+    Return the engine to use: the one installed with set_engine, else the
+    backend named by name / OCR_ENGINE (created once per process).
+    """
+    if name is None:
+        if _DEFAULT_ENGINE is not None:
+            return _DEFAULT_ENGINE
+        name = os.environ.get(OCR_ENGINE_ENV, "tesseract").strip().lower()
+    engine = _ENGINES.get(name)
+    if engine is None:
+        if name not in ENGINE_TYPES:
+            raise ValueError(f"Unknown OCR engine: {name} (choose from {', '.join(ENGINE_TYPES)})")
+        if name == "fake":
+            engine = FakeOCREngine(fixture_dir=os.environ.get(OCR_FIXTURES_ENV))
+        else:
+            engine = ENGINE_TYPES[name]()
+        _ENGINES[name] = engine
+    return engine
+
+def set_engine(engine):
+    """
+    Install engine (an OCREngine, a backend name, or None to reset) as the default.
+    """
+    global _DEFAULT_ENGINE
+    if isinstance(engine, str):
+        engine = get_engine(engine)
+    _DEFAULT_ENGINE = engine
+    return engine
@@ -0,0 +1,176 @@
+# preprocess.py
+import os
+import time
+
+# Steps run in this order; OCR_PREPROCESS=none (or "") disables preprocessing
+STEP_ORDER = ("grayscale", "downscale", "binarize", "crop", "deskew")
+# Steps that move the page content on the canvas (cropping the border,
+# rotating with an expanded canvas); uniform scaling keeps proportions
+GEOMETRY_STEPS = ("crop", "deskew")
+# Off by default: preprocessing changes what the OCR engine sees, so opt in
+# (e.g. OCR_PREPROCESS=grayscale,downscale) once bench_preprocess shows the
+# text still agrees for your scans
+DEFAULT_STEPS = ()
+OCR_PREPROCESS_ENV = "OCR_PREPROCESS"
+OCR_TARGET_DPI_ENV = "OCR_TARGET_DPI"
+
+DEFAULT_TARGET_DPI = 300
+# Long side of the largest page expected when an image carries no usable DPI
+# (A4, inches); it caps the long side of the image whatever its orientation
+ASSUMED_PAGE_LONG_SIDE_IN = 297 / 25.4
+# DPI tags below this are camera/screen defaults (72, 96), not scan resolutions
+MIN_PLAUSIBLE_DPI = 150
+CROP_MARGIN = 10
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+
+def parse_steps(spec):
+    """
+    Turn "grayscale,downscale" (or a list of names) into a tuple of step
+    names in pipeline order. None reads OCR_PREPROCESS, falling back to
+    DEFAULT_STEPS.
+    """
+    if spec is None:
+        spec = os.environ.get(OCR_PREPROCESS_ENV)
+        if spec is None:
+            return DEFAULT_STEPS
+    if isinstance(spec, str):
+        spec = [s.strip().lower() for s in spec.split(",")]
+    names = {s for s in spec if s and s != "none"}
+    unknown = names - set(STEP_ORDER)
+    if unknown:
+        raise ValueError(f"Unknown preprocessing step(s): {', '.join(sorted(unknown))}")
+    return tuple(s for s in STEP_ORDER if s in names)
+
+def target_dpi():
+    return int(os.environ.get(OCR_TARGET_DPI_ENV, DEFAULT_TARGET_DPI))
+
+def describe(steps, dpi=None):
+    """
+    Stable description of a pipeline, used in OCR cache keys.
+    """
+    if not steps:
+        return "none"
+    dpi = dpi or target_dpi()
+    return ",".join(steps) + (f"@{dpi}" if "downscale" in steps else "")
+
+def to_grayscale(img, dpi):
+    return img if img.mode == "L" else img.convert("L")
+
+def downscale(img, dpi):
+    """
+    Shrink to the target DPI. Images without a plausible DPI tag (none, or
+    below MIN_PLAUSIBLE_DPI, as phone photos carry) are capped so their long
+    side is at most a full page at the target DPI, so landscape and
+    cropped scans at or below the target are left alone.
+    """
+    info_dpi = img.info.get("dpi")
+    if info_dpi and info_dpi[0] and float(info_dpi[0]) >= MIN_PLAUSIBLE_DPI:
+        scale = dpi / float(info_dpi[0])
+    else:
+        scale = round(dpi * ASSUMED_PAGE_LONG_SIDE_IN) / max(img.width, img.height)
+    if scale >= 1:
+        return img
+    from PIL import Image
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    resized = img.resize(size, Image.LANCZOS)
+    resized.info["dpi"] = (dpi, dpi)
+    return resized
+
+def otsu_threshold(histogram):
+    """
+    Otsu threshold of a 256-bin grayscale histogram.
+    """
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = 0.0
+    weight_bg = 0
+    best, threshold = -1.0, 127
+    for i, h in enumerate(histogram):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+def binarize(img, dpi):
+    gray = to_grayscale(img, dpi)
+    threshold = otsu_threshold(gray.histogram())
+    lut = [0 if i <= threshold else 255 for i in range(256)]
+    return gray.point(lut)
+
+def crop_border(img, dpi):
+    """
+    Crop to the bounding box of the ink plus a small margin.
+    """
+    from PIL import ImageOps
+    gray = to_grayscale(img, dpi)
+    # Light pixels become 0 so getbbox finds the ink
+    ink = ImageOps.invert(gray).point(lambda p: 255 if p > 96 else 0)
+    bbox = ink.getbbox()
+    if not bbox:
+        return img
+    left, top, right, bottom = bbox
+    return img.crop((max(0, left - CROP_MARGIN), max(0, top - CROP_MARGIN),
+                     min(img.width, right + CROP_MARGIN), min(img.height, bottom + CROP_MARGIN)))
+
+def _row_profile_score(img):
+    # Row means via a 1-pixel-wide box resize; text lines aligned with rows
+    # give the most contrast between rows
+    from PIL import Image
+    rows = list(img.resize((1, img.height), Image.BOX).getdata())
+    mean = sum(rows) / len(rows)
+    return sum((r - mean) ** 2 for r in rows)
+
+def deskew(img, dpi):
+    """
+    Rotate by the angle (within +/- DESKEW_MAX_ANGLE) that maximizes the
+    variance of the horizontal projection profile, searched on a thumbnail.
+    """
+    gray = to_grayscale(img, dpi)
+    thumb = gray.copy()
+    thumb.thumbnail((800, 800))
+    best_angle, best_score = 0.0, _row_profile_score(thumb)
+    steps = int(DESKEW_MAX_ANGLE / DESKEW_STEP)
+    for i in range(-steps, steps + 1):
+        angle = i * DESKEW_STEP
+        if angle == 0:
+            continue
+        score = _row_profile_score(thumb.rotate(angle, fillcolor=255))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    if best_angle == 0.0:
+        return img
+    from PIL import Image
+    fill = 255 if img.mode in ("L", "1") else (255,) * len(img.getbands())
+    return img.rotate(best_angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+STEPS = {
+    "grayscale": to_grayscale,
+    "downscale": downscale,
+    "binarize": binarize,
+    "crop": crop_border,
+    "deskew": deskew,
+}
+
+def preprocess_image(img, steps=None, dpi=None):
+    """
+    Run the preprocessing pipeline on a PIL image.
+    Returns the processed image and a dict of step -> seconds.
+    """
+    steps = parse_steps(steps)
+    dpi = dpi or target_dpi()
+    timings = {}
+    for name in steps:
+        start = time.perf_counter()
+        img = STEPS[name](img, dpi)
+        timings[name] = time.perf_counter() - start
+    return img, timings
@@ -0,0 +1,70 @@
+# records.py
+import sys
+import threading
+from collections.abc import Mapping
+
+DETAIL_FIELDS = ("StudentAnswer", "Score", "Marks", "Remark", "CorrectAnswer", "Type")
+
+# Shared key entries for records rebuilt from a pickle: (answer, marks, type) -> entry.
+# Least recently used first; a long-running parent sees many answer keys over
+# time, so only the MAX_KEY_ENTRIES most recent questions are kept
+MAX_KEY_ENTRIES = 4096
+_KEY_ENTRIES = {}
+_key_entries_lock = threading.Lock()
+
+class QuestionResult(Mapping):
+    """
+    One graded question, read like the dict evaluate_all used to build:
+    StudentAnswer, Score, Marks, Remark, CorrectAnswer and Type.
+    Only the student's answer, the score and the (interned) remark are held
+    per record; the model answer, marks and type are read from the answer
+    key entry, which every student's record for that question shares.
+    """
+
+    __slots__ = ("answer", "score", "remark", "key")
+
+    def __init__(self, answer, score, remark, key):
+        self.answer = answer
+        self.score = score
+        self.remark = sys.intern(remark)
+        self.key = key
+
+    def __getitem__(self, field):
+        if field == "StudentAnswer":
+            return self.answer
+        if field == "Score":
+            return self.score
+        if field == "Marks":
+            return float(self.key.get("marks", 1.0))
+        if field == "Remark":
+            return self.remark
+        if field == "CorrectAnswer":
+            return self.key.get("answer", "")
+        if field == "Type":
+            return self.key.get("type", "S")
+        raise KeyError(field)
+
+    def __iter__(self):
+        return iter(DETAIL_FIELDS)
+
+    def __len__(self):
+        return len(DETAIL_FIELDS)
+
+    def __repr__(self):
+        return f"QuestionResult({dict(self)!r})"
+
+    def __reduce__(self):
+        # Ship the key fields, not the compiled key entry (matchers and all)
+        return (_restore, (self.answer, self.score, self.remark,
+                           self["CorrectAnswer"], self.key.get("marks", 1.0), self["Type"]))
+
+def _restore(answer, score, remark, correct, marks, qtype):
+    entry_id = (correct, marks, qtype)
+    with _key_entries_lock:
+        key = _KEY_ENTRIES.pop(entry_id, None)
+        if key is None:
+            key = {"answer": correct, "marks": marks, "type": qtype}
+            if len(_KEY_ENTRIES) >= MAX_KEY_ENTRIES:
+                del _KEY_ENTRIES[next(iter(_KEY_ENTRIES))]
+        _KEY_ENTRIES[entry_id] = key
+    return QuestionResult(answer, score, remark, key)
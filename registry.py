@@ -0,0 +1,298 @@
+# registry.py
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from evaluation import _parse_answer_key
+from results import ANSWER_KEYS_DIR
+from sheet_template import parse_template, template_path
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+# Key IDs are this many hex digits of the content hash
+ID_LENGTH = 12
+
+_lock = threading.Lock()
+
+def index_path(keys_dir=None):
+    return os.path.join(keys_dir or ANSWER_KEYS_DIR, INDEX_FILE)
+
+@contextmanager
+def _index_lock(keys_dir):
+    """
+    Hold the key store for a read-modify-write of its index: the thread lock
+    within this process and an exclusive lock on index.json.lock across
+    processes (the server, the menu and registry.py may run at once).
+    """
+    os.makedirs(keys_dir, exist_ok=True)
+    with _lock, open(index_path(keys_dir) + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def describe_key(data):
+    """
+    Manifest fields of an answer key's CSV bytes: question count, total
+    marks and the objective/subjective mix.
+    """
+    key = _parse_answer_key(io.StringIO(data.decode("utf-8"), newline=""))
+    objective = sum(1 for q in key.values() if q["type"] == "O")
+    return {
+        "questions": len(key),
+        "total_marks": round(sum(q["marks"] for q in key.values()), 2),
+        "objective": objective,
+        "subjective": len(key) - objective,
+    }
+
+def _read_index(keys_dir):
+    try:
+        with open(index_path(keys_dir), encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+        logger.warning("Unknown answer key index version; rebuilding")
+    except FileNotFoundError:
+        pass
+    except ValueError as e:
+        logger.warning("Unreadable answer key index (%s); rebuilding", e)
+    return None
+
+def _write_index(index, keys_dir):
+    path = index_path(keys_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, path)
+
+def _find_id(index, digest):
+    """
+    The key ID for content with this digest and its entry if it is stored:
+    ID_LENGTH hex digits, or more when a different key already holds that
+    prefix. Returns (key_id, entry or None).
+    """
+    for length in range(ID_LENGTH, len(digest) + 1):
+        key_id = digest[:length]
+        entry = index["keys"].get(key_id)
+        if entry is None or entry["sha256"] == digest:
+            return key_id, entry
+    raise ValueError(f"Answer key ID {digest} is already taken by different content")
+
+def _add_entry(index, key_id, name, digest, data, uploaded):
+    entry = {"id": key_id, "name": name, "sha256": digest, "uploaded": uploaded, "aliases": []}
+    entry.update(describe_key(data))
+    index["keys"][key_id] = entry
+    return entry
+
+def rebuild_index(keys_dir=None):
+    """
+    Index every CSV in the key store (one directory scan; used once for a
+    store that predates the index, or to recover a lost index). Files with
+    identical content become aliases of the oldest one.
+    """
+    keys_dir = keys_dir or ANSWER_KEYS_DIR
+    with _index_lock(keys_dir):
+        return _rebuild_index(keys_dir)
+
+def _rebuild_index(keys_dir):
+    index = {"version": INDEX_VERSION, "keys": {}}
+    if os.path.isdir(keys_dir):
+        files = [name for name in os.listdir(keys_dir) if name.lower().endswith(".csv")]
+        files.sort(key=lambda name: (os.path.getmtime(os.path.join(keys_dir, name)), name))
+        for name in files:
+            path = os.path.join(keys_dir, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = content_hash(data)
+            key_id, entry = _find_id(index, digest)
+            if entry is not None:
+                entry["aliases"].append(name)
+                continue
+            uploaded = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+            try:
+                entry = _add_entry(index, key_id, name, digest, data, uploaded)
+            except Exception as e:
+                logger.warning("Skipping unreadable answer key %s: %s", name, e)
+                continue
+            if os.path.exists(template_path(path)):
+                entry["template"] = os.path.basename(template_path(path))
+        os.makedirs(keys_dir, exist_ok=True)
+        _write_index(index, keys_dir)
+    return index
+
+def load_index(keys_dir=None):
+    # The index is replaced atomically, so reading it needs no lock
+    index = _read_index(keys_dir)
+    if index is None:
+        keys_dir = keys_dir or ANSWER_KEYS_DIR
+        with _index_lock(keys_dir):
+            index = _read_index(keys_dir) or _rebuild_index(keys_dir)
+    return index
+
+def list_keys(keys_dir=None):
+    """
+    Registered keys, oldest upload first (so positions never shift).
+    """
+    return sorted(load_index(keys_dir)["keys"].values(), key=lambda e: (e["uploaded"], e["id"]))
+
+def get_key(ref, keys_dir=None):
+    """
+    Look up a key by ID, ID prefix, stored file name or alias.
+    Returns the manifest entry or None.
+    """
+    if not ref:
+        return None
+    keys = load_index(keys_dir)["keys"]
+    if ref in keys:
+        return keys[ref]
+    for entry in keys.values():
+        if ref == entry["name"] or ref in entry["aliases"]:
+            return entry
+    matches = [entry for key_id, entry in keys.items() if key_id.startswith(ref)]
+    return matches[0] if len(matches) == 1 else None
+
+def key_path(entry, keys_dir=None):
+    return os.path.join(keys_dir or ANSWER_KEYS_DIR, entry["name"])
+
+def register(src_path, keys_dir=None):
+    """
+    Add an answer key file to the store. A key whose content is already
+    stored (same SHA-256) resolves to the existing entry instead of a new
+    copy; different content whose ID prefix is taken gets a longer ID.
+    Returns (entry, created).
+    """
+    keys_dir = keys_dir or ANSWER_KEYS_DIR
+    with open(src_path, "rb") as f:
+        data = f.read()
+    digest = content_hash(data)
+
+    with _index_lock(keys_dir):
+        index = _read_index(keys_dir) or _rebuild_index(keys_dir)
+        # Same content only if the whole hash matches, not just the ID prefix
+        key_id, entry = _find_id(index, digest)
+        if entry is not None:
+            return entry, False
+        if len(key_id) > ID_LENGTH:
+            logger.warning("Key ID %s is taken by different content; storing as %s",
+                           digest[:ID_LENGTH], key_id)
+
+        stem = os.path.splitext(os.path.basename(src_path))[0]
+        name = f"{stem}_{key_id}.csv"
+        os.makedirs(keys_dir, exist_ok=True)
+        entry = _add_entry(index, key_id, name, digest, data,
+                           datetime.now().isoformat(timespec="seconds"))
+        dest = os.path.join(keys_dir, name)
+        tmp = dest + ".tmp"
+        shutil.copyfile(src_path, tmp)
+        os.replace(tmp, dest)
+        _write_index(index, keys_dir)
+    logger.info("Registered answer key %s as %s", src_path, name)
+    return entry, True
+
+def attach_template(entry, src_path, keys_dir=None):
+    """
+    Store a sheet template next to a registered key, where grading picks it
+    up (sheet_template.template_path). Returns the QIDs of the key that have
+    no box on the template; raises ValueError for an invalid template or
+    boxes for questions the key does not have.
+    """
+    keys_dir = keys_dir or ANSWER_KEYS_DIR
+    with open(src_path, "rb") as f:
+        data = f.read()
+    template = parse_template(data)
+    with open(key_path(entry, keys_dir), "rb") as f:
+        key = _parse_answer_key(io.StringIO(f.read().decode("utf-8"), newline=""))
+    unknown = [qid for qid in template.qids() if qid not in key]
+    if unknown:
+        raise ValueError(f"Template boxes for questions not in {entry['name']}: {', '.join(unknown)}")
+
+    with _index_lock(keys_dir):
+        index = _read_index(keys_dir) or _rebuild_index(keys_dir)
+        dest = template_path(key_path(entry, keys_dir))
+        tmp = dest + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dest)
+        index["keys"][entry["id"]]["template"] = os.path.basename(dest)
+        _write_index(index, keys_dir)
+    entry["template"] = os.path.basename(dest)
+    logger.info("Attached sheet template %s to %s", src_path, entry["name"])
+    return [qid for qid in key if qid not in template.qids()]
+
+def format_entry(entry):
+    return (f"[{entry['id']}] {entry['name']} - {entry['questions']} questions, "
+            f"{entry['total_marks']:g} marks ({entry['objective']} O / {entry['subjective']} S)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer key registry.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List registered answer keys")
+    add = sub.add_parser("add", help="Register an answer key CSV")
+    add.add_argument("path")
+    show = sub.add_parser("show", help="Show one key's manifest")
+    show.add_argument("ref", help="Key ID, ID prefix or stored file name")
+    sub.add_parser("rebuild", help="Rebuild the index from the key store")
+    template = sub.add_parser("template", help="Attach a sheet template (answer box layout) to a key")
+    template.add_argument("ref", help="Key ID, ID prefix or stored file name")
+    template.add_argument("path", help="Template JSON file")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for entry in list_keys():
+            print(format_entry(entry))
+    elif args.command == "add":
+        entry, created = register(args.path)
+        print(("Registered " if created else "Already registered: ") + format_entry(entry))
+    elif args.command == "show":
+        entry = get_key(args.ref)
+        if entry is None:
+            print(f"No answer key {args.ref}")
+            return 1
+        print(json.dumps(entry, indent=2))
+    elif args.command == "template":
+        entry = get_key(args.ref)
+        if entry is None:
+            print(f"No answer key {args.ref}")
+            return 1
+        try:
+            missing = attach_template(entry, args.path)
+        except ValueError as e:
+            print(f"Invalid template: {e}")
+            return 1
+        print(f"Attached {entry['template']} to {entry['name']}")
+        if missing:
+            print(f"No box for {', '.join(missing)}; those questions will read as blank")
+    elif args.command == "rebuild":
+        print(f"Indexed {len(rebuild_index()['keys'])} answer key(s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
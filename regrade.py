@@ -0,0 +1,171 @@
+# regrade.py
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+
+import registry
+from cohort import evaluate_cohort
+from evaluation import compile_answer_key, get_answer_key
+from results import apply_regrade, connect, graded_answer_keys, to_cents
+
+logger = logging.getLogger(__name__)
+
+def _entry(keydata):
+    return (keydata.get("answer", "") or "", float(keydata.get("marks", 1.0)), keydata.get("type", "S") or "S")
+
+def graded_versions(answer_key, db_path=None):
+    """
+    Every version of each question the stored results of answer_key were
+    scored with, read back from the detail rows in one pass:
+    {QID: {(answer, marks, type), ...}}.
+    """
+    conn = connect(db_path)
+    versions = defaultdict(set)
+    for qid, correct, marks, qtype in conn.execute(
+            "SELECT qid, correct_answer, marks, type FROM details WHERE answer_key = ? "
+            "GROUP BY qid, correct_answer, marks, type", (answer_key,)):
+        versions[qid].add(_entry({"answer": correct, "marks": marks, "type": qtype}))
+    return versions
+
+def stale_answers(answer_key, qid, keydata, db_path=None):
+    """
+    Stored answers to qid that were scored with a different answer, marks
+    or type than keydata, whichever key version each result was graded
+    with: (result_id, seq, student_answer, score) rows.
+    """
+    conn = connect(db_path)
+    return conn.execute(
+        "SELECT result_id, seq, student_answer, score FROM details "
+        "WHERE answer_key = ? AND qid = ? "
+        "AND (COALESCE(correct_answer, '') != ? OR marks != ? OR COALESCE(type, 'S') != ?)",
+        (answer_key, qid) + _entry(keydata)).fetchall()
+
+def regrade(answer_key, new_key, relabel=None, dry_run=False, db_path=None):
+    """
+    Re-score the stored results of answer_key against a corrected key.
+    Only the stored answers that were scored with a different answer, marks
+    or type than the corrected key are re-evaluated, from the student
+    answers already stored (no OCR), so results graded with older versions
+    of the key are brought up to date too. Removed questions are dropped
+    from the totals. Questions new to the key have no stored answers and are
+    only reported.
+
+    Args:
+        answer_key: stored key name the results were saved under
+        new_key: corrected key, dict QID -> {answer, marks, type}
+        relabel: optionally move the results to this key name
+        dry_run: compute the changes without writing them
+
+    Returns:
+        dict with Changed (QIDs with re-scored answers), Added and Removed
+        QIDs, Rescored (answers), Students (results checked) and StudentsChanged
+    """
+    start = time.perf_counter()
+    conn = connect(db_path)
+    versions = graded_versions(answer_key, db_path)
+    changed = [qid for qid in new_key
+               if qid in versions and versions[qid] != {_entry(new_key[qid])}]
+    added = [qid for qid in new_key if qid not in versions]
+    removed = sorted(set(versions) - set(new_key))
+    if added:
+        logger.warning("Questions %s are new to the key; re-scan those sheets to score them",
+                       ", ".join(added))
+
+    compiled = compile_answer_key(new_key)
+    delta = defaultdict(float)
+    updates = []
+    for qid in changed:
+        keydata = compiled[qid]
+        rows = stale_answers(answer_key, qid, keydata, db_path)
+        cohort = evaluate_cohort([{qid: answer or ""} for _, _, answer, _ in rows], {qid: keydata})
+        remarks = cohort.remarks[0]
+        for i, (result_id, seq, _, old_score) in enumerate(rows):
+            score = float(cohort.scores[i, 0])
+            updates.append((result_id, seq, score, float(keydata["marks"]), remarks[i],
+                            keydata["answer"], keydata["type"]))
+            delta[result_id] += score - old_score
+    for qid in removed:
+        for result_id, score in conn.execute(
+                "SELECT result_id, score FROM details WHERE answer_key = ? AND qid = ?", (answer_key, qid)):
+            delta[result_id] -= score
+
+    totals = {}
+    students = 0
+    for result_id, old_total in conn.execute(
+            "SELECT id, total_score FROM results WHERE answer_key = ?", (answer_key,)):
+        students += 1
+        if result_id in delta:
+            new_total = round(old_total + delta[result_id], 2)
+            if to_cents(new_total) != to_cents(old_total):
+                totals[result_id] = (old_total, new_total)
+
+    if not dry_run and (updates or removed or totals or relabel):
+        apply_regrade(answer_key, updates, totals, removed, relabel, db_path)
+    logger.info("Re-graded %s: %d answers re-scored, %d of %d totals changed in %.2fs",
+                answer_key, len(updates), len(totals), students, time.perf_counter() - start)
+    return {
+        "Changed": changed,
+        "Added": added,
+        "Removed": removed,
+        "Rescored": len(updates),
+        "Students": students,
+        "StudentsChanged": len(totals),
+    }
+
+def resolve_graded_key(ref, db_path=None):
+    """
+    Graded key name for a stored key name, key ID or ID prefix, or None.
+    """
+    graded = graded_answer_keys(db_path)
+    if ref in graded:
+        return ref
+    entry = registry.get_key(ref)
+    if entry is not None and entry["name"] in graded:
+        return entry["name"]
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Re-grade stored results against a corrected answer key, without OCR.")
+    parser.add_argument("answer_key", help="Graded answer key (stored name or key ID)")
+    parser.add_argument("corrected", help="Corrected answer key CSV (registered if new) or key ID")
+    parser.add_argument("--relabel", action="store_true",
+                        help="Move the results to the corrected key's name")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without saving them")
+    args = parser.parse_args(argv)
+
+    answer_key = resolve_graded_key(args.answer_key)
+    if answer_key is None:
+        print(f"No results for answer key {args.answer_key}")
+        return 1
+    if os.path.isfile(args.corrected):
+        entry = registry.register(args.corrected)[0]
+    else:
+        entry = registry.get_key(args.corrected)
+        if entry is None:
+            print(f"No answer key {args.corrected}")
+            return 1
+
+    start = time.perf_counter()
+    report = regrade(answer_key, get_answer_key(registry.key_path(entry)),
+                     relabel=entry["name"] if args.relabel and entry["name"] != answer_key else None,
+                     dry_run=args.dry_run)
+    elapsed = time.perf_counter() - start
+    if not (report["Changed"] or report["Removed"] or report["Added"]):
+        print(f"{entry['name']} scores the same as {answer_key}; nothing to re-grade")
+    else:
+        for label in ("Changed", "Removed", "Added"):
+            if report[label]:
+                print(f"{label} questions: {', '.join(report[label])}")
+        action = "would change" if args.dry_run else "changed"
+        print(f"Re-scored {report['Rescored']} answers in {elapsed:.2f}s; "
+              f"{report['StudentsChanged']} of {report['Students']} students' totals {action}")
+    if args.relabel and not args.dry_run and entry["name"] != answer_key:
+        print(f"Results moved to {entry['name']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
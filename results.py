@@ -1,21 +1,197 @@
 # results.py
-import pandas as pd
+import argparse
+import csv
+import logging
 import os
+import re
+import sqlite3
+import sys
+from collections import Counter
 from datetime import datetime
 import json
 
+import metrics
+from utils import configure_sqlite
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 ANSWER_KEYS_DIR = os.path.join(DATA_DIR, "answer_keys")
 RESULTS_FILE = os.path.join(DATA_DIR, "results.csv")
+RESULTS_DB = os.path.join(DATA_DIR, "results.db")
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLUMNS = ["Student", "EvaluatorUser", "AnswerKey", "Total Score", "Timestamp"]
+DETAIL_COLUMNS = ["StudentAnswer", "Score", "Marks", "Remark", "CorrectAnswer", "Type"]
+SCHEMA_VERSION = 4
+# Pass criterion: >= 33% of the maximum observed score
+PASS_FRACTION = 0.33
+PERCENTILES = (10, 25, 50, 75, 90)
+
+LEGACY_DETAILS_RE = re.compile(r"^(?P<name>.*)_(?P<ts>\d{8}_\d{6})_details\.csv$")
+
+# Open connections keyed by database path, each tagged with the process that
+# opened it: a forked worker must not reuse its parent's connection
+_CONNECTIONS = {}
+
+def connect(db_path=None):
+    """
+    Return the shared connection to the results database, creating or
+    upgrading the schema on first use. Legacy results.csv and per-student
+    *_details.csv files next to a new database are imported once so existing
+    history is kept.
+    """
+    db_path = db_path or RESULTS_DB
+    cached = _CONNECTIONS.get(db_path)
+    if cached is not None and cached[0] == os.getpid():
+        return cached[1]
+
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    configure_sqlite(conn, synchronous="NORMAL")
+
+    _migrate(conn, os.path.dirname(db_path))
+    _CONNECTIONS[db_path] = (os.getpid(), conn)
+    return conn
+
+def _migrate(conn, data_dir):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY,
+                    student TEXT NOT NULL,
+                    evaluator_user TEXT,
+                    answer_key TEXT NOT NULL,
+                    total_score REAL NOT NULL,
+                    timestamp TEXT NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_key ON results (answer_key)")
+            legacy_csv = os.path.join(data_dir, "results.csv")
+            if os.path.exists(legacy_csv):
+                _import_results_csv(conn, legacy_csv)
+            conn.execute("PRAGMA user_version = 1")
+
+    if version < 2:
+        with conn:
+            # Clustered by answer key so each key's rows are stored together
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS details (
+                    answer_key TEXT NOT NULL,
+                    result_id INTEGER NOT NULL REFERENCES results (id),
+                    seq INTEGER NOT NULL,
+                    qid TEXT NOT NULL,
+                    student TEXT NOT NULL,
+                    student_answer TEXT,
+                    score REAL NOT NULL,
+                    marks REAL NOT NULL,
+                    remark TEXT,
+                    correct_answer TEXT,
+                    type TEXT,
+                    PRIMARY KEY (answer_key, result_id, seq)
+                ) WITHOUT ROWID""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_details_student ON details (answer_key, student)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_details_qid ON details (answer_key, qid)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_student ON results (student)")
+            _import_details_csvs(conn, data_dir)
+            conn.execute("PRAGMA user_version = 2")
+
+    if version < 3:
+        with conn:
+            # Running aggregates per answer key, kept in step by save_results;
+            # scores are counted in integer cents so sums and the histogram are exact
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS key_stats (
+                    answer_key TEXT PRIMARY KEY,
+                    n INTEGER NOT NULL,
+                    sum_cents INTEGER NOT NULL,
+                    sumsq_cents INTEGER NOT NULL,
+                    min_cents INTEGER NOT NULL,
+                    max_cents INTEGER NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS score_histogram (
+                    answer_key TEXT NOT NULL,
+                    cents INTEGER NOT NULL,
+                    n INTEGER NOT NULL,
+                    PRIMARY KEY (answer_key, cents)
+                ) WITHOUT ROWID""")
+            _rebuild_aggregates(conn)
+            conn.execute("PRAGMA user_version = 3")
+
+    if version < 4:
+        with conn:
+            # Idempotency key of a result saved for a queued sheet
+            # (jobqueue.result_source); NULL for interactive grading
+            conn.execute("ALTER TABLE results ADD COLUMN source TEXT")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_source ON results (source)")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def _import_results_csv(conn, csv_path):
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = [(row.get("Student") or "", row.get("EvaluatorUser") or None,
+                 row.get("AnswerKey") or "", float(row.get("Total Score") or 0),
+                 row.get("Timestamp") or "")
+                for row in csv.DictReader(f)]
+    conn.executemany(
+        "INSERT INTO results (student, evaluator_user, answer_key, total_score, timestamp) "
+        "VALUES (?, ?, ?, ?, ?)", rows)
+    logger.info("Imported %d results from %s", len(rows), csv_path)
+
+def _safe_name(student_name):
+    return "".join(c if c.isalnum() or c in (' ', '_', '-') else '_' for c in student_name)
 
-os.makedirs(ANSWER_KEYS_DIR, exist_ok=True)
-os.makedirs(DATA_DIR, exist_ok=True)
+def _import_details_csvs(conn, data_dir):
+    """
+    Load legacy <Student>_<timestamp>_details.csv files, matched to their
+    summary row by student name and timestamp. The files are left in place.
+    """
+    if not os.path.isdir(data_dir):
+        return
+    by_name_ts = {}
+    for result_id, student, answer_key, ts in conn.execute(
+            "SELECT id, student, answer_key, timestamp FROM results"):
+        by_name_ts[(_safe_name(student), ts)] = (result_id, student, answer_key)
+
+    imported = 0
+    for name in os.listdir(data_dir):
+        m = LEGACY_DETAILS_RE.match(name)
+        if not m:
+            continue
+        match = by_name_ts.get((m.group("name"), m.group("ts")))
+        if not match:
+            continue
+        result_id, student, answer_key = match
+        with open(os.path.join(data_dir, name), newline='', encoding='utf-8') as f:
+            detailed = {row["QID"]: row for row in csv.DictReader(f)}
+        _insert_details(conn, result_id, student, answer_key, detailed)
+        imported += 1
+    if imported:
+        logger.info("Imported %d legacy details files from %s", imported, data_dir)
+
+def _insert_details(conn, result_id, student, answer_key, detailed_results):
+    conn.executemany(
+        "INSERT INTO details (answer_key, result_id, seq, qid, student, student_answer, "
+        "score, marks, remark, correct_answer, type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(answer_key, result_id, seq, qid, student, info.get("StudentAnswer"),
+          float(info.get("Score") or 0), float(info.get("Marks") or 0), info.get("Remark"),
+          info.get("CorrectAnswer"), info.get("Type"))
+         for seq, (qid, info) in enumerate(detailed_results.items())])
 
-def save_results(student_name, username, total_score, detailed_results, answer_key_name):
+def save_results(student_name, username, total_score, detailed_results, answer_key_name,
+                 source=None):
     """
-    - append summary to results.csv with columns:
-      Student, EvaluatorUser, AnswerKey, Total Score, Timestamp
-    - save detailed per-student file Student_timestamp_details.csv
+    - append summary to the results database (export_results_csv writes the
+      legacy results.csv with columns:
+      Student, EvaluatorUser, AnswerKey, Total Score, Timestamp)
+    - store the per-question rows in the details table
+      (export_details_csv writes the legacy Student_timestamp_details.csv)
+    source: idempotency key (e.g. jobqueue.result_source); a result already
+            saved under it is returned instead of being saved twice
+    Returns the summary and the result ID of the stored record.
+    Breaking change: the second value used to be the path of the details
+    CSV written for every save; no file is written now, so callers that
+    need it call export_details_csv(result_id).
     """
 
     # ✅ FIX: Use Windows-safe timestamp (no colons)
@@ -29,49 +205,320 @@ def save_results(student_name, username, total_score, detailed_results, answer_k
         "Timestamp": timestamp
     }
 
-    # write or append summary
-    if os.path.exists(RESULTS_FILE):
-        df = pd.read_csv(RESULTS_FILE)
-        df = pd.concat([df, pd.DataFrame([summary])], ignore_index=True)
-        df.to_csv(RESULTS_FILE, index=False)
-    else:
-        df = pd.DataFrame([summary])
-        df.to_csv(RESULTS_FILE, index=False)
+    # append summary and details in one transaction
+    # (a few INSERTs, independent of how many results exist)
+    conn = connect()
+    with metrics.timer("save"), conn:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO results (student, evaluator_user, answer_key, total_score, timestamp, source) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (student_name, username, answer_key_name, float(total_score), timestamp, source))
+        if cur.rowcount == 0:
+            # Saved before (a resumed or reclaimed sheet): keep the first result
+            row = conn.execute(
+                "SELECT id, student, evaluator_user, answer_key, total_score, timestamp "
+                "FROM results WHERE source = ?", (source,)).fetchone()
+            logger.info("Result for %s already saved as #%d", source, row[0])
+            return dict(zip(SUMMARY_COLUMNS, row[1:])), row[0]
+        result_id = cur.lastrowid
+        _insert_details(conn, result_id, student_name, answer_key_name, detailed_results)
+        _add_to_aggregates(conn, answer_key_name, total_score)
+
+    return summary, result_id
+
+def to_cents(score):
+    return int(round(float(score) * 100))
+
+def _add_to_aggregates(conn, answer_key, score, count=1):
+    """
+    Fold one saved total into its key's running aggregates (count=-1 takes
+    one out again; min and max are then left for a rebuild to tighten).
+    """
+    cents = to_cents(score)
+    conn.execute(
+        "INSERT INTO key_stats (answer_key, n, sum_cents, sumsq_cents, min_cents, max_cents) "
+        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (answer_key) DO UPDATE SET "
+        "n = n + excluded.n, sum_cents = sum_cents + excluded.sum_cents, "
+        "sumsq_cents = sumsq_cents + excluded.sumsq_cents, "
+        "min_cents = MIN(min_cents, excluded.min_cents), max_cents = MAX(max_cents, excluded.max_cents)",
+        (answer_key, count, count * cents, count * cents * cents, cents, cents))
+    conn.execute(
+        "INSERT INTO score_histogram (answer_key, cents, n) VALUES (?, ?, ?) "
+        "ON CONFLICT (answer_key, cents) DO UPDATE SET n = n + excluded.n",
+        (answer_key, cents, count))
+
+def _rebuild_aggregates(conn):
+    conn.execute("DELETE FROM key_stats")
+    conn.execute("DELETE FROM score_histogram")
+    conn.execute(
+        "INSERT INTO score_histogram (answer_key, cents, n) "
+        "SELECT answer_key, CAST(ROUND(total_score * 100) AS INTEGER) AS cents, COUNT(*) "
+        "FROM results GROUP BY answer_key, cents")
+    conn.execute(
+        "INSERT INTO key_stats (answer_key, n, sum_cents, sumsq_cents, min_cents, max_cents) "
+        "SELECT answer_key, SUM(n), SUM(n * cents), SUM(n * cents * cents), MIN(cents), MAX(cents) "
+        "FROM score_histogram WHERE n > 0 GROUP BY answer_key")
+
+def rebuild_aggregates(db_path=None):
+    """
+    Recompute every key's aggregates with a full scan of the results table
+    (after a restore, manual edits or removed results).
+    Returns the number of answer keys.
+    """
+    conn = connect(db_path)
+    with conn:
+        _rebuild_aggregates(conn)
+    return conn.execute("SELECT COUNT(*) FROM key_stats").fetchone()[0]
+
+def apply_regrade(answer_key, detail_updates, total_updates, removed_qids=(), relabel=None, db_path=None):
+    """
+    Write a re-grade of one answer key's results in a single transaction.
 
-    # safe file naming
-    safe_name = "".join(c if c.isalnum() or c in (' ', '_', '-') else '_' for c in student_name)
+    Args:
+        detail_updates: (result_id, seq, score, marks, remark, correct_answer, type)
+            rows for the re-scored questions
+        total_updates: {result_id: (old_total, new_total)} for changed totals
+        removed_qids: QIDs no longer in the key, whose rows are deleted
+        relabel: if given, move all of the key's results to this key name
 
-    details_file = os.path.join(DATA_DIR, f"{safe_name}_{timestamp}_details.csv")
-    detailed_df = pd.DataFrame.from_dict(detailed_results, orient='index')
-    detailed_df.index.name = "QID"
-    detailed_df.to_csv(details_file)
+    The running aggregates are shifted by the changed totals only (or
+    rebuilt from the results table when relabelling).
+    """
+    conn = connect(db_path)
+    with metrics.timer("save"), conn:
+        conn.executemany(
+            "UPDATE details SET score = ?, marks = ?, remark = ?, correct_answer = ?, type = ? "
+            "WHERE answer_key = ? AND result_id = ? AND seq = ?",
+            [(score, marks, remark, correct, qtype, answer_key, result_id, seq)
+             for result_id, seq, score, marks, remark, correct, qtype in detail_updates])
+        for qid in removed_qids:
+            conn.execute("DELETE FROM details WHERE answer_key = ? AND qid = ?", (answer_key, qid))
+        conn.executemany(
+            "UPDATE results SET total_score = ? WHERE id = ?",
+            [(float(new), result_id) for result_id, (old, new) in total_updates.items()])
+
+        if relabel:
+            conn.execute("UPDATE results SET answer_key = ? WHERE answer_key = ?", (relabel, answer_key))
+            conn.execute("UPDATE details SET answer_key = ? WHERE answer_key = ?", (relabel, answer_key))
+            _rebuild_aggregates(conn)
+            return
 
-    return summary, details_file
+        # Move each changed total between histogram buckets, one upsert per bucket
+        shifts = Counter()
+        for old, new in total_updates.values():
+            shifts[to_cents(old)] -= 1
+            shifts[to_cents(new)] += 1
+        for cents, count in shifts.items():
+            if count:
+                _add_to_aggregates(conn, answer_key, cents / 100, count)
+        conn.execute("DELETE FROM score_histogram WHERE answer_key = ? AND n = 0", (answer_key,))
+        conn.execute(
+            "UPDATE key_stats SET "
+            "min_cents = (SELECT MIN(cents) FROM score_histogram WHERE answer_key = ? AND n > 0), "
+            "max_cents = (SELECT MAX(cents) FROM score_histogram WHERE answer_key = ? AND n > 0) "
+            "WHERE answer_key = ?", (answer_key, answer_key, answer_key))
 
 def list_answer_keys():
-    files = sorted(os.listdir(ANSWER_KEYS_DIR))
-    return [f for f in files if f.lower().endswith(".csv")]
+    """
+    Stored answer key names, oldest upload first, read from the registry index.
+    """
+    import registry
+    return [entry["name"] for entry in registry.list_keys()]
+
+def export_results_csv(dest=None, db_path=None):
+    """
+    Write the legacy results.csv (one summary row per graded sheet).
+    """
+    dest = dest or RESULTS_FILE
+    conn = connect(db_path)
+    rows = conn.execute(
+        "SELECT student, evaluator_user, answer_key, total_score, timestamp "
+        "FROM results ORDER BY id")
+    tmp = dest + ".tmp"
+    count = 0
+    with open(tmp, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    os.replace(tmp, dest)
+    return dest, count
+
+def query_details(answer_key=None, student=None, qid=None, db_path=None):
+    """
+    Per-question rows filtered by answer key, student and/or QID.
+    Each row is a dict with ResultID, Student, AnswerKey, Timestamp, QID
+    and the legacy detail columns.
+    """
+    clauses = []
+    params = []
+    for column, value in (("d.answer_key", answer_key), ("d.student", student), ("d.qid", qid)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = connect(db_path).execute(
+        "SELECT d.result_id, d.student, d.answer_key, r.timestamp, d.qid, d.student_answer, "
+        "d.score, d.marks, d.remark, d.correct_answer, d.type "
+        "FROM details d JOIN results r ON r.id = d.result_id "
+        f"{where} ORDER BY d.answer_key, d.result_id, d.seq", params)
+    names = ["ResultID", "Student", "AnswerKey", "Timestamp", "QID"] + DETAIL_COLUMNS
+    return [dict(zip(names, row)) for row in rows]
+
+def find_results(student=None, answer_key=None, db_path=None):
+    """
+    Summary rows (ResultID, Student, AnswerKey, Total Score, Timestamp).
+    """
+    clauses = []
+    params = []
+    for column, value in (("student", student), ("answer_key", answer_key)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = connect(db_path).execute(
+        "SELECT id, student, answer_key, total_score, timestamp "
+        f"FROM results {where} ORDER BY id", params)
+    names = ["ResultID", "Student", "AnswerKey", "Total Score", "Timestamp"]
+    return [dict(zip(names, row)) for row in rows]
+
+def export_details_csv(result_id, dest=None, db_path=None):
+    """
+    Write the legacy per-student <Student>_<timestamp>_details.csv for one result.
+    """
+    conn = connect(db_path)
+    row = conn.execute("SELECT student, answer_key, timestamp FROM results WHERE id = ?",
+                       (result_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"No result with ID {result_id}")
+    student, answer_key, timestamp = row
+    if dest is None:
+        dest = os.path.join(DATA_DIR, f"{_safe_name(student)}_{timestamp}_details.csv")
 
-def class_analysis(result_file=RESULTS_FILE):
-    if not os.path.exists(result_file):
-        print("No results yet.")
+    rows = conn.execute(
+        "SELECT qid, student_answer, score, marks, remark, correct_answer, type "
+        "FROM details WHERE answer_key = ? AND result_id = ? ORDER BY seq",
+        (answer_key, result_id))
+    with open(dest, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["QID"] + DETAIL_COLUMNS)
+        writer.writerows(rows)
+    return dest
+
+def class_analysis(*, answer_key=None, db_path=None):
+    """
+    Score statistics for one answer key (or all keys together) from the
+    running aggregates, without reading the results themselves.
+    The arguments are keyword-only: this used to take the path of the
+    results CSV, which must not be mistaken for a key name.
+    """
+    conn = connect(db_path)
+    if answer_key is None:
+        stats = conn.execute(
+            "SELECT SUM(n), SUM(sum_cents), SUM(sumsq_cents), MIN(min_cents), MAX(max_cents) "
+            "FROM key_stats").fetchone()
+        histogram = conn.execute(
+            "SELECT cents, SUM(n) FROM score_histogram GROUP BY cents ORDER BY cents").fetchall()
+    else:
+        stats = conn.execute(
+            "SELECT n, sum_cents, sumsq_cents, min_cents, max_cents FROM key_stats WHERE answer_key = ?",
+            (answer_key,)).fetchone()
+        histogram = conn.execute(
+            "SELECT cents, n FROM score_histogram WHERE answer_key = ? ORDER BY cents",
+            (answer_key,)).fetchall()
+
+    if not stats or not stats[0]:
+        logger.info("No results yet.")
         return None
-    df = pd.read_csv(result_file)
-    total_students = len(df)
-    average_score = df["Total Score"].mean()
-    max_score = df["Total Score"].max()
-    min_score = df["Total Score"].min()
-    # pass criterion: >= 33% of maximum observed score in file
-    pass_mark_threshold = max_score * 0.33 if max_score and not pd.isna(max_score) else 0
-    passed = len(df[df["Total Score"] >= pass_mark_threshold])
-    failed = total_students - passed
+    n, sum_cents, sumsq_cents, min_cents, max_cents = stats
+    histogram = [(cents, count) for cents, count in histogram if count > 0]
+    mean = sum_cents / n / 100
+    variance = max(sumsq_cents / n - (sum_cents / n) ** 2, 0) / 10000
+    max_score = histogram[-1][0] / 100 if histogram else max_cents / 100
+    min_score = histogram[0][0] / 100 if histogram else min_cents / 100
+
+    pass_mark_threshold = max_score * PASS_FRACTION if max_score else 0
+    passed = sum(count for cents, count in histogram if cents / 100 >= pass_mark_threshold)
     analysis = {
-        "Total Students": int(total_students),
-        "Average Score": float(round(average_score, 2)) if total_students else 0.0,
-        "Highest Score": float(max_score) if not pd.isna(max_score) else 0.0,
-        "Lowest Score": float(min_score) if not pd.isna(min_score) else 0.0,
+        "AnswerKey": answer_key,
+        "Total Students": int(n),
+        "Average Score": float(round(mean, 2)),
+        "Std Dev": float(round(variance ** 0.5, 2)),
+        "Highest Score": float(max_score),
+        "Lowest Score": float(min_score),
+        "Median": histogram_percentile(histogram, 50),
+        "Percentiles": {p: histogram_percentile(histogram, p) for p in PERCENTILES},
         "Passed": int(passed),
-        "Failed": int(failed),
+        "Failed": int(n - passed),
         "PassThreshold": pass_mark_threshold
     }
     return analysis
+
+def graded_answer_keys(db_path=None):
+    """
+    Answer keys with at least one saved result.
+    """
+    return [row[0] for row in connect(db_path).execute(
+        "SELECT answer_key FROM key_stats WHERE n > 0 ORDER BY answer_key")]
+
+def histogram_percentile(histogram, percentile):
+    """
+    Nearest-rank percentile of a [(cents, count)] histogram sorted by cents.
+    """
+    total = sum(count for _, count in histogram)
+    if not total:
+        return None
+    rank = max(1, -(-percentile * total // 100))
+    seen = 0
+    for cents, count in histogram:
+        seen += count
+        if seen >= rank:
+            return cents / 100
+    return histogram[-1][0] / 100
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Results store maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Write the legacy results.csv from the results database")
+    export.add_argument("dest", nargs="?", default=None)
+    details = sub.add_parser("details", help="Write the legacy per-student details CSVs")
+    details.add_argument("--student", default=None)
+    details.add_argument("--key", default=None, help="Answer key name")
+    details.add_argument("--id", type=int, default=None, help="A single result ID")
+    stats = sub.add_parser("stats", help="Show score statistics per answer key")
+    stats.add_argument("--key", default=None, help="Only this answer key")
+    sub.add_parser("rebuild-stats", help="Recompute the per-key statistics from all results")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        dest, count = export_results_csv(args.dest)
+        print(f"Exported {count} results to {dest}")
+    elif args.command == "details":
+        if args.id is not None:
+            result_ids = [args.id]
+        else:
+            if args.student is None and args.key is None:
+                parser.error("details needs --student, --key or --id")
+            result_ids = [r["ResultID"] for r in find_results(args.student, args.key)]
+        for result_id in result_ids:
+            print(export_details_csv(result_id))
+        print(f"Exported {len(result_ids)} details file(s)")
+    elif args.command == "stats":
+        keys = [args.key] if args.key else graded_answer_keys()
+        for key in keys:
+            analysis = class_analysis(answer_key=key)
+            if analysis is None:
+                print(f"{key}: no results")
+                continue
+            percentiles = ", ".join(f"p{p} {v}" for p, v in analysis["Percentiles"].items())
+            print(f"{key}: n={analysis['Total Students']} mean={analysis['Average Score']} "
+                  f"sd={analysis['Std Dev']} min={analysis['Lowest Score']} "
+                  f"max={analysis['Highest Score']} ({percentiles}) "
+                  f"passed {analysis['Passed']}/{analysis['Total Students']}")
+    elif args.command == "rebuild-stats":
+        print(f"Rebuilt statistics for {rebuild_aggregates()} answer key(s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
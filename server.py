@@ -0,0 +1,368 @@
+# server.py
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from aiohttp import web
+
+from batch import SCAN_EXTENSIONS, grade_sheet
+from evaluation import get_answer_key, load_answer_key
+from ingest import set_thread_budget, share_of_cpus
+import registry
+from results import ANSWER_KEYS_DIR, DATA_DIR, save_results, class_analysis
+from utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = os.path.join(DATA_DIR, "uploads")
+CHUNK_SIZE = 256 * 1024
+# Finished jobs are dropped from the job table this many seconds after they end
+JOB_TTL_ENV = "JOB_TTL"
+DEFAULT_JOB_TTL = 3600
+
+# Upload limits per request; larger uploads are refused with 413
+MAX_UPLOAD_MB_ENV = "MAX_UPLOAD_MB"
+DEFAULT_MAX_UPLOAD_MB = 512
+MAX_UPLOAD_FILES_ENV = "MAX_UPLOAD_FILES"
+DEFAULT_MAX_UPLOAD_FILES = 500
+MAX_FIELD_BYTES = 64 * 1024
+
+def _env_number(name, default):
+    try:
+        return max(0.0, float(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+def job_ttl():
+    return _env_number(JOB_TTL_ENV, DEFAULT_JOB_TTL)
+
+def upload_limits():
+    """
+    (bytes, files) one request may upload.
+    """
+    return (int(_env_number(MAX_UPLOAD_MB_ENV, DEFAULT_MAX_UPLOAD_MB) * 1024 * 1024),
+            int(_env_number(MAX_UPLOAD_FILES_ENV, DEFAULT_MAX_UPLOAD_FILES)))
+
+def grade_file(image_path, answer_key_path):
+    """
+    Process-pool task: grade one uploaded scan (the compiled key is cached
+    per worker process).
+    """
+    return grade_sheet(image_path, get_answer_key(answer_key_path))
+
+class GradingService:
+    """
+    Holds the worker pools and the in-memory job table.
+    OCR and evaluation run on a bounded process pool; results-database and
+    key-store work runs on one dedicated thread (the SQLite connection is not
+    shared across threads) and other file work on the default executor, so
+    the event loop itself never blocks. Finished jobs are kept for job_ttl()
+    seconds.
+    """
+
+    def __init__(self, workers=None, max_queued=None):
+        self.workers = workers or os.cpu_count() or 1
+        # Booklet pages and template boxes share the CPUs left per process
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=set_thread_budget,
+                                        initargs=(share_of_cpus(self.workers),))
+        self.db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="results-db")
+        # Bounds sheets handed to the pool at once; the rest wait in their job
+        self.slots = asyncio.Semaphore(max_queued or 2 * self.workers)
+        self.jobs = {}
+        self.ttl = job_ttl()
+        self.max_upload_bytes, self.max_upload_files = upload_limits()
+
+    async def run_db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.db, fn, *args)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        self.db.shutdown()
+
+    def prune_jobs(self, now=None):
+        """
+        Drop jobs that finished more than ttl seconds ago.
+        """
+        cutoff = (now or time.time()) - self.ttl
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job["finished"] is not None and job["finished"] < cutoff]:
+            del self.jobs[job_id]
+
+    def new_job(self, answer_key, evaluator, sheets, upload_dir):
+        self.prune_jobs()
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "answer_key": answer_key,
+            "evaluator": evaluator,
+            "created": time.time(),
+            "finished": None,
+            "upload_dir": upload_dir,
+            "sheets": [{"student": student, "file": os.path.basename(path), "path": path,
+                        "status": "queued", "total": None, "result_id": None, "error": None}
+                       for student, path in sheets],
+        }
+        self.jobs[job_id] = job
+        return job
+
+    async def run_job(self, job):
+        job["status"] = "running"
+        key_path = os.path.join(ANSWER_KEYS_DIR, job["answer_key"])
+        await asyncio.gather(*(self.grade(job, sheet, key_path) for sheet in job["sheets"]))
+        failed = sum(1 for sheet in job["sheets"] if sheet["status"] == "failed")
+        job["status"] = "done" if not failed else "done_with_errors"
+        job["finished"] = time.time()
+        # The OCR cache and the results database keep what re-grading needs
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: shutil.rmtree(job["upload_dir"], ignore_errors=True))
+
+    async def grade(self, job, sheet, key_path):
+        loop = asyncio.get_running_loop()
+        async with self.slots:
+            sheet["status"] = "running"
+            try:
+                result = await loop.run_in_executor(self.pool, grade_file, sheet["path"], key_path)
+                if result["error"]:
+                    raise ValueError(result["error"])
+                _, result_id = await self.run_db(save_results, sheet["student"], job["evaluator"],
+                                                 result["total"], result["detailed"], job["answer_key"])
+            except Exception as e:
+                logger.warning("Job %s: %s failed: %s", job["id"], sheet["file"], e)
+                sheet["status"] = "failed"
+                sheet["error"] = str(e)
+                return
+        sheet["status"] = "done"
+        sheet["total"] = result["total"]
+        sheet["result_id"] = result_id
+
+SERVICE_KEY = web.AppKey("service", GradingService)
+TASKS_KEY = web.AppKey("tasks", set)
+
+def job_view(job):
+    done = sum(1 for s in job["sheets"] if s["status"] in ("done", "failed"))
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "answer_key": job["answer_key"],
+        "progress": {"done": done, "total": len(job["sheets"])},
+        "created": job["created"],
+        "finished": job["finished"],
+        "sheets": [{k: s[k] for k in ("student", "file", "status", "total", "result_id", "error")}
+                   for s in job["sheets"]],
+    }
+
+def _safe_filename(name):
+    name = os.path.basename(name or "")
+    return "".join(c if c.isalnum() or c in ("-", "_", ".") else "_" for c in name) or "upload"
+
+def _create_file(dest_dir, filename):
+    """
+    Open a new file for writing under the first free name like filename.
+    """
+    path = os.path.join(dest_dir, _safe_filename(filename))
+    base, ext = os.path.splitext(path)
+    n = 1
+    while True:
+        try:
+            return open(path, "xb")
+        except FileExistsError:
+            path = f"{base}_{n}{ext}"
+            n += 1
+
+def _too_large(max_size, actual_size):
+    return web.HTTPRequestEntityTooLarge(max_size=max_size, actual_size=actual_size,
+                                         text=f"Upload larger than {max_size} bytes")
+
+async def _save_part(part, dest_dir, max_bytes):
+    """
+    Stream one multipart file part to disk in chunks; the file system calls
+    run on the default executor. Refuses (413) a part over max_bytes.
+    Returns (path, size).
+    """
+    loop = asyncio.get_running_loop()
+    f = await loop.run_in_executor(None, _create_file, dest_dir, part.filename)
+    size = 0
+    try:
+        while True:
+            chunk = await part.read_chunk(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes, size)
+            await loop.run_in_executor(None, f.write, chunk)
+    finally:
+        await loop.run_in_executor(None, f.close)
+    return f.name, size
+
+async def _read_field(part):
+    """
+    A plain form field's text, at most MAX_FIELD_BYTES.
+    """
+    data = bytearray()
+    while True:
+        chunk = await part.read_chunk(CHUNK_SIZE)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_FIELD_BYTES:
+            raise _too_large(MAX_FIELD_BYTES, len(data))
+    return data.decode(part.get_charset(default="utf-8"), errors="replace").strip()
+
+def _check_content_length(request, max_bytes):
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise _too_large(max_bytes, request.content_length)
+
+async def upload_answer_key(request):
+    service = request.app[SERVICE_KEY]
+    _check_content_length(request, service.max_upload_bytes)
+    reader = await request.multipart()
+    part = await reader.next()
+    while part is not None and part.filename is None:
+        part = await reader.next()
+    if part is None:
+        raise web.HTTPBadRequest(text="Expected a CSV file field")
+    if not part.filename.lower().endswith(".csv"):
+        raise web.HTTPBadRequest(text="File must be a CSV file")
+
+    loop = asyncio.get_running_loop()
+    tmp_dir = await loop.run_in_executor(None, lambda: tempfile.mkdtemp(prefix="answer-key-"))
+    try:
+        tmp_path, _ = await _save_part(part, tmp_dir, service.max_upload_bytes)
+        try:
+            # Parse before storing so a broken key is rejected up front
+            await loop.run_in_executor(None, load_answer_key, tmp_path)
+        except Exception as e:
+            raise web.HTTPBadRequest(text=f"Invalid answer key: {e}")
+        entry, created = await service.run_db(registry.register, tmp_path)
+    finally:
+        await loop.run_in_executor(None, lambda: shutil.rmtree(tmp_dir, ignore_errors=True))
+    # A byte-identical upload resolves to the key already stored
+    return web.json_response(dict(entry, answer_key=entry["name"]), status=201 if created else 200)
+
+async def get_answer_keys(request):
+    service = request.app[SERVICE_KEY]
+    return web.json_response({"answer_keys": await service.run_db(registry.list_keys)})
+
+async def create_job(request):
+    """
+    Multipart form: answer_key=<stored key name>, evaluator=<name> (optional),
+    students=<comma-separated names> (optional, in file order),
+    then one or more scan files. Returns 202 with the job ID immediately,
+    or 413 past the upload limits (upload_limits()).
+    """
+    service = request.app[SERVICE_KEY]
+    _check_content_length(request, service.max_upload_bytes)
+    loop = asyncio.get_running_loop()
+    job_dir = os.path.join(UPLOADS_DIR, uuid.uuid4().hex)
+    await loop.run_in_executor(None, os.makedirs, job_dir)
+    fields = {}
+    files = []
+    try:
+        reader = await request.multipart()
+        remaining = service.max_upload_bytes
+        async for part in reader:
+            if part.filename is None:
+                fields[part.name] = await _read_field(part)
+            elif part.filename.lower().endswith(SCAN_EXTENSIONS):
+                if len(files) >= service.max_upload_files:
+                    raise web.HTTPRequestEntityTooLarge(
+                        max_size=service.max_upload_bytes, actual_size=service.max_upload_bytes - remaining,
+                        text=f"More than {service.max_upload_files} scans in one job")
+                path, size = await _save_part(part, job_dir, remaining)
+                remaining -= size
+                files.append(path)
+            else:
+                raise web.HTTPBadRequest(text=f"Unsupported scan type: {part.filename}")
+
+        # Stored key name or key ID
+        entry = await service.run_db(registry.get_key, os.path.basename(fields.get("answer_key", "")))
+        if entry is None or not await loop.run_in_executor(None, os.path.exists, registry.key_path(entry)):
+            raise web.HTTPBadRequest(text="Unknown or missing answer_key")
+        answer_key = entry["name"]
+        if not files:
+            raise web.HTTPBadRequest(text="No scans uploaded")
+    except Exception:
+        await loop.run_in_executor(None, lambda: shutil.rmtree(job_dir, ignore_errors=True))
+        raise
+
+    names = [n.strip() for n in fields.get("students", "").split(",") if n.strip()]
+    sheets = []
+    for i, path in enumerate(files):
+        student = names[i] if i < len(names) else os.path.splitext(os.path.basename(path))[0]
+        sheets.append((student, path))
+
+    job = service.new_job(answer_key, fields.get("evaluator") or None, sheets, job_dir)
+    task = asyncio.create_task(service.run_job(job))
+    request.app[TASKS_KEY].add(task)
+    task.add_done_callback(request.app[TASKS_KEY].discard)
+    return web.json_response(job_view(job), status=202,
+                             headers={"Location": f"/jobs/{job['id']}"})
+
+async def get_job(request):
+    job = request.app[SERVICE_KEY].jobs.get(request.match_info["job_id"])
+    if job is None:
+        raise web.HTTPNotFound(text="No such job")
+    return web.json_response(job_view(job))
+
+async def list_jobs(request):
+    service = request.app[SERVICE_KEY]
+    service.prune_jobs()
+    jobs = service.jobs.values()
+    return web.json_response({"jobs": [{"id": j["id"], "status": j["status"],
+                                        "progress": job_view(j)["progress"]} for j in jobs]})
+
+async def get_analytics(request):
+    # ?answer_key=<stored key name> for one key, all keys otherwise
+    answer_key = request.query.get("answer_key")
+    analysis = await request.app[SERVICE_KEY].run_db(lambda: class_analysis(answer_key=answer_key))
+    return web.json_response(analysis or {})
+
+def create_app(workers=None, max_queued=None):
+    app = web.Application()
+    app[TASKS_KEY] = set()
+
+    async def start(app):
+        os.makedirs(ANSWER_KEYS_DIR, exist_ok=True)
+        os.makedirs(UPLOADS_DIR, exist_ok=True)
+        app[SERVICE_KEY] = GradingService(workers, max_queued)
+
+    async def stop(app):
+        for task in app[TASKS_KEY]:
+            task.cancel()
+        app[SERVICE_KEY].close()
+
+    app.on_startup.append(start)
+    app.on_cleanup.append(stop)
+    app.add_routes([
+        web.get("/answer-keys", get_answer_keys),
+        web.post("/answer-keys", upload_answer_key),
+        web.get("/jobs", list_jobs),
+        web.post("/jobs", create_job),
+        web.get("/jobs/{job_id}", get_job),
+        web.get("/analytics", get_analytics),
+    ])
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP grading service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="OCR/evaluation worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    configure_logging("INFO")
+    web.run_app(create_app(args.workers), host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
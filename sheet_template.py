@@ -0,0 +1,136 @@
+# sheet_template.py
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from textextraction import _normalize_qid
+
+logger = logging.getLogger(__name__)
+
+# A key's template sits next to it: keys/physics.csv -> keys/physics.template.json
+TEMPLATE_SUFFIX = ".template.json"
+# Default page segmentation per question type: objective boxes hold one line
+# (psm 7; use "psm": 10 in the template for single-character boxes),
+# subjective boxes a block of text
+OBJECTIVE_PSM = 7
+SUBJECTIVE_PSM = 6
+
+_TEMPLATES = {}
+_lock = threading.Lock()
+
+class SheetTemplate:
+    """
+    Printed answer sheet layout: the page size the boxes are measured in and
+    one box per QID. regions is a list of (qid, page, (left, top, right, bottom), psm)
+    in sheet order; boxes are scaled to the size of the scan they are cut from.
+    """
+
+    def __init__(self, width, height, regions, digest):
+        self.width = width
+        self.height = height
+        self.regions = regions
+        self.digest = digest
+
+    @property
+    def pages(self):
+        return sorted({page for _, page, _, _ in self.regions})
+
+    def qids(self):
+        return [qid for qid, _, _, _ in self.regions]
+
+    def crop_regions(self, image, page=0):
+        """
+        Yield (qid, psm, cropped image) for the boxes on one page image.
+        """
+        sx = image.width / self.width
+        sy = image.height / self.height
+        for qid, region_page, (left, top, right, bottom), psm in self.regions:
+            if region_page != page:
+                continue
+            box = (max(0, round(left * sx)), max(0, round(top * sy)),
+                   min(image.width, round(right * sx)), min(image.height, round(bottom * sy)))
+            yield qid, psm, image.crop(box)
+
+def template_path(answer_key_path):
+    return os.path.splitext(answer_key_path)[0] + TEMPLATE_SUFFIX
+
+def parse_template(data, types=None):
+    """
+    Build a SheetTemplate from template JSON bytes:
+        {"page": {"width": 2480, "height": 3508},
+         "regions": {"Q1": {"box": [left, top, right, bottom], "page": 0, "psm": 7}, ...}}
+    "page" and "psm" of a region are optional; psm defaults by question type
+    (types: {QID: "O"/"S"}, e.g. from the answer key).
+    """
+    spec = json.loads(data)
+    try:
+        width = float(spec["page"]["width"])
+        height = float(spec["page"]["height"])
+        items = spec["regions"].items()
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Template needs page width/height and regions: {e}")
+    if width <= 0 or height <= 0:
+        raise ValueError("Template page size must be positive")
+
+    regions = []
+    for qid, region in items:
+        qid = _normalize_qid(str(qid).strip())
+        box = region.get("box") if isinstance(region, dict) else region
+        if not isinstance(box, (list, tuple)) or len(box) != 4:
+            raise ValueError(f"Template region {qid} needs a box [left, top, right, bottom]")
+        left, top, right, bottom = (float(v) for v in box)
+        if right <= left or bottom <= top:
+            raise ValueError(f"Template region {qid} has an empty box")
+        page = int(region.get("page", 0)) if isinstance(region, dict) else 0
+        psm = region.get("psm") if isinstance(region, dict) else None
+        if psm is None:
+            psm = OBJECTIVE_PSM if (types or {}).get(qid) == "O" else SUBJECTIVE_PSM
+        regions.append((qid, page, (left, top, right, bottom), int(psm)))
+    if not regions:
+        raise ValueError("Template has no regions")
+    return SheetTemplate(width, height, regions, hashlib.sha256(data).hexdigest())
+
+def load_template(path, types=None):
+    """
+    Load a template file (re-read only when the file changes).
+    """
+    stat = os.stat(path)
+    cache_id = (path, stat.st_mtime_ns, stat.st_size, tuple(sorted((types or {}).items())))
+    with _lock:
+        template = _TEMPLATES.get(path)
+        if template is not None and template[0] == cache_id:
+            return template[1]
+    with open(path, "rb") as f:
+        template = parse_template(f.read(), types)
+    with _lock:
+        _TEMPLATES[path] = (cache_id, template)
+    logger.info("Loaded sheet template %s: %d regions", path, len(template.regions))
+    return template
+
+def template_for_key(answer_key):
+    """
+    The sheet template stored next to a compiled answer key's file, or None
+    (no template, or an answer key that did not come from a file).
+    """
+    key_path = getattr(answer_key, "path", None)
+    if not key_path:
+        return None
+    path = template_path(key_path)
+    if not os.path.exists(path):
+        return None
+    types = {qid: keydata.get("type", "S") for qid, keydata in answer_key.items()}
+    try:
+        return load_template(path, types)
+    except (OSError, ValueError) as e:
+        logger.error("Ignoring sheet template %s: %s", path, e)
+        return None
+
+def format_answers(answers):
+    """
+    Region texts as raw sheet text, one "QID: answer" line per question, so
+    resumed runs and the OCR cache store them like page text and
+    parse_questions reads them back unchanged.
+    """
+    return "\n".join(f"{qid}: {' '.join(text.split())}" for qid, text in answers.items())
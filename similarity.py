@@ -0,0 +1,181 @@
+# similarity.py
+import argparse
+import csv
+import logging
+import os
+import re
+import sys
+from collections import Counter
+
+import numpy as np
+
+from evaluation import get_answer_key, evaluate_objective
+from records import QuestionResult
+from results import query_details
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset({'a', 'an', 'the', 'is', 'are', 'was', 'were', 'in', 'on', 'at', 'to', 'of',
+                        'and', 'or', 'it', 'its', 'by', 'for', 'with', 'as', 'be', 'this', 'that'})
+
+# Similarity at or below LOW scores 0, at or above HIGH full marks, linear between
+DEFAULT_LOW = 0.1
+DEFAULT_HIGH = 0.6
+# Awarded marks are rounded down to a multiple of this
+DEFAULT_STEP = 0.5
+
+def tokenize(text):
+    """
+    Lower-case word tokens of an answer, without stop words.
+    """
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOP_WORDS]
+
+def tfidf_similarity(model_answer, answers):
+    """
+    Cosine similarity between the model answer and every student answer in
+    one pass over a sparse TF-IDF representation (one entry per distinct
+    term of each answer, never a dense answers x vocabulary matrix).
+    Term frequency is sublinear (1 + log tf), so repeating a keyword adds
+    little; IDF is computed over the whole cohort, so words every student
+    writes count for less than the distinctive ones.
+    Returns a float array with one similarity in [0, 1] per answer.
+    """
+    vocab = {}
+    rows, cols, counts = [], [], []
+    # Document 0 is the model answer
+    for doc, text in enumerate([model_answer] + list(answers)):
+        tf = Counter(tokenize(text))
+        rows.extend([doc] * len(tf))
+        cols.extend([vocab.setdefault(token, len(vocab)) for token in tf])
+        counts.extend(tf.values())
+
+    n_docs = len(answers) + 1
+    if not vocab:
+        return np.zeros(len(answers))
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.float64)
+
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1 + n_docs) / (1 + df)) + 1
+    weights = (1 + np.log(counts)) * idf[cols]
+
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_docs))
+    model = np.zeros(len(vocab))
+    is_model = rows == 0
+    model[cols[is_model]] = weights[is_model]
+
+    dots = np.bincount(rows, weights=weights * model[cols], minlength=n_docs)
+    denom = norms * norms[0]
+    sims = np.divide(dots, denom, out=np.zeros(n_docs), where=denom > 0)
+    return np.clip(sims[1:], 0.0, 1.0)
+
+def similarity_to_marks(sims, marks, low=DEFAULT_LOW, high=DEFAULT_HIGH, step=DEFAULT_STEP):
+    """
+    Map similarities onto 0..marks: nothing up to low, full marks from
+    high, linear in between, rounded down to a multiple of step.
+    """
+    if high <= low:
+        raise ValueError("high threshold must be above low threshold")
+    fraction = np.clip((np.asarray(sims) - low) / (high - low), 0.0, 1.0)
+    scores = fraction * marks
+    if step:
+        scores = np.floor(scores / step + 1e-9) * step
+    return np.minimum(scores, marks)
+
+def similarity_remark(sim, score, marks):
+    if score >= marks:
+        return f"Excellent - Similarity {sim:.2f}"
+    if score > 0:
+        return f"Partial - Similarity {sim:.2f}"
+    return f"Insufficient - Similarity {sim:.2f}"
+
+def score_question(model_answer, answers, marks, low=DEFAULT_LOW, high=DEFAULT_HIGH, step=DEFAULT_STEP):
+    """
+    Score every student's answer to one subjective question.
+    Blank answers score 0. Returns (scores, similarities) arrays.
+    """
+    sims = tfidf_similarity(model_answer, answers)
+    scores = similarity_to_marks(sims, marks, low, high, step)
+    blank = np.fromiter((not (a or "").strip() for a in answers), dtype=bool, count=len(answers))
+    scores[blank] = 0.0
+    sims[blank] = 0.0
+    return scores, sims
+
+def evaluate_cohort(cohort, answer_key, low=DEFAULT_LOW, high=DEFAULT_HIGH, step=DEFAULT_STEP):
+    """
+    Evaluate a whole cohort with TF-IDF similarity scoring for subjective
+    questions (objective ones are still exact matches).
+
+    Args:
+        cohort: list of dicts QID -> answer text, one per student
+        answer_key: dict QID -> {answer, marks, type}
+
+    Returns:
+        list of (detailed_results, total_score), in cohort order, in the same
+        shape evaluate_all returns
+    """
+    details = [{} for _ in cohort]
+    totals = [0.0] * len(cohort)
+    for qid, keydata in answer_key.items():
+        correct = keydata.get("answer", "")
+        marks = float(keydata.get("marks", 1.0))
+        qtype = keydata.get("type", "S")
+        answers = [student.get(qid, "") for student in cohort]
+
+        if qtype == "O":
+            scored = [evaluate_objective(ans, correct, marks, keydata.get("answer_lower"))
+                      for ans in answers]
+        else:
+            scores, sims = score_question(correct, answers, marks, low, high, step)
+            scored = [(float(score), similarity_remark(sim, score, marks) if (ans or "").strip()
+                       else "No answer provided")
+                      for ans, score, sim in zip(answers, scores.tolist(), sims.tolist())]
+
+        for i, (ans, (score, remark)) in enumerate(zip(answers, scored)):
+            details[i][qid] = QuestionResult(ans, float(score), remark, keydata)
+            totals[i] += float(score)
+
+    logger.info("Scored %d students on %d questions by similarity", len(cohort), len(answer_key))
+    return [(detailed, round(total, 2)) for detailed, total in zip(details, totals)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Re-score a graded cohort's subjective answers by TF-IDF similarity "
+                    "for comparison (read-only; stored scores are not changed).")
+    parser.add_argument("answer_key", help="Path to the answer key CSV")
+    parser.add_argument("--stored-as", default=None,
+                        help="Answer key name in the results database (default: the file name)")
+    parser.add_argument("--low", type=float, default=DEFAULT_LOW)
+    parser.add_argument("--high", type=float, default=DEFAULT_HIGH)
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP)
+    parser.add_argument("--out", default=None, help="Write per-student totals to this CSV")
+    args = parser.parse_args(argv)
+
+    key = get_answer_key(args.answer_key)
+    keyname = args.stored_as or os.path.basename(args.answer_key)
+    by_result = {}
+    for row in query_details(answer_key=keyname):
+        entry = by_result.setdefault(row["ResultID"], (row["Student"], {}))
+        entry[1][row["QID"]] = row["StudentAnswer"] or ""
+    if not by_result:
+        print(f"No stored results for {keyname}")
+        return 1
+
+    result_ids = sorted(by_result)
+    scored = evaluate_cohort([by_result[r][1] for r in result_ids], key, args.low, args.high, args.step)
+    rows = [(r, by_result[r][0], total) for r, (_, total) in zip(result_ids, scored)]
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["ResultID", "Student", "Similarity Score"])
+            writer.writerows(rows)
+        print(f"Wrote {len(rows)} rows to {args.out}")
+    else:
+        for result_id, student, total in rows:
+            print(f"{result_id:>6}  {student:<30} {total}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import results
+
+KEY_CSV = (
+    "QID,Question,Answer,Marks,Type\n"
+    "1,q,Paris,1,O\n"
+    "2,q,Photosynthesis converts light energy into chemical energy,5,S\n"
+)
+SHEETS = {
+    "alice": "Q1: Paris\nQ2: light energy becomes chemical energy",
+    "bob": "Q1: London\nQ2: plants grow",
+    "carol": "Q1: paris\nQ2: photosynthesis converts light",
+}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    A private results database, the fake OCR engine and no OCR cache.
+    Returns the working directory, holding key.csv and scans/ (one scan per
+    SHEETS entry, its text in a sidecar file).
+    """
+    monkeypatch.setattr(results, "RESULTS_DB", str(tmp_path / "results.db"))
+    monkeypatch.setenv("OCR_ENGINE", "fake")
+    monkeypatch.setenv("OCR_CACHE", "0")
+    monkeypatch.setenv("OCR_PREPROCESS", "none")
+    results._CONNECTIONS.clear()
+
+    (tmp_path / "key.csv").write_text(KEY_CSV)
+    scans = tmp_path / "scans"
+    scans.mkdir()
+    for student, text in SHEETS.items():
+        (scans / f"{student}.png").write_bytes(b"scan")
+        (scans / f"{student}.png.txt").write_text(text)
+    yield tmp_path
+    results._CONNECTIONS.clear()
+
+def result_counts(db_path=None):
+    """
+    (results rows, details rows, students in key_stats) of the results database.
+    """
+    conn = results.connect(db_path)
+    return (conn.execute("SELECT COUNT(*) FROM results").fetchone()[0],
+            conn.execute("SELECT COUNT(*) FROM details").fetchone()[0],
+            conn.execute("SELECT COALESCE(SUM(n), 0) FROM key_stats").fetchone()[0])
@@ -0,0 +1,45 @@
+# tests/test_batch_resume.py
+import pytest
+
+import batch
+from jobqueue import DONE, JobJournal
+
+from conftest import SHEETS, result_counts
+
+class Crash(Exception):
+    pass
+
+class CrashingJournal(JobJournal):
+    """
+    Dies right after the first result is saved, before it is marked done.
+    """
+
+    def record_done(self, sheet_id, total, result_id, worker=None):
+        raise Crash()
+
+def test_crash_between_save_and_record_done_does_not_duplicate(store):
+    key, scans, journal_path = str(store / "key.csv"), str(store / "scans"), str(store / "jobs.db")
+
+    with pytest.raises(Crash):
+        batch.run_batch(key, scans, workers=1, max_inflight=1, journal=CrashingJournal(journal_path))
+    saved, _, _ = result_counts()
+    assert saved == 1
+
+    summary = batch.run_batch(key, scans, workers=1, journal=JobJournal(journal_path))
+    assert summary["Graded"] == len(SHEETS)
+    assert result_counts() == (len(SHEETS), 2 * len(SHEETS), len(SHEETS))
+    journal = JobJournal(journal_path)
+    assert journal.counts() == {DONE: len(SHEETS)}
+    result_ids = [row[0] for row in journal.conn.execute("SELECT result_id FROM sheets")]
+    assert sorted(result_ids) == list(range(1, len(SHEETS) + 1))
+
+def test_regrade_after_prioritize_saves_a_new_result(store):
+    key, scans, journal_path = str(store / "key.csv"), str(store / "scans"), str(store / "jobs.db")
+    journal = JobJournal(journal_path)
+    batch.run_batch(key, scans, workers=1, journal=journal)
+    run = batch.default_run_id(key, scans)
+
+    assert journal.prioritize(run, [str(store / "scans" / "alice.png")]) == 1
+    summary = batch.run_batch(key, scans, workers=1, journal=journal)
+    assert summary["Graded"] == 1
+    assert result_counts()[0] == len(SHEETS) + 1
@@ -0,0 +1,52 @@
+# tests/test_benchmarks.py
+import importlib.util
+import json
+import os
+
+import pytest
+
+import ocr_engines
+import results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def bench(monkeypatch, tmp_path):
+    """
+    benchmarks/run.py with a tiny size, its global state restored afterwards.
+    """
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "benchmarks"))
+    monkeypatch.setenv("OCR_CACHE", "0")  # run.py sets it on import
+    spec = importlib.util.spec_from_file_location("bench_run", os.path.join(ROOT, "benchmarks", "run.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setitem(module.SIZES, "tiny", {"questions": 5, "students": 10})
+    monkeypatch.setattr(results, "RESULTS_DB", str(tmp_path / "results.db"))
+    monkeypatch.setattr(ocr_engines, "_DEFAULT_ENGINE", None)
+    return module
+
+def test_missing_baseline_is_not_a_pass(bench, tmp_path, capsys):
+    baseline = str(tmp_path / "baseline.json")
+    assert bench.main(["--size", "tiny", "--repeat", "1", "--baseline", baseline]) == 2
+    assert "SKIPPED" in capsys.readouterr().out
+
+def test_compares_against_stored_baseline(bench, tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    argv = ["--size", "tiny", "--repeat", "1", "--baseline", baseline]
+    assert bench.main(argv + ["--update-baseline"]) == 0
+    # Another size in the file is still no baseline for this one
+    assert bench.main(["--size", "small", "--repeat", "1", "--baseline", baseline]) == 2
+
+    with open(baseline, encoding="utf-8") as f:
+        stored = json.load(f)
+    for stats in stored["tiny"]["stages"].values():
+        stats["us_per_item"] *= 1000
+    with open(baseline, "w", encoding="utf-8") as f:
+        json.dump(stored, f)
+    assert bench.main(argv) == 0
+
+    for stats in stored["tiny"]["stages"].values():
+        stats["us_per_item"] /= 1e6
+    with open(baseline, "w", encoding="utf-8") as f:
+        json.dump(stored, f)
+    assert bench.main(argv) == 1
@@ -0,0 +1,56 @@
+# tests/test_cohort.py
+import os
+
+import pytest
+
+import matcher
+from cohort import evaluate_cohort
+from evaluation import clear_answer_key_cache, evaluate_all, get_answer_key
+from textextraction import parse_questions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def synthetic_cohort(monkeypatch, tmp_path):
+    """
+    (compiled key, list of student answer dicts) from benchmarks/synthetic.py.
+    """
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "benchmarks"))
+    import synthetic
+
+    def build(questions=25, students=150, noise=0.1):
+        rows = synthetic.generate_answer_key(questions)
+        key_path = synthetic.write_answer_key(rows, str(tmp_path / "key.csv"))
+        clear_answer_key_cache()
+        key = get_answer_key(key_path)
+        sheets = synthetic.generate_sheets(rows, students, noise)
+        # Blank and missing answers as well
+        cohort = [dict(parse_questions(text)) for _, text in sheets] + [{}, {qid: "" for qid in key}]
+        return key, cohort
+
+    yield build
+    clear_answer_key_cache()
+
+@pytest.mark.parametrize("fuzzy", [0, 1])
+def test_same_results_as_evaluate_all(synthetic_cohort, monkeypatch, fuzzy):
+    monkeypatch.setenv(matcher.FUZZY_DISTANCE_ENV, str(fuzzy))
+    key, cohort = synthetic_cohort()
+
+    result = evaluate_cohort(cohort, key)
+    assert len(result) == len(cohort)
+    for i, answers in enumerate(cohort):
+        expected, total = evaluate_all(answers, key)
+        detailed, cohort_total = result.detailed(i)
+        assert cohort_total == total
+        assert detailed == expected
+    assert list(result.scores.shape) == [len(cohort), len(key)]
+
+def test_columns_and_iteration(store):
+    key = get_answer_key(str(store / "key.csv"))
+    cohort = [{"Q1": "Paris"}, {"Q1": "London"}, {"Q1": " paris "}]
+    result = evaluate_cohort(cohort, key)
+    assert result.column("Q1").tolist() == [1.0, 0.0, 1.0]
+    assert [total for _, total in result] == result.totals
+    # Plain (uncompiled) keys are accepted too
+    plain = {qid: {f: entry[f] for f in ("answer", "marks", "type")} for qid, entry in key.items()}
+    assert evaluate_cohort(cohort, plain).totals == result.totals
@@ -0,0 +1,50 @@
+# tests/test_evaluation.py
+import os
+
+import pytest
+
+import evaluation
+from evaluation import get_answer_key, load_answer_key
+
+@pytest.fixture
+def key_file(store):
+    evaluation.clear_answer_key_cache()
+    yield store / "key.csv"
+    evaluation.clear_answer_key_cache()
+
+def set_mtime(path, ns):
+    os.utime(path, ns=(ns, ns))
+
+def test_compiled_key_matches_the_loaded_key(key_file):
+    key = get_answer_key(str(key_file))
+    plain = load_answer_key(str(key_file))
+    assert {qid: {f: entry[f] for f in ("answer", "marks", "type")} for qid, entry in key.items()} == plain
+    assert key["Q1"]["answer_lower"] == "paris"
+    assert key.path == os.path.abspath(key_file)
+
+def test_unchanged_file_is_served_from_the_cache(key_file):
+    key = get_answer_key(str(key_file))
+    assert get_answer_key(str(key_file)) is key
+    # A relative path to the same file shares the entry
+    assert get_answer_key(os.path.relpath(key_file)) is key
+
+def test_touched_file_with_same_content_keeps_the_compiled_key(key_file):
+    key = get_answer_key(str(key_file))
+    set_mtime(key_file, os.stat(key_file).st_mtime_ns + 10**9)
+    assert get_answer_key(str(key_file)) is key
+
+def test_edited_file_is_reloaded(key_file):
+    key = get_answer_key(str(key_file))
+    mtime = os.stat(key_file).st_mtime_ns
+    # Same size, so only the mtime and the content hash tell them apart
+    key_file.write_text(key_file.read_text().replace("Paris", "Rome!"))
+    set_mtime(key_file, mtime + 10**9)
+
+    edited = get_answer_key(str(key_file))
+    assert edited is not key
+    assert edited["Q1"]["answer"] == "Rome!"
+    assert edited.content_hash != key.content_hash
+
+def test_missing_file(key_file):
+    with pytest.raises(FileNotFoundError):
+        get_answer_key(str(key_file.parent / "missing.csv"))
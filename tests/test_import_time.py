@@ -0,0 +1,16 @@
+# tests/test_import_time.py
+import importlib.util
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "benchmarks", "bench_import.py")
+
+def test_entry_points_import_within_budget():
+    # server needs aiohttp installed to import at all
+    modules = [] if importlib.util.find_spec("aiohttp") else \
+        ["main", "batch", "worker", "results", "jobqueue", "ocr_cache"]
+    proc = subprocess.run([sys.executable, SCRIPT] + modules, cwd=ROOT,
+                          capture_output=True, text=True, timeout=300)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
@@ -0,0 +1,61 @@
+# tests/test_ingest.py
+import os
+
+import pytest
+
+import batch
+import ingest
+
+def test_pool_workers_get_their_share_of_threads(store, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(ingest, "_THREAD_BUDGET", None)
+    assert ingest.default_workers(20) == 8
+    assert ingest.default_workers(3) == 3
+
+    batch._init_worker(str(store / "key.csv"), "WARNING", 2)
+    assert ingest.default_workers(20) == 2
+    batch._init_worker(str(store / "key.csv"), "WARNING", 1)
+    assert ingest.default_workers(20) == 1
+
+def test_regions_skip_steps_that_move_the_page(tmp_path, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    from ocr_engines import OCREngine
+    from sheet_template import parse_template
+
+    class SizeEngine(OCREngine):
+        name = "size"
+
+        def image_to_string(self, image, psm=6, lang="eng"):
+            return f"{image.width}x{image.height}"
+
+    seen = []
+    preprocess_image = ingest.preprocess_image
+    monkeypatch.setattr(ingest, "preprocess_image",
+                        lambda img, steps: seen.append(steps) or preprocess_image(img, steps))
+    path = tmp_path / "sheet.png"
+    Image.new("L", (200, 100), 255).save(path)
+    template = parse_template(b'{"page": {"width": 200, "height": 100}, '
+                              b'"regions": {"Q1": {"box": [0, 0, 100, 50]}}}')
+
+    raw = ingest.extract_text_from_regions(str(path), template, use_cache=False, engine=SizeEngine(),
+                                           preprocess="grayscale,crop,deskew", workers=1)
+    assert seen == [("grayscale",)]
+    assert raw == "Q1: 100x50"
+
+def test_thread_budget_from_the_environment(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(ingest, "_THREAD_BUDGET", None)
+    monkeypatch.setenv(ingest.OCR_THREADS_ENV, "3")
+    assert ingest.default_workers(20) == 3
+    assert ingest.share_of_cpus(3) == 2
+    assert ingest.share_of_cpus(16) == 1
+
+def test_server_pool_processes_get_their_share(monkeypatch):
+    pytest.importorskip("aiohttp")
+    import server
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    service = server.GradingService(workers=4)
+    try:
+        assert service.pool.submit(ingest.default_workers, 20).result() == 2
+    finally:
+        service.close()
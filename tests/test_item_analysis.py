@@ -0,0 +1,59 @@
+# tests/test_item_analysis.py
+import numpy as np
+import pytest
+
+import item_analysis
+from results import save_results
+
+SCORES = np.array([[1, 1, 2],
+                   [1, 0, 1],
+                   [0, 1, 0],
+                   [0, 0, 0]], dtype=float)
+MARKS = np.array([1, 1, 2], dtype=float)
+
+def test_statistics_of_a_known_matrix():
+    stats = item_analysis.item_statistics(SCORES, MARKS)
+    assert stats["Mean"].tolist() == [0.5, 0.5, 0.75]
+    assert stats["Difficulty"].tolist() == [0.5, 0.5, 0.375]
+    # One student per group: totals 4 (top) and 0 (bottom)
+    assert stats["Discrimination"].tolist() == [1.0, 1.0, 1.0]
+    assert stats["FullMarks"].tolist() == [0.5, 0.5, 0.25]
+    assert stats["Zero"].tolist() == [0.5, 0.5, 0.5]
+    assert stats["StdDev"] == pytest.approx(SCORES.std(axis=0))
+
+def test_point_biserial_leaves_the_item_out_of_the_total():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 3, size=(40, 6)).astype(float)
+    stats = item_analysis.item_statistics(scores, np.full(6, 2.0))
+    for j in range(6):
+        rest = scores.sum(axis=1) - scores[:, j]
+        assert stats["PointBiserial"][j] == pytest.approx(np.corrcoef(scores[:, j], rest)[0, 1])
+
+def test_constant_items_and_tiny_cohorts():
+    stats = item_analysis.item_statistics(np.array([[1.0, 0.0], [1.0, 1.0]]), np.array([1.0, 1.0]))
+    # Everyone got item 1 right: no correlation to report
+    assert np.isnan(stats["PointBiserial"][0])
+    single = item_analysis.item_statistics(np.array([[1.0, 0.0]]), np.array([1.0, 1.0]))
+    assert np.isnan(single["Discrimination"]).all()
+
+def detail(qid_scores):
+    return {qid: {"StudentAnswer": "a", "Score": score, "Marks": marks, "Remark": "",
+                  "CorrectAnswer": "a", "Type": "O" if marks == 1 else "S"}
+            for qid, (score, marks) in qid_scores.items()}
+
+def test_report_from_stored_results(store, monkeypatch):
+    monkeypatch.setattr(item_analysis, "FETCH_ROWS", 2)
+    # The oldest result still has Q9, which the key no longer has
+    save_results("dan", "t", 1.0, detail({"Q1": (0, 1), "Q2": (0, 1), "Q3": (0, 2), "Q9": (1, 1)}), "k.csv")
+    for student, row in zip(["alice", "bob", "carol"], SCORES[:3]):
+        save_results(student, "t", row.sum(), detail({"Q1": (row[0], 1), "Q2": (row[1], 1), "Q3": (row[2], 2)}), "k.csv")
+
+    matrix = item_analysis.load_score_matrix("k.csv")
+    assert matrix.qids == ["Q1", "Q2", "Q3", "Q9"]
+    assert matrix.types == ["O", "O", "S", "O"]
+    assert matrix.scores.tolist() == [[0, 0, 0, 1], [1, 1, 2, 0], [1, 0, 1, 0], [0, 1, 0, 0]]
+
+    report = item_analysis.item_analysis("k.csv")
+    assert [list(row) for row in report] == [item_analysis.REPORT_COLUMNS] * 4
+    assert (report[2]["QID"], report[2]["Marks"], report[2]["Students"], report[2]["Difficulty"]) == ("Q3", 2.0, 4, 0.375)
+    assert item_analysis.item_analysis("other.csv") is None
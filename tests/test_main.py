@@ -0,0 +1,31 @@
+# tests/test_main.py
+import pytest
+
+import main
+
+def answers(monkeypatch, *replies):
+    replies = iter(replies)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+
+@pytest.mark.parametrize("choice", ["0", "-1", "3", "x"])
+def test_regrade_flow_rejects_out_of_range_choices(monkeypatch, capsys, choice):
+    monkeypatch.setattr(main, "graded_answer_keys", lambda: ["a.csv", "b.csv"])
+    monkeypatch.setattr(main, "choose_answer_key", lambda: pytest.fail("picked a key"))
+    answers(monkeypatch, choice)
+    main.regrade_flow()
+    assert "Invalid choice." in capsys.readouterr().out
+
+def test_exit_keeps_its_menu_number(monkeypatch, capsys):
+    monkeypatch.setattr(main, "ensure_dirs", lambda: None)
+    monkeypatch.setattr(main, "regrade_flow", lambda: pytest.fail("started a re-grade"))
+    answers(monkeypatch, "5")
+    main.main()
+    assert "Goodbye" in capsys.readouterr().out
+
+@pytest.mark.parametrize("choice", ["0", "-1", "3", "x"])
+def test_analytics_flow_rejects_out_of_range_choices(monkeypatch, capsys, choice):
+    monkeypatch.setattr(main, "graded_answer_keys", lambda: ["a.csv", "b.csv"])
+    monkeypatch.setattr(main, "class_analysis", lambda **kwargs: pytest.fail("showed analytics"))
+    answers(monkeypatch, choice)
+    main.analytics_flow()
+    assert "Invalid choice." in capsys.readouterr().out
@@ -0,0 +1,117 @@
+# tests/test_matcher.py
+import random
+
+import pytest
+
+import matcher
+from evaluation import evaluate_subjective, keyword_score, subjective_keywords
+from matcher import KeywordMatcher
+
+MODEL = "Photosynthesis converts light energy into chemical energy stored in glucose"
+ANSWERS = [
+    "Plants use LIGHT to make glucose",
+    "photosynthesis: light energy -> chemical energy",
+    "energy energy energy",
+    "",
+    "nothing relevant here",
+]
+
+def legacy_find(keywords, text):
+    # The rule evaluate_subjective used before the compiled matcher
+    return [kw for kw in keywords if kw.lower() in text.lower()]
+
+@pytest.mark.parametrize("use_automaton", [False, True])
+def test_matches_the_legacy_substring_rule(use_automaton):
+    if use_automaton:
+        pytest.importorskip("ahocorasick")
+    # Duplicates and keywords inside other keywords ("energy" in "energy stored")
+    keywords = subjective_keywords(MODEL) + ["Energy", "energy stored", "light"]
+    m = KeywordMatcher(keywords, use_automaton=use_automaton, max_distance=0)
+    assert (m.automaton is not None) == use_automaton
+    for text in ANSWERS + [MODEL]:
+        assert m.find(text) == legacy_find(keywords, text)
+
+def test_automaton_only_for_long_keyword_lists():
+    pytest.importorskip("ahocorasick")
+    short = [f"word{i}" for i in range(matcher.AUTOMATON_MIN_KEYWORDS - 1)]
+    assert KeywordMatcher(short).automaton is None
+    assert KeywordMatcher(short + ["another"]).automaton is not None
+
+def test_falls_back_without_pyahocorasick(monkeypatch):
+    monkeypatch.setattr(matcher, "_AHOCORASICK", [None])
+    m = KeywordMatcher(["light", "glucose"], use_automaton=True)
+    assert m.automaton is None
+    assert m.find(ANSWERS[0]) == ["light", "glucose"]
+
+def test_scores_are_unchanged_by_the_matcher():
+    keywords = subjective_keywords(MODEL)
+    m = KeywordMatcher(keywords, max_distance=0)
+    for text in filter(None, ANSWERS):
+        expected = keyword_score(len(legacy_find(keywords, text)), keywords, 5)
+        assert evaluate_subjective(text, MODEL, 5, matcher=m) == expected
+
+def test_bounded_edit_distance():
+    assert matcher.bounded_edit_distance("photosynthesis", "photosynthesis", 2) == 0
+    assert matcher.bounded_edit_distance("photosynthesis", "photosynthcsis", 2) == 1
+    assert matcher.bounded_edit_distance("photosynthesis", "fotosynthesis", 2) == 2
+    assert matcher.bounded_edit_distance("photosynthesis", "fotosinthesis", 2) is None
+    assert matcher.bounded_edit_distance("abc", "abcdef", 2) is None
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def test_banded_distance_agrees_with_the_full_table():
+    rng = random.Random(0)
+    for _ in range(2000):
+        a = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+        b = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+        limit = rng.randint(0, 3)
+        full = levenshtein(a, b)
+        assert matcher.bounded_edit_distance(a, b, limit) == (full if full <= limit else None), (a, b, limit)
+
+def test_fuzzy_matches_ocr_misreads():
+    m = KeywordMatcher(["Photosynthesis", "chlorophyll", "light"], max_distance=2)
+    matched, fuzzy = m.match("photosynthcsis needs chl0rophyll and light")
+    assert matched == ["Photosynthesis", "chlorophyll", "light"]
+    assert fuzzy == {"Photosynthesis": "photosynthcsis", "chlorophyll": "chl0rophyll"}
+
+def test_short_keywords_only_match_exactly():
+    # One edit per FUZZY_MIN_LENGTH characters: "cell" (4) gets none, "water" (5) one
+    m = KeywordMatcher(["cell", "water"], max_distance=2)
+    assert m.allowed_distance("cell") == 0
+    assert m.match("the celt absorbs watr") == (["water"], {"water": "watr"})
+    assert m.match("the celt absorbs wotar") == ([], {})
+
+def test_fuzzy_matching_is_off_by_default(monkeypatch):
+    monkeypatch.delenv(matcher.FUZZY_DISTANCE_ENV, raising=False)
+    assert KeywordMatcher(["photosynthesis"]).match("photosynthcsis") == ([], {})
+    monkeypatch.setenv(matcher.FUZZY_DISTANCE_ENV, "1")
+    assert KeywordMatcher(["photosynthesis"]).match("photosynthcsis")[1] == {"photosynthesis": "photosynthcsis"}
+
+def test_fuzzy_matches_are_named_in_the_remark():
+    keywords = ["photosynthesis", "chlorophyll"]
+    score, remark = evaluate_subjective("photosynthcsis uses chlorophyll", MODEL, 4,
+                                        matcher=KeywordMatcher(keywords, max_distance=1))
+    assert score == 4.0
+    assert remark.endswith(" (fuzzy: photosynthcsis~photosynthesis)")
+    # Exact answers keep the plain remark
+    _, exact = evaluate_subjective("photosynthesis uses chlorophyll", MODEL, 4,
+                                   matcher=KeywordMatcher(keywords, max_distance=1))
+    assert "fuzzy" not in exact
+
+def test_bigram_index_finds_what_a_full_scan_finds():
+    rng = random.Random(1)
+    words = ["".join(rng.choices("abcde", k=rng.randint(3, 9))) for _ in range(300)]
+    index = matcher.TokenIndex(" ".join(words))
+    for word in words[:100]:
+        probe = word[:2] + rng.choice("abcde") + word[3:]
+        for limit in (1, 2):
+            found = index.search(probe, limit)
+            best = min(levenshtein(probe, token) for token in index.tokens)
+            assert (found[1] if found else None) == (best if best <= limit else None)
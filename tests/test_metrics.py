@@ -0,0 +1,64 @@
+# tests/test_metrics.py
+import logging
+import pickle
+
+import pytest
+
+import metrics
+from batch import grade_sheet
+from evaluation import get_answer_key
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_counters_and_histograms():
+    metrics.inc("cache_total", result="hit")
+    metrics.inc("cache_total", 2, result="hit")
+    metrics.inc("cache_total", result="miss")
+    metrics.observe("latency", 0.003)
+    metrics.observe("latency", 100.0)
+
+    snap = metrics.snapshot()
+    assert sorted((labels["result"], value) for _, labels, value in snap["counters"]) == [("hit", 3), ("miss", 1)]
+    (_, _, hist), = snap["histograms"]
+    assert hist["count"] == 2 and hist["sum"] == pytest.approx(100.003)
+    # 0.003 lands in the 0.005 bucket; 100s is above every bound
+    assert hist["buckets"][metrics.DEFAULT_BUCKETS.index(0.005)] == 1
+    assert sum(hist["buckets"]) == 1
+
+def test_worker_snapshots_merge_into_the_parent():
+    with metrics.timer("ocr"):
+        pass
+    metrics.inc("sheets")
+    snap = pickle.loads(pickle.dumps(metrics.snapshot()))
+    metrics.merge(snap)
+    assert metrics.stage_seconds()["ocr"][1] == 2
+    assert metrics.snapshot()["counters"] == [["sheets", {}, 2]]
+
+def test_prometheus_buckets_are_cumulative():
+    metrics.observe("latency", 0.003, stage="x")
+    metrics.observe("latency", 0.2, stage="x")
+    text = metrics.export_prometheus()
+    assert "# TYPE latency histogram" in text
+    assert 'latency_bucket{stage="x",le="0.005"} 1' in text
+    assert 'latency_bucket{stage="x",le="0.25"} 2' in text
+    assert 'latency_bucket{stage="x",le="+Inf"} 2' in text
+    assert 'latency_count{stage="x"} 2' in text
+
+def test_grading_records_stage_times(store, tmp_path):
+    result = grade_sheet(str(store / "scans" / "alice.png"), get_answer_key(str(store / "key.csv")))
+    assert result["error"] is None
+    assert {"sheet", "ocr", "parse", "evaluate"} <= set(metrics.stage_seconds())
+
+    path = metrics.write(str(tmp_path / "metrics.prom"))
+    with open(path, encoding="utf-8") as f:
+        assert 'grading_stage_seconds_count{stage="sheet"} 1' in f.read()
+
+def test_per_question_logging_is_quiet_by_default(store, caplog):
+    caplog.set_level(logging.INFO)
+    grade_sheet(str(store / "scans" / "alice.png"), get_answer_key(str(store / "key.csv")))
+    assert not [r for r in caplog.records if r.levelno < logging.INFO]
+    assert not any("Q2" in r.getMessage() for r in caplog.records)
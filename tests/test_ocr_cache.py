@@ -0,0 +1,42 @@
+# tests/test_ocr_cache.py
+import ocr_cache
+from conftest import SHEETS
+from ocr_engines import FakeOCREngine
+from textextraction import extract_text_from_image
+
+def test_identical_scans_keep_their_own_text(store, monkeypatch):
+    # Every fixture scan has the same bytes; the fake engine reads the sidecars
+    monkeypatch.setattr(ocr_cache, "_CACHE", ocr_cache.OCRCache(str(store / "ocr_cache.db")))
+    monkeypatch.setenv("OCR_CACHE", "1")
+    engine = FakeOCREngine()
+
+    for _ in range(2):
+        for student, text in SHEETS.items():
+            assert extract_text_from_image(str(store / "scans" / f"{student}.png"), engine=engine) == text
+    assert ocr_cache._CACHE.stats()["Entries"] == len(SHEETS)
+
+def test_lookups_do_not_write(tmp_path, monkeypatch):
+    cache = ocr_cache.OCRCache(str(tmp_path / "ocr_cache.db"))
+    cache.put("k", "text")
+    conn = cache._connect()
+    writes = conn.total_changes
+
+    monkeypatch.setattr(ocr_cache, "FLUSH_SECONDS", 3600)
+    for _ in range(ocr_cache.FLUSH_EVERY - 1):
+        assert cache.get("k") == "text"
+    assert cache.get("missing") is None
+    # The FLUSH_EVERY-th lookup wrote the counters in one batch;
+    # the entry was used just now, so its last_used was left alone
+    assert conn.total_changes == writes + 2
+    stats = cache.stats()
+    assert (stats["TotalHits"], stats["TotalMisses"]) == (ocr_cache.FLUSH_EVERY - 1, 1)
+
+def test_stale_entries_are_touched_on_flush(tmp_path):
+    cache = ocr_cache.OCRCache(str(tmp_path / "ocr_cache.db"))
+    cache.put("k", "text")
+    conn = cache._connect()
+    with conn:
+        conn.execute("UPDATE entries SET last_used = 0")
+    cache.get("k")
+    cache.flush()
+    assert conn.execute("SELECT last_used FROM entries").fetchone()[0] > 0
@@ -0,0 +1,56 @@
+# tests/test_ocr_engines.py
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from ocr_engines import PooledTesseractEngine
+
+class CountingAPI:
+    """
+    Stands in for tesserocr.PyTessBaseAPI and counts the instances made.
+    """
+    created = []
+
+    def __init__(self, lang, path=None):
+        CountingAPI.created.append(lang)
+
+    def SetPageSegMode(self, psm):
+        pass
+
+    def SetImage(self, image):
+        pass
+
+    def GetUTF8Text(self):
+        time.sleep(0.01)
+        return "text"
+
+    def End(self):
+        pass
+
+def pooled_engine(monkeypatch, size):
+    CountingAPI.created = []
+    monkeypatch.setitem(sys.modules, "tesserocr",
+                        types.SimpleNamespace(PyTessBaseAPI=CountingAPI))
+    return PooledTesseractEngine(size=size)
+
+def test_instances_are_created_on_demand(monkeypatch):
+    engine = pooled_engine(monkeypatch, size=8)
+    assert CountingAPI.created == []
+    for _ in range(5):
+        assert engine.image_to_string(None) == "text"
+    assert CountingAPI.created == ["eng"]
+
+def test_concurrent_calls_stop_at_pool_size(monkeypatch):
+    engine = pooled_engine(monkeypatch, size=2)
+    start = threading.Barrier(8)
+
+    def ocr(_):
+        start.wait()
+        return engine.image_to_string(None, lang="deu")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(ocr, range(8))) == ["text"] * 8
+    assert CountingAPI.created == ["deu", "deu"]
+    engine.close()
@@ -0,0 +1,26 @@
+# tests/test_preprocess.py
+import pytest
+
+from preprocess import DEFAULT_STEPS, downscale, parse_steps
+
+Image = pytest.importorskip("PIL.Image")
+
+def test_no_preprocessing_by_default(monkeypatch):
+    monkeypatch.delenv("OCR_PREPROCESS", raising=False)
+    assert DEFAULT_STEPS == ()
+    assert parse_steps(None) == ()
+
+def test_phone_photo_tagged_72_dpi_is_shrunk():
+    img = Image.new("L", (4000, 3000))
+    img.info["dpi"] = (72, 72)
+    assert downscale(img, 300).size == (3508, 2631)
+
+def test_plausible_dpi_is_trusted():
+    img = Image.new("L", (2480 * 2, 3508 * 2))
+    img.info["dpi"] = (600, 600)
+    assert downscale(img, 300).size == (2480, 3508)
+
+@pytest.mark.parametrize("size", [(3508, 2480), (2480, 3508), (1200, 900)])
+def test_pages_without_dpi_at_or_below_target_are_kept(size):
+    img = Image.new("L", size)
+    assert downscale(img, 300) is img
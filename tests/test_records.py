@@ -0,0 +1,39 @@
+# tests/test_records.py
+import pickle
+
+import records
+from evaluation import evaluate_all, get_answer_key
+from records import QuestionResult
+
+def test_record_reads_like_the_old_dict(store):
+    key = get_answer_key(str(store / "key.csv"))
+    detailed, total = evaluate_all({"Q1": "paris"}, key)
+    assert detailed["Q1"] == {"StudentAnswer": "paris", "Score": 1.0, "Marks": 1.0,
+                             "Remark": "Correct", "CorrectAnswer": "Paris", "Type": "O"}
+    assert total == 1.0
+    assert dict(detailed["Q2"])["Marks"] == 5.0
+    assert list(detailed["Q2"]) == list(records.DETAIL_FIELDS)
+    assert detailed["Q2"]["CorrectAnswer"] == key["Q2"]["answer"]
+
+def test_pickled_records_share_one_key_entry(store):
+    key = get_answer_key(str(store / "key.csv"))
+    first, _ = evaluate_all({"Q1": "Paris", "Q2": "light energy"}, key)
+    second, _ = evaluate_all({"Q1": "London", "Q2": "plants"}, key)
+
+    restored = pickle.loads(pickle.dumps([first, second]))
+    assert restored == [first, second]
+    assert restored[0]["Q1"].key is restored[1]["Q1"].key
+    # Only the key fields travel, not the compiled entry
+    assert set(restored[0]["Q2"].key) == {"answer", "marks", "type"}
+
+def test_restored_key_entries_are_bounded(monkeypatch):
+    monkeypatch.setattr(records, "MAX_KEY_ENTRIES", 3)
+    monkeypatch.setattr(records, "_KEY_ENTRIES", {})
+    rows = [QuestionResult("a", 1.0, "ok", {"answer": f"answer {i}", "marks": 1.0, "type": "O"})
+            for i in range(3)]
+    first = pickle.loads(pickle.dumps(rows[0]))
+    pickle.loads(pickle.dumps(rows[1:]))
+    # Using the oldest entry again keeps it over the next oldest
+    assert pickle.loads(pickle.dumps(rows[0])).key is first.key
+    pickle.loads(pickle.dumps(QuestionResult("a", 1.0, "ok", {"answer": "answer 3", "marks": 1.0, "type": "O"})))
+    assert [entry_id[0] for entry_id in records._KEY_ENTRIES] == ["answer 2", "answer 0", "answer 3"]
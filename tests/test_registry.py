@@ -0,0 +1,119 @@
+# tests/test_registry.py
+import hashlib
+import multiprocessing
+import os
+import time
+
+import registry
+from conftest import KEY_CSV
+
+OTHER_CSV = KEY_CSV.replace("Paris", "Rome")
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def test_colliding_key_ids_are_not_the_same_key(tmp_path, monkeypatch):
+    keys_dir = str(tmp_path / "keys")
+    # Force both keys onto the same 12-digit ID prefix
+    monkeypatch.setattr(registry, "content_hash",
+                        lambda data: "a" * 12 + hashlib.sha256(data).hexdigest()[12:])
+    first, created = registry.register(write(tmp_path, "physics.csv", KEY_CSV), keys_dir)
+    second, created_second = registry.register(write(tmp_path, "history.csv", OTHER_CSV), keys_dir)
+
+    assert created and created_second
+    assert first["id"] == "a" * 12 and len(second["id"]) == 13
+    assert second["id"].startswith(first["id"])
+    with open(registry.key_path(second, keys_dir)) as f:
+        assert "Rome" in f.read()
+    # Re-registering either resolves to its own entry, also after a rebuild
+    assert registry.register(write(tmp_path, "again.csv", OTHER_CSV), keys_dir) == (second, False)
+    rebuilt = registry.rebuild_index(keys_dir)["keys"]
+    assert set(rebuilt) == {first["id"], second["id"]}
+
+def register_slowly(path, keys_dir):
+    # Widen the window between reading and writing the index
+    write_index = registry._write_index
+    registry._write_index = lambda index, keys_dir: (time.sleep(0.2), write_index(index, keys_dir))
+    registry.register(path, keys_dir)
+
+def test_concurrent_processes_keep_every_registration(tmp_path):
+    keys_dir = str(tmp_path / "keys")
+    registry.rebuild_index(keys_dir)
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=register_slowly,
+                         args=(write(tmp_path, f"key{i}.csv", KEY_CSV.replace("Paris", f"City{i}")), keys_dir))
+             for i in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(30)
+        assert proc.exitcode == 0
+    assert len(registry.load_index(keys_dir)["keys"]) == 4
+
+def test_identical_content_is_stored_once(tmp_path):
+    keys_dir = str(tmp_path / "keys")
+    entry, created = registry.register(write(tmp_path, "physics.csv", KEY_CSV), keys_dir)
+    assert created
+    assert entry["id"] == hashlib.sha256(KEY_CSV.encode()).hexdigest()[:registry.ID_LENGTH]
+    assert entry["name"] == f"physics_{entry['id']}.csv"
+    assert (entry["questions"], entry["total_marks"], entry["objective"], entry["subjective"]) == (2, 6.0, 1, 1)
+
+    assert registry.register(write(tmp_path, "copy.csv", KEY_CSV), keys_dir) == (entry, False)
+    assert sorted(p.name for p in (tmp_path / "keys").iterdir() if p.suffix == ".csv") == [entry["name"]]
+
+def test_lookup_by_id_prefix_name_or_alias(tmp_path):
+    keys_dir = tmp_path / "keys"
+    keys_dir.mkdir()
+    # A store from before the index: duplicates become aliases of the oldest file
+    write(keys_dir, "old.csv", KEY_CSV)
+    write(keys_dir, "other.csv", OTHER_CSV)
+    write(keys_dir, "old copy.csv", KEY_CSV)
+    write(keys_dir, "broken.csv", "not,a,key\n1,2,3\n")
+    for age, name in enumerate(["old.csv", "other.csv", "old copy.csv"]):
+        os.utime(keys_dir / name, (1000 + age, 1000 + age))
+    write(keys_dir, "old.template.json", "{}")
+
+    index = registry.rebuild_index(str(keys_dir))
+    assert [e["name"] for e in registry.list_keys(str(keys_dir))] == ["old.csv", "other.csv"]
+    old = registry.get_key("old.csv", str(keys_dir))
+    assert old["aliases"] == ["old copy.csv"]
+    assert old["template"] == "old.template.json"
+    assert set(index["keys"]) == {old["id"], registry.get_key("other.csv", str(keys_dir))["id"]}
+
+    for ref in (old["id"], old["id"][:4], "old copy.csv"):
+        assert registry.get_key(ref, str(keys_dir)) == old
+    assert registry.get_key("", str(keys_dir)) is None
+    assert registry.get_key("missing.csv", str(keys_dir)) is None
+
+def test_ambiguous_prefix_matches_nothing(tmp_path, monkeypatch):
+    keys_dir = str(tmp_path / "keys")
+    monkeypatch.setattr(registry, "content_hash",
+                        lambda data: "ab" + hashlib.sha256(data).hexdigest()[2:])
+    first, _ = registry.register(write(tmp_path, "a.csv", KEY_CSV), keys_dir)
+    registry.register(write(tmp_path, "b.csv", OTHER_CSV), keys_dir)
+    assert registry.get_key("ab", keys_dir) is None
+    assert registry.get_key(first["id"][:5], keys_dir) == first
+
+def test_lost_or_corrupt_index_is_rebuilt(tmp_path):
+    keys_dir = str(tmp_path / "keys")
+    entry, _ = registry.register(write(tmp_path, "physics.csv", KEY_CSV), keys_dir)
+    for broken in (None, "{not json", '{"version": 99}'):
+        if broken is None:
+            os.remove(registry.index_path(keys_dir))
+        else:
+            write(tmp_path / "keys", registry.INDEX_FILE, broken)
+        assert registry.get_key(entry["id"], keys_dir)["name"] == entry["name"]
+
+def test_cli(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(registry, "ANSWER_KEYS_DIR", str(tmp_path / "keys"))
+    assert registry.main(["add", write(tmp_path, "physics.csv", KEY_CSV)]) == 0
+    assert registry.main(["add", write(tmp_path, "copy.csv", KEY_CSV)]) == 0
+    entry = registry.list_keys()[0]
+    assert registry.main(["show", entry["id"][:6]]) == 0
+    assert registry.main(["show", "nope"]) == 1
+    out = capsys.readouterr().out
+    assert f"Registered [{entry['id']}] physics_{entry['id']}.csv - 2 questions, 6 marks (1 O / 1 S)" in out
+    assert "Already registered: " in out
+    assert "No answer key nope" in out
@@ -0,0 +1,41 @@
+# tests/test_regrade.py
+import pytest
+
+pytest.importorskip("numpy")
+
+import results
+from conftest import result_counts
+from evaluation import compile_answer_key, evaluate_all
+from regrade import regrade
+
+V1 = {"Q1": {"answer": "Paris", "marks": 1.0, "type": "O"},
+      "Q2": {"answer": "light energy", "marks": 5.0, "type": "S"}}
+V2 = dict(V1, Q1={"answer": "London", "marks": 1.0, "type": "O"})
+
+def save(student, answers, key):
+    detailed, total = evaluate_all(answers, compile_answer_key(key))
+    return results.save_results(student, None, total, detailed, "k.csv")[1]
+
+def test_results_of_older_key_versions_are_regraded(store):
+    # alice was graded with the first version of the key, bob with the
+    # corrected one, so bob holds the latest result
+    alice = save("alice", {"Q1": "Paris", "Q2": "light energy"}, V1)
+    bob = save("bob", {"Q1": "London", "Q2": "light energy"}, V2)
+
+    report = regrade("k.csv", V2)
+    assert report["Changed"] == ["Q1"]
+    assert (report["Rescored"], report["StudentsChanged"]) == (1, 1)
+
+    conn = results.connect()
+    totals = dict(conn.execute("SELECT id, total_score FROM results"))
+    assert totals == {alice: 5.0, bob: 6.0}
+    assert conn.execute("SELECT COUNT(*) FROM details WHERE correct_answer = 'Paris'").fetchone()[0] == 0
+    assert result_counts() == (2, 4, 2)
+
+    assert regrade("k.csv", V2)["Changed"] == []
+
+def test_removed_questions_leave_the_totals(store):
+    save("alice", {"Q1": "Paris", "Q2": "light energy"}, V1)
+    report = regrade("k.csv", {"Q2": V1["Q2"]})
+    assert report["Removed"] == ["Q1"]
+    assert results.connect().execute("SELECT total_score FROM results").fetchone()[0] == 5.0
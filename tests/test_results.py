@@ -0,0 +1,93 @@
+# tests/test_results.py
+import csv
+
+import pytest
+
+import results
+from conftest import result_counts
+
+def test_class_analysis_takes_keywords_only(store):
+    results.save_results("alice", None, 4.0, {}, "k.csv")
+    results.save_results("bob", None, 2.0, {}, "k.csv")
+    analysis = results.class_analysis(answer_key="k.csv")
+    assert (analysis["AnswerKey"], analysis["Average Score"]) == ("k.csv", 3.0)
+    assert results.class_analysis(answer_key="other.csv") is None
+    # The old signature took the results CSV path first
+    with pytest.raises(TypeError):
+        results.class_analysis(results.RESULTS_FILE)
+
+def detail(answer, score, marks=1.0):
+    return {"StudentAnswer": answer, "Score": score, "Marks": marks, "Remark": "r",
+            "CorrectAnswer": "Paris", "Type": "O"}
+
+def test_save_results_returns_summary_and_id(store):
+    summary, result_id = results.save_results("alice", "t", 1.0, {"Q1": detail("Paris", 1.0)}, "k.csv")
+    assert list(summary) == results.SUMMARY_COLUMNS
+    assert (summary["Student"], summary["Total Score"]) == ("alice", 1.0)
+    assert results.find_results(student="alice") == [{
+        "ResultID": result_id, "Student": "alice", "AnswerKey": "k.csv",
+        "Total Score": 1.0, "Timestamp": summary["Timestamp"]}]
+
+def test_same_source_is_saved_once(store):
+    first = results.save_results("alice", "t", 1.0, {"Q1": detail("Paris", 1.0)}, "k.csv", source="run:1")
+    # A resumed sheet graded again (differently) keeps the first result
+    again = results.save_results("alice", "t", 0.0, {"Q1": detail("Rome", 0.0)}, "k.csv", source="run:1")
+    assert again[1] == first[1]
+    assert again[0]["Total Score"] == 1.0
+    results.save_results("alice", "t", 0.0, {"Q1": detail("Rome", 0.0)}, "k.csv")
+    assert result_counts() == (2, 2, 2)
+
+def test_export_results_csv(store):
+    results.save_results("alice", "t", 1.0, {}, "k.csv")
+    results.save_results("bob", None, 0.5, {}, "k.csv")
+    dest, count = results.export_results_csv(str(store / "results.csv"))
+    with open(dest, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert count == 2
+    assert [(r["Student"], r["EvaluatorUser"], r["Total Score"]) for r in rows] == \
+        [("alice", "t", "1.0"), ("bob", "", "0.5")]
+
+def test_legacy_results_csv_is_imported_once(store):
+    (store / "results.csv").write_text(
+        "Student,EvaluatorUser,AnswerKey,Total Score,Timestamp\n"
+        "alice,t,k.csv,3,20240101_120000\n"
+        "bob,,k.csv,1.5,20240101_120100\n")
+    assert [r["Student"] for r in results.find_results()] == ["alice", "bob"]
+    assert results.class_analysis(answer_key="k.csv")["Total Students"] == 2
+
+    results._CONNECTIONS.clear()
+    assert len(results.find_results()) == 2
+
+def test_details_round_trip(store):
+    detailed = {"Q1": detail("Paris", 1.0), "Q2": detail("light", 2.5, marks=5.0)}
+    _, alice = results.save_results("alice", "t", 3.5, detailed, "k.csv")
+    results.save_results("bob", "t", 0.0, {"Q1": detail("Rome", 0.0)}, "k.csv")
+    results.save_results("alice", "t", 1.0, {"Q1": detail("Paris", 1.0)}, "other.csv")
+
+    rows = results.query_details(answer_key="k.csv", student="alice")
+    assert [(r["ResultID"], r["QID"], r["StudentAnswer"], r["Score"], r["Marks"]) for r in rows] == \
+        [(alice, "Q1", "Paris", 1.0, 1.0), (alice, "Q2", "light", 2.5, 5.0)]
+    assert [r["Student"] for r in results.query_details(qid="Q1")] == ["alice", "bob", "alice"]
+    assert results.query_details(answer_key="k.csv", qid="Q3") == []
+
+    dest = results.export_details_csv(alice, dest=str(store / "alice.csv"))
+    with open(dest, newline="", encoding="utf-8") as f:
+        exported = {row.pop("QID"): row for row in csv.DictReader(f)}
+    assert list(exported) == ["Q1", "Q2"]
+    assert {f: str(v) for f, v in detailed["Q2"].items()} == exported["Q2"]
+    with pytest.raises(KeyError):
+        results.export_details_csv(alice + 100)
+
+def test_legacy_details_csvs_are_imported(store):
+    (store / "results.csv").write_text(
+        "Student,EvaluatorUser,AnswerKey,Total Score,Timestamp\n"
+        "Ann O'Neil,t,k.csv,1,20240101_120000\n")
+    (store / "Ann O_Neil_20240101_120000_details.csv").write_text(
+        "QID,StudentAnswer,Score,Marks,Remark,CorrectAnswer,Type\n"
+        "Q1,Paris,1,1,Correct,Paris,O\n"
+        "Q2,,0,5,No answer provided,Photosynthesis,S\n")
+    # No summary row to attach to: skipped
+    (store / "nobody_20240101_120000_details.csv").write_text("QID,Score\nQ1,1\n")
+
+    rows = results.query_details()
+    assert [(r["Student"], r["QID"], r["Score"]) for r in rows] == [("Ann O'Neil", "Q1", 1.0), ("Ann O'Neil", "Q2", 0.0)]
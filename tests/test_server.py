@@ -0,0 +1,78 @@
+# tests/test_server.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp import FormData
+from aiohttp.test_utils import TestClient, TestServer
+
+import registry
+import server
+from conftest import KEY_CSV
+
+@pytest.fixture
+def service_dirs(store, monkeypatch):
+    """
+    The store fixture with the key store and uploads under its directory too.
+    """
+    monkeypatch.setattr(server, "DATA_DIR", str(store))
+    monkeypatch.setattr(server, "ANSWER_KEYS_DIR", str(store / "answer_keys"))
+    monkeypatch.setattr(registry, "ANSWER_KEYS_DIR", str(store / "answer_keys"))
+    monkeypatch.setattr(server, "UPLOADS_DIR", str(store / "uploads"))
+    return store
+
+def test_answer_key_upload(service_dirs):
+    store = service_dirs
+
+    async def upload(client, text):
+        form = FormData()
+        form.add_field("file", text.encode(), filename="physics.csv", content_type="text/csv")
+        return await client.post("/answer-keys", data=form)
+
+    async def scenario():
+        async with TestClient(TestServer(server.create_app(workers=1))) as client:
+            first = await upload(client, KEY_CSV)
+            again = await upload(client, KEY_CSV)
+            return first.status, await first.json(), again.status, await again.json()
+
+    status, entry, again_status, again = asyncio.run(scenario())
+    assert (status, again_status) == (201, 200)
+    assert again["id"] == entry["id"]
+    assert (store / "answer_keys" / entry["name"]).read_text() == KEY_CSV
+
+def test_finished_jobs_expire(monkeypatch):
+    monkeypatch.setenv(server.JOB_TTL_ENV, "60")
+    service = server.GradingService(workers=1)
+    try:
+        old = service.new_job("k.csv", None, [], "unused")
+        running = service.new_job("k.csv", None, [], "unused")
+        recent = service.new_job("k.csv", None, [], "unused")
+        old["finished"] = 1000.0
+        recent["finished"] = 1050.0
+        service.prune_jobs(now=1100.0)
+        assert set(service.jobs) == {running["id"], recent["id"]}
+    finally:
+        service.close()
+
+def test_uploads_over_the_limits_are_refused(service_dirs, monkeypatch):
+    store = service_dirs
+    monkeypatch.setenv(server.MAX_UPLOAD_FILES_ENV, "2")
+    monkeypatch.setenv(server.MAX_UPLOAD_MB_ENV, str(4096 / 1024 / 1024))
+
+    async def post_scans(client, sizes):
+        form = FormData()
+        form.add_field("answer_key", "k.csv")
+        for i, size in enumerate(sizes):
+            form.add_field("scan", b"x" * size, filename=f"s{i}.png", content_type="image/png")
+        response = await client.post("/jobs", data=form)
+        return response.status
+
+    async def scenario():
+        async with TestClient(TestServer(server.create_app(workers=1))) as client:
+            return (await post_scans(client, [10, 10, 10]), await post_scans(client, [3000, 3000]),
+                    await post_scans(client, [10, 10]))
+
+    # The last one is within the limits but names an unknown key
+    assert asyncio.run(scenario()) == (413, 413, 400)
+    assert list((store / "uploads").iterdir()) == []
@@ -0,0 +1,51 @@
+# tests/test_similarity.py
+import pytest
+
+import similarity
+from conftest import SHEETS, result_counts
+from evaluation import evaluate_all, get_answer_key
+from results import save_results
+from textextraction import parse_questions
+
+MODEL = "Photosynthesis converts light energy into chemical energy"
+
+def test_scores_follow_the_thresholds():
+    scores = similarity.similarity_to_marks([0.0, 0.1, 0.35, 0.6, 1.0], 4)
+    assert scores.tolist() == [0.0, 0.0, 2.0, 4.0, 4.0]
+    # Rounded down to the step
+    assert similarity.similarity_to_marks([0.3], 5, step=1).tolist() == [2.0]
+    with pytest.raises(ValueError):
+        similarity.similarity_to_marks([0.5], 5, low=0.6, high=0.1)
+
+def test_closer_answers_score_higher():
+    answers = [MODEL, "light energy becomes chemical energy", "plants grow", "   "]
+    scores, sims = similarity.score_question(MODEL, answers, 5)
+    assert sims[0] == pytest.approx(1.0)
+    assert sims[0] > sims[1] > sims[2] == 0.0
+    assert scores.tolist()[0] == 5.0 and scores.tolist()[2:] == [0.0, 0.0]
+
+def test_cohort_results_match_evaluate_all_shape(store):
+    key = get_answer_key(str(store / "key.csv"))
+    cohort = [dict(parse_questions(text)) for text in SHEETS.values()]
+    scored = similarity.evaluate_cohort(cohort, key)
+
+    for answers, (detailed, total) in zip(cohort, scored):
+        expected, _ = evaluate_all(answers, key)
+        assert list(detailed) == list(expected)
+        # Objective questions are still exact matches
+        assert detailed["Q1"] == expected["Q1"]
+        assert total == round(sum(r["Score"] for r in detailed.values()), 2)
+    assert scored[2][0]["Q2"]["Remark"].startswith("Partial")
+
+def test_cli_compares_without_touching_stored_scores(store, capsys):
+    key_path = str(store / "key.csv")
+    key = get_answer_key(key_path)
+    for student, text in SHEETS.items():
+        detailed, total = evaluate_all(dict(parse_questions(text)), key)
+        save_results(student, "t", total, detailed, "key.csv")
+    before = result_counts()
+
+    assert similarity.main([key_path, "--out", str(store / "sim.csv")]) == 0
+    assert (store / "sim.csv").read_text().splitlines()[0] == "ResultID,Student,Similarity Score"
+    assert result_counts() == before
+    assert similarity.main([key_path, "--stored-as", "other.csv"]) == 1
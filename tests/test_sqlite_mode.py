@@ -0,0 +1,20 @@
+# tests/test_sqlite_mode.py
+import results
+from jobqueue import JobJournal
+from ocr_cache import OCRCache
+
+def journal_modes(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    cache = OCRCache(str(tmp_path / "ocr_cache.db"))
+    cache.put("k", "text")
+    return (journal.conn.execute("PRAGMA journal_mode").fetchone()[0],
+            results.connect().execute("PRAGMA journal_mode").fetchone()[0],
+            cache._connect().execute("PRAGMA journal_mode").fetchone()[0])
+
+def test_wal_by_default(store):
+    assert journal_modes(store) == ("wal", "wal", "wal")
+
+def test_rollback_journal_for_shared_storage(store, monkeypatch):
+    monkeypatch.setenv("SQLITE_JOURNAL_MODE", "delete")
+    assert journal_modes(store) == ("delete", "delete", "delete")
+    assert results.connect().execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
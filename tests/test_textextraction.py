@@ -0,0 +1,44 @@
+# tests/test_textextraction.py
+import importlib.util
+import os
+
+import pytest
+
+from textextraction import clean_text, parse_questions, split_questions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="module")
+def legacy():
+    """
+    benchmarks/bench_split.py, which keeps a copy of the old parser.
+    """
+    spec = importlib.util.spec_from_file_location("bench_split", os.path.join(ROOT, "benchmarks", "bench_split.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+EDGE_CASES = [
+    "",
+    "\r\n\r\n",
+    "Q1: Paris\r\nQ2: light energy",
+    "1. first\n2) second\n3:third\nQ.4 fourth\nq 5 - fifth",
+    "an answer without a number\nQ7: seven\nanother one",
+    "Q 3:\n12: twelve\nQ.  9: nine\n  indented\tline  ",
+    "• bullet été\nQ1 ok\n10",
+]
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_matches_the_old_parser(legacy, text, capsys):
+    expected = legacy.legacy_split_questions(legacy.legacy_clean_text(text))
+    assert clean_text(text) == legacy.legacy_clean_text(text)
+    assert split_questions(clean_text(text)) == expected
+    assert parse_questions(text) == expected
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_the_old_parser_on_ocr_dumps(legacy, seed, capsys):
+    text = legacy.make_dump(400, seed=seed)
+    assert parse_questions(text) == legacy.legacy_split_questions(legacy.legacy_clean_text(text))
+
+def test_unnumbered_lines_follow_the_highest_question():
+    assert parse_questions("Q2: b\nloose\nQ5: e\nmore") == [("Q2", "b"), ("Q6", "loose"), ("Q5", "e"), ("Q7", "more")]
@@ -0,0 +1,65 @@
+# tests/test_worker_lease.py
+import multiprocessing
+import time
+
+import pytest
+
+import batch
+import results
+import worker
+from jobqueue import DONE, JobJournal
+
+from conftest import SHEETS, result_counts
+
+LEASE = 0.5
+STALL = 2.0
+
+def stalled_worker(journal_path, db_path, stall_at, outcome):
+    """
+    Claim one sheet under a short lease (no heartbeat), then stall past the
+    lease right before saving the result or right before marking it done.
+    """
+    results.RESULTS_DB = db_path
+    results._CONNECTIONS.clear()
+    journal = JobJournal(journal_path)
+    row = journal.claim(None, 1, worker="stalled", lease=LEASE)[0]
+    if stall_at == "save":
+        save = worker.save_results
+        worker.save_results = lambda *args, **kwargs: (time.sleep(STALL), save(*args, **kwargs))[1]
+    else:
+        record_done = journal.record_done
+        journal.record_done = lambda *args, **kwargs: (time.sleep(STALL), record_done(*args, **kwargs))[1]
+    outcome.put(worker.grade_claimed(journal, row, "stalled"))
+
+@pytest.mark.parametrize("stall_at", ["save", "done"])
+def test_worker_stalled_past_its_lease_does_not_duplicate(store, stall_at):
+    key, scans, journal_path = str(store / "key.csv"), str(store / "scans"), str(store / "jobs.db")
+    journal = JobJournal(journal_path)
+    journal.enqueue(batch.default_run_id(key, scans), batch.collect_sheets(scans), key)
+
+    ctx = multiprocessing.get_context("fork")
+    outcome = ctx.Queue()
+    stalled = ctx.Process(target=stalled_worker, args=(journal_path, results.RESULTS_DB, stall_at, outcome))
+    stalled.start()
+    while not journal.workers():
+        time.sleep(0.05)
+    time.sleep(LEASE + 0.2)
+
+    # The lease has run out: another worker reclaims and grades every sheet
+    graded, failed = worker.run_worker(journal_path, lease=30, worker="healthy")
+    assert (graded, failed) == (len(SHEETS), 0)
+
+    stalled.join(10)
+    assert outcome.get(timeout=1) is False
+    assert result_counts() == (len(SHEETS), 2 * len(SHEETS), len(SHEETS))
+    assert journal.counts() == {DONE: len(SHEETS)}
+
+def test_run_exits_non_zero_when_a_sheet_fails(store, capsys):
+    key, scans, journal_path = str(store / "key.csv"), str(store / "scans"), str(store / "jobs.db")
+    assert worker.main(["--journal", journal_path, "submit", key, scans]) == 0
+    assert worker.main(["--journal", journal_path, "run"]) == 0
+
+    (store / "scans" / "bob.png.txt").unlink()
+    assert worker.main(["--journal", journal_path, "submit", key, scans, "--run", "again"]) == 0
+    assert worker.main(["--journal", journal_path, "run"]) == 1
+    assert capsys.readouterr().out.rstrip().endswith(f"{len(SHEETS) - 1} graded, 1 failed")
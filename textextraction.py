@@ -1,44 +1,104 @@
 # textextraction.py
-import pytesseract
-from PIL import Image
+import logging
 import re
 import os
+import metrics
+from ocr_cache import get_cache, file_digest, cache_key
+from ocr_engines import get_engine
+from preprocess import parse_steps, preprocess_image, describe
 
-# Optionally configure this externally via environment var or modify path below
-DEFAULT_TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-if os.environ.get("TESSERACT_CMD"):
-    pytesseract.pytesseract.tesseract_cmd = os.environ.get("TESSERACT_CMD")
-else:
-    # If windows default exists, set it; otherwise assume tesseract is in PATH
-    if os.path.exists(DEFAULT_TESSERACT_CMD):
-        pytesseract.pytesseract.tesseract_cmd = DEFAULT_TESSERACT_CMD
+logger = logging.getLogger(__name__)
 
-def extract_text_from_image(image_path, psm=6, lang="eng"):
+def extract_text_from_image(image_path, psm=6, lang="eng", use_cache=True, engine=None,
+                            preprocess=None):
     """
-    Extract raw text from an image using pytesseract.
+    Extract raw text from an image with the configured OCR engine
+    (pytesseract by default, see ocr_engines.get_engine).
     psm: page segmentation mode (6 = assume a single uniform block of text)
+    use_cache: re-use OCR text of an identical image from the OCR cache
+               (bypass globally with OCR_CACHE=0)
+    preprocess: preprocessing steps before OCR, e.g. "grayscale,downscale,binarize"
+                (default: $OCR_PREPROCESS or preprocess.DEFAULT_STEPS, "none" disables)
     """
     if not os.path.exists(image_path):
-        print(f"Error: Image file not found: {image_path}")
+        logger.error("Image file not found: %s", image_path)
         return ""
     
     try:
-        img = Image.open(image_path)
-        print(f"Image loaded successfully: {img.size}")
+        engine = engine or get_engine()
     except Exception as e:
-        print(f"Error opening {image_path}: {e}")
+        logger.error("OCR engine error: %s", e)
         return ""
 
+    steps = parse_steps(preprocess) if engine.needs_image else ()
+
+    cache = get_cache() if use_cache else None
+    key = None
+    if cache is not None:
+        # Engines that take the path (the fake engine answers by file name or
+        # sidecar) can give identical bytes different text, so key on the path too
+        extra = describe(steps) if engine.needs_image else f"path:{os.path.abspath(image_path)}"
+        key = cache_key(file_digest(image_path), psm, lang, engine.version(), extra)
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.inc("ocr_cache_total", result="hit")
+            logger.info("OCR cache hit: %d characters", len(cached))
+            return cached
+        metrics.inc("ocr_cache_total", result="miss")
+
+    image = image_path
+    if engine.needs_image:
+        try:
+            from PIL import Image
+            with metrics.timer("image_load"):
+                image = Image.open(image_path)
+                image.load()
+            logger.info("Image loaded successfully: %s", image.size)
+            if steps:
+                image, timings = preprocess_image(image, steps)
+                for name, seconds in timings.items():
+                    metrics.observe(metrics.STAGE_METRIC, seconds, stage=f"preprocess_{name}")
+                logger.info("Preprocessed to %s: %s", image.size,
+                            ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+        except Exception as e:
+            logger.error("Error opening %s: %s", image_path, e)
+            return ""
+
     try:
-        config = f'--psm {psm}'
-        raw = pytesseract.image_to_string(img, lang=lang, config=config)
-        print(f"OCR extracted {len(raw)} characters")
+        with metrics.timer("ocr"):
+            raw = engine.image_to_string(image, psm=psm, lang=lang)
+        logger.info("OCR extracted %d characters", len(raw))
+        if cache is not None:
+            cache.put(key, raw)
         return raw
     except Exception as e:
-        print(f"OCR error: {e}")
-        print("Make sure Tesseract-OCR is installed and path is configured correctly")
+        logger.error("OCR error: %s", e)
+        logger.error("Make sure Tesseract-OCR is installed and path is configured correctly")
         return ""
 
+# Question-ID patterns, tried in order on each line
+QUESTION_PATTERNS = [
+    re.compile(r'^\s*(Q\s*\.?\s*\d+)[\).\s:-]+(.*)$', re.IGNORECASE),  # Q1:, Q.1, Q 1
+    re.compile(r'^\s*(\d+)[\).\s:-]+(.*)$', re.IGNORECASE),             # 1., 1), 1:
+]
+COLON_QID = re.compile(r'^(Q\.?\s*\d+|\d+)$', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+_DIGITS = re.compile(r'\d+')
+
+def iter_clean_lines(raw_text):
+    """
+    Yield the non-empty, stripped, ASCII-only lines of raw OCR text.
+    """
+    if not raw_text:
+        return
+    # remove non-ascii (optional)
+    text = raw_text.encode("ascii", "ignore").decode("ascii")
+    # splitlines also breaks on \r, so blank lines from \r\n never survive
+    for ln in text.splitlines():
+        ln = ln.strip()
+        if ln:
+            yield ln
+
 def clean_text(raw_text):
     """
     Clean and normalize extracted text
@@ -46,106 +106,88 @@ def clean_text(raw_text):
     if not raw_text:
         return ""
     
-    text = raw_text.replace("\r", "\n")
-    # collapse multiple newlines to one
-    text = re.sub(r"\n{2,}", "\n", text)
-    # remove non-ascii (optional)
-    text = re.sub(r"[^\x00-\x7F]+", "", text)
-    # trim spaces at ends of lines and remove superfluous spaces
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip() != ""]
-    cleaned = "\n".join(lines)
-    
-    print(f"Cleaned text: {len(lines)} lines")
-    return cleaned
+    with metrics.timer("clean"):
+        lines = list(iter_clean_lines(raw_text))
+    logger.info("Cleaned text: %d lines", len(lines))
+    return "\n".join(lines)
 
-def split_questions(text):
-  
-    if not text:
-        print("No text to split")
-        return []
+def _normalize_qid(qid_raw):
+    if qid_raw.isdigit():
+        return f"Q{qid_raw}"
+    qid = _WHITESPACE.sub('', qid_raw).upper()
+    if not qid.startswith('Q'):
+        qid = 'Q' + qid
+    return qid
 
-    lines = text.splitlines()
-    q_list = []
-    
-    print(f"\nParsing {len(lines)} lines for questions...")
-    
-    for idx, line in enumerate(lines, 1):
-        if not line.strip():
+def iter_question_lines(lines):
+    """
+    Yield (qid, answer) for each non-empty line; qid is None for lines
+    without a recognizable question number.
+    """
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
             continue
         
-        # Try multiple patterns for question identification
-        patterns = [
-            r'^\s*(Q\s*\.?\s*\d+)[\).\s:-]+(.*)$',  # Q1:, Q.1, Q 1
-            r'^\s*(\d+)[\).\s:-]+(.*)$',             # 1., 1), 1:
-        ]
-        
-        matched = False
-        for pattern in patterns:
-            m = re.match(pattern, line, re.IGNORECASE)
+        for pattern in QUESTION_PATTERNS:
+            m = pattern.match(line)
             if m:
-                qid_raw = m.group(1).strip()
-                ans = m.group(2).strip()
-                
-                # Normalize QID
-                if qid_raw.isdigit():
-                    qid = f"Q{qid_raw}"
-                else:
-                    qid = re.sub(r'\s+', '', qid_raw).upper()
-                    if not qid.startswith('Q'):
-                        qid = 'Q' + qid
-                
-                q_list.append((qid, ans))
-                print(f"Line {idx}: Matched {qid} -> {ans[:50]}...")
-                matched = True
+                yield _normalize_qid(m.group(1).strip()), m.group(2).strip()
                 break
-        
-        if not matched:
+        else:
             # Try to split by colon
             if ':' in line:
-                parts = line.split(':', 1)
-                qid_candidate = parts[0].strip()
-                ans = parts[1].strip()
-                
+                qid_candidate, ans = line.split(':', 1)
+                qid_candidate = qid_candidate.strip()
                 # Check if left side looks like a QID
-                if re.match(r'^(Q\.?\s*\d+|\d+)$', qid_candidate, re.IGNORECASE):
-                    if qid_candidate.isdigit():
-                        qid = f"Q{qid_candidate}"
-                    else:
-                        qid = re.sub(r'\s+', '', qid_candidate).upper()
-                        if not qid.startswith('Q'):
-                            qid = 'Q' + qid
-                    
-                    q_list.append((qid, ans))
-                    print(f"Line {idx}: Colon-split {qid} -> {ans[:50]}...")
-                    matched = True
-        
-        if not matched and line.strip():
-            # Store unmatched lines for potential sequential assignment
-            q_list.append((None, line.strip()))
-            print(f"Line {idx}: Unmatched -> {line[:50]}...")
+                if COLON_QID.match(qid_candidate):
+                    yield _normalize_qid(qid_candidate), ans.strip()
+                    continue
+            yield None, stripped
 
-    # Assign sequential IDs to unmatched questions
+def _assign_sequential_ids(pairs):
+    """
+    Collect (qid, answer) pairs, then number unmatched lines after the
+    highest question number seen.
+    """
     final = []
-    seq = 1
+    unmatched = []
     max_existing_num = 0
-    
-    # Find highest Q number already assigned
-    for qid, ans in q_list:
-        if qid and qid.startswith('Q'):
-            try:
-                num = int(re.search(r'\d+', qid).group())
-                max_existing_num = max(max_existing_num, num)
-            except:
-                pass
-    
-    seq = max_existing_num + 1
-    
-    for qid, ans in q_list:
+    for qid, ans in pairs:
         if qid is None:
-            qid = f"Q{seq}"
-            seq += 1
-            print(f"Assigned sequential ID: {qid} -> {ans[:50]}...")
+            unmatched.append(len(final))
+        else:
+            m = _DIGITS.search(qid)
+            if m:
+                num = int(m.group())
+                if num > max_existing_num:
+                    max_existing_num = num
         final.append((qid, ans))
-    
-    print(f"\nTotal questions parsed: {len(final)}")
+
+    # Assign sequential IDs to unmatched questions
+    for seq, pos in enumerate(unmatched, max_existing_num + 1):
+        final[pos] = (f"Q{seq}", final[pos][1])
+    return final
+
+def split_questions(text):
+    """
+    Parse cleaned text into a list of (qid, answer) pairs.
+    """
+    if not text:
+        logger.warning("No text to split")
+        return []
+
+    with metrics.timer("split"):
+        final = _assign_sequential_ids(iter_question_lines(text.splitlines()))
+    logger.info("Total questions parsed: %d", len(final))
+    return final
+
+def parse_questions(raw_text):
+    """
+    clean_text + split_questions in one pass over the raw OCR text,
+    without building the intermediate cleaned string.
+    """
+    with metrics.timer("parse"):
+        final = _assign_sequential_ids(iter_question_lines(iter_clean_lines(raw_text)))
+    logger.info("Total questions parsed: %d", len(final))
     return final
@@ -1,6 +1,36 @@
 # utils.py
+import logging
 import os
-import shutil
+
+# SQLite journal mode of the job journal, results and OCR cache databases.
+# WAL (the default) needs shared memory, so every process must be on one
+# host; databases on storage several hosts share need a rollback journal
+# (SQLITE_JOURNAL_MODE=DELETE in every process that opens them).
+SQLITE_JOURNAL_MODE_ENV = "SQLITE_JOURNAL_MODE"
+SQLITE_JOURNAL_MODES = ("WAL", "DELETE", "TRUNCATE", "PERSIST")
+
+def configure_sqlite(conn, synchronous=None):
+    """
+    Apply the journal mode from SQLITE_JOURNAL_MODE to a new connection.
+    synchronous="NORMAL" is only kept in WAL mode; rollback journals need
+    FULL to survive a power loss. Returns the journal mode.
+    """
+    mode = os.environ.get(SQLITE_JOURNAL_MODE_ENV, "WAL").strip().upper()
+    if mode not in SQLITE_JOURNAL_MODES:
+        mode = "WAL"
+    conn.execute(f"PRAGMA journal_mode={mode}")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous={synchronous if mode == 'WAL' else 'FULL'}")
+    return mode
+
+def configure_logging(default="WARNING"):
+    """
+    Leveled logging for the pipeline modules; LOG_LEVEL=INFO or DEBUG shows
+    OCR and per-question evaluation details.
+    """
+    level = os.environ.get("LOG_LEVEL", default).upper()
+    logging.basicConfig(level=getattr(logging, level, logging.WARNING),
+                        format="%(levelname)s %(name)s: %(message)s")
 
 def ensure_dirs():
     base = os.path.join(os.path.dirname(__file__), "data")
@@ -9,18 +39,12 @@ def ensure_dirs():
 
 def copy_answer_key_to_store(src_path):
     """
-    Copy uploaded answer key to data/answer_keys with timestamped name.
+    Register an uploaded answer key in data/answer_keys (see registry.py).
+    A byte-identical upload resolves to the key already stored.
     Returns destination path and filename.
     """
-    import time
+    import registry
     if not os.path.exists(src_path):
         raise FileNotFoundError(src_path)
-    dest_dir = os.path.join(os.path.dirname(__file__), "data", "answer_keys")
-    os.makedirs(dest_dir, exist_ok=True)
-    base = os.path.basename(src_path)
-    name, ext = os.path.splitext(base)
-    ts = int(time.time())
-    dest_name = f"{name}_{ts}{ext}"
-    dest_path = os.path.join(dest_dir, dest_name)
-    shutil.copy2(src_path, dest_path)
-    return dest_path, dest_name
+    entry, _ = registry.register(src_path)
+    return registry.key_path(entry), entry["name"]
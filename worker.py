@@ -0,0 +1,197 @@
+# worker.py
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+import metrics
+from batch import grade_sheet, collect_sheets, default_run_id
+from evaluation import get_answer_key
+from ingest import set_thread_budget
+from jobqueue import JobJournal, PRIORITIES, DEFAULT_LEASE, worker_name, result_source
+from ocr_engines import ENGINE_TYPES, OCR_ENGINE_ENV
+from results import save_results
+from utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 2.0
+
+class Heartbeat(threading.Thread):
+    """
+    Renews the worker's leases on the sheets it is grading every third of
+    the lease, on its own journal connection, so a long OCR never looks
+    like a dead worker.
+    """
+
+    def __init__(self, journal_path, worker, lease):
+        super().__init__(daemon=True, name="heartbeat")
+        self.journal_path = journal_path
+        self.worker = worker
+        self.lease = lease
+        self.sheet_ids = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def hold(self, sheet_ids):
+        with self.lock:
+            self.sheet_ids = set(sheet_ids)
+
+    def run(self):
+        journal = JobJournal(self.journal_path)
+        try:
+            while not self.stopped.wait(self.lease / 3):
+                with self.lock:
+                    sheet_ids = set(self.sheet_ids)
+                lost = sheet_ids - journal.heartbeat(self.worker, sheet_ids, self.lease)
+                if lost:
+                    logger.warning("Lost the lease on sheet(s) %s", sorted(lost))
+        finally:
+            journal.close()
+
+    def stop(self):
+        self.stopped.set()
+
+def grade_claimed(journal, row, worker):
+    """
+    Grade one claimed sheet and record the outcome, unless the sheet was
+    reclaimed by another worker in the meantime. The result is saved under
+    the sheet's result_source, so if the lease runs out between the save and
+    record_done, the worker that reclaims the sheet finds the saved result
+    instead of adding a second one.
+    Returns True if graded.
+    """
+    key_path = row["answer_key_path"]
+    keyname = os.path.basename(key_path)
+    try:
+        result = grade_sheet(row["image_path"], get_answer_key(key_path), raw_text=row["raw_text"])
+    except Exception as e:
+        result = {"error": str(e), "raw": None}
+
+    if result["raw"] is not None and row["raw_text"] is None:
+        journal.record_ocr(row["id"], result["raw"])
+
+    if not result["error"]:
+        if not journal.holds(row["id"], worker):
+            logger.warning("Sheet %s was reclaimed; dropping this result", row["image_path"])
+            return False
+        try:
+            _, result_id = save_results(row["student"], row["evaluator"], result["total"],
+                                        result["detailed"], keyname, source=result_source(row))
+        except Exception as e:
+            result["error"] = f"could not save results: {e}"
+
+    if result["error"]:
+        metrics.inc("grading_sheets_total", status="failed")
+        journal.record_failed(row["id"], result["error"], worker=worker)
+        logger.warning("FAILED %s: %s", row["image_path"], result["error"])
+        return False
+
+    if not journal.record_done(row["id"], result["total"], result_id, worker=worker):
+        # Reclaimed after the save: the new holder re-uses result #result_id
+        logger.warning("Lost the lease on %s after saving result #%d", row["image_path"], result_id)
+        return False
+    metrics.inc("grading_sheets_total", status="graded")
+    logger.info("%s: %s", row["student"], result["total"])
+    return True
+
+def run_worker(journal_path=None, run_id=None, batch_size=1, lease=DEFAULT_LEASE, follow=False,
+               poll=POLL_SECONDS, worker=None):
+    """
+    Claim and grade sheets from a shared journal until the queue is empty
+    (or forever with follow). Any number of these can run against the same
+    journal and results database: on one host as they are, or on several
+    hosts sharing the databases with SQLITE_JOURNAL_MODE=DELETE set in every
+    process (WAL needs shared memory on one host). Sheets held by a worker
+    that dies are reclaimed once its lease expires.
+    Returns (graded, failed).
+    """
+    worker = worker or worker_name()
+    journal = JobJournal(journal_path)
+    heartbeat = Heartbeat(journal.path, worker, lease)
+    heartbeat.start()
+    graded = failed = 0
+    logger.info("Worker %s started on %s", worker, journal.path)
+    try:
+        while True:
+            reclaimed = journal.reclaim_expired(run_id)
+            if reclaimed:
+                logger.warning("Reclaimed %d sheet(s) from expired leases", reclaimed)
+            rows = journal.claim(run_id, batch_size, worker=worker, lease=lease)
+            if not rows:
+                # Sheets leased by other workers may still come back
+                if follow or journal.workers():
+                    time.sleep(poll)
+                    continue
+                break
+            heartbeat.hold(row["id"] for row in rows)
+            for row in rows:
+                if grade_claimed(journal, row, worker):
+                    graded += 1
+                else:
+                    failed += 1
+            heartbeat.hold(())
+    finally:
+        heartbeat.stop()
+        journal.close()
+    logger.info("Worker %s finished: %d graded, %d failed", worker, graded, failed)
+    return graded, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade sheets from a shared job journal.")
+    parser.add_argument("--journal", default=None,
+                        help="Shared journal database (default: data/jobs.db)")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="-v for progress, -vv for per-sheet debug output")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="Queue the sheets of a directory or manifest CSV")
+    submit.add_argument("answer_key", help="Path to the answer key CSV")
+    submit.add_argument("source", help="Directory of scans, or a manifest CSV")
+    submit.add_argument("--run", default=None, help="Run ID (default: derived from the key and source paths)")
+    submit.add_argument("-u", "--user", default=None, help="Evaluator username recorded with each result")
+    submit.add_argument("--priority", choices=sorted(PRIORITIES), default="normal")
+
+    run = sub.add_parser("run", help="Claim and grade queued sheets")
+    run.add_argument("--run", default=None, help="Only grade sheets of this run")
+    run.add_argument("--batch", type=int, default=1, help="Sheets claimed at a time")
+    run.add_argument("--lease", type=float, default=DEFAULT_LEASE,
+                     help="Seconds a claimed sheet is held without a heartbeat")
+    run.add_argument("--follow", action="store_true", help="Keep polling once the queue is empty")
+    run.add_argument("--engine", choices=sorted(ENGINE_TYPES), default=None,
+                     help="OCR engine (default: $OCR_ENGINE or tesseract)")
+    run.add_argument("--ocr-threads", type=int, default=None,
+                     help="OCR threads per booklet or template sheet (default: $OCR_THREADS or CPU count; "
+                          "with several workers on one host, CPU count / workers)")
+    run.add_argument("--metrics", default=None, help="Write metrics here when done")
+    args = parser.parse_args(argv)
+
+    configure_logging(["WARNING", "INFO", "DEBUG"][min(args.verbose, 2)])
+    journal_path = args.journal
+
+    if args.command == "submit":
+        # Fail fast on a bad key before queueing anything
+        get_answer_key(args.answer_key)
+        sheets = [(os.path.abspath(image), student) for image, student in collect_sheets(args.source)]
+        run_id = args.run or default_run_id(args.answer_key, args.source)
+        journal = JobJournal(journal_path)
+        added = journal.enqueue(run_id, sheets, os.path.abspath(args.answer_key),
+                                PRIORITIES[args.priority], args.user)
+        print(f"Queued {added} new sheet(s) in run {run_id}")
+        return 0
+
+    if args.engine:
+        os.environ[OCR_ENGINE_ENV] = args.engine
+    if args.ocr_threads:
+        set_thread_budget(args.ocr_threads)
+    graded, failed = run_worker(journal_path, args.run, args.batch, args.lease, args.follow)
+    print(f"{worker_name()}: {graded} graded, {failed} failed")
+    if args.metrics:
+        metrics.write(args.metrics)
+    # Non-zero when any sheet failed, so schedulers and scripts notice
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())